@@ -0,0 +1,149 @@
+"""Gemeinsamer Datenzugriff der Seiten von ``vis_app.py``.
+
+Der Triple-Speicher wird einmal pro Prozess gelesen (``st.cache_resource``,
+ohne Kopie je Seite oder Sitzung) und neu geladen, sobald sich das Manifest
+ändert (neue Datenversion nach ``write_store``). Dazu werden die
+abgeleiteten Tabellen vorberechnet, die die Seiten brauchen: Ortszeilen mit
+numerischen Koordinaten, die Typen und Prädikate für die Filter und der
+Zeit-Index über ``zeit_von``/``zeit_bis`` für das Zeitfenster; der Suchindex
+für die Knoten-Suche und die Reiserouten (``routen.parquet``) entstehen beim
+ersten Gebrauch.
+
+Die Objekte werden von allen Seiten geteilt und dürfen nicht verändert
+werden.
+"""
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+import streamlit as st
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.normpath(os.path.join(BASE, "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from pipeline import dedup, geo, routen, search, triplestore, zeit
+
+# Triple-Speicher (Parquet/Arrow) statt graphen_bereinigt.xlsx
+STORE = os.path.join(ROOT, triplestore.STORE_DIR)
+# Kanonische Namen (pipeline.dedup): Varianten finden in der Suche ihren Knoten
+ENTITIES = os.path.join(ROOT, dedup.ENTITY_FILE)
+
+
+@dataclass(frozen=True)
+class Daten:
+    version: str
+    triples: pd.DataFrame        # Triple-Spalten ohne Satz-Metadaten
+    locations: pd.DataFrame      # geo.locations(triples)
+    subj_types: list
+    obj_types: list
+    predicates: list
+    loc_categories: list         # Prädikate der Ortszeilen (Kartenfilter)
+    zeit_index: zeit.ZeitIndex   # Tagesbereiche je Triple-Zeile
+
+
+# Spalten für die Ortszeilen (Kartenseiten)
+LOCATION_COLUMNS = {"objekt_type", "lat", "lon", "prädikat"}
+
+
+def _distinct(df: pd.DataFrame, col: str) -> list:
+    return sorted(df[col].dropna().astype(str).unique()) if col in df.columns else []
+
+
+@st.cache_resource(show_spinner="Daten werden geladen …", max_entries=2)
+def get(path: str, version: str) -> Daten:
+    """Daten einer Datenversion (einmal pro Prozess)."""
+    columns = [c for c in triplestore.load_manifest(path)["columns"] if c not in triplestore.SENTENCE_COLUMNS]
+    df = triplestore.read_triples(path, columns=columns)
+    # Fehlende Spalten meldet die jeweilige Seite selbst
+    locs = geo.locations(df) if LOCATION_COLUMNS.issubset(df.columns) else df.iloc[0:0].assign(__cat="")
+    return Daten(
+        version=version,
+        triples=df,
+        locations=locs,
+        subj_types=_distinct(df, "subjekt_type"),
+        obj_types=_distinct(df, "objekt_type"),
+        predicates=_distinct(df, "prädikat"),
+        loc_categories=sorted(locs["__cat"].unique()),
+        zeit_index=zeit.ZeitIndex(*(df[c] if c in df.columns else [None] * len(df)
+                                    for c in triplestore.DERIVED_COLUMNS)),
+    )
+
+
+@st.cache_resource(show_spinner="Suchindex wird aufgebaut …", max_entries=2)
+def search_index(path: str, version: str) -> search.NodeSearch:
+    """Suchindex über Knotennamen, Schreibvarianten und Satztexte (einmal pro Datenversion)."""
+    return search.build(triplestore.read_triples(path, columns=["subjekt", "objekt", "text"]),
+                        aliases=dedup.aliases(dedup.load_mapping(ENTITIES)))
+
+
+@st.cache_resource(show_spinner="Reiserouten werden berechnet …", max_entries=2)
+def routes(path: str, version: str) -> pd.DataFrame:
+    """Reiserouten der Datenversion (gespeichert im Triple-Speicher, sonst berechnet)."""
+    return routen.update_routes(path)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def time_mask(path: str, version: str, window: tuple):
+    """Zeilenmaske für ein Zeitfenster ``(von, bis, ohne_datum)`` (``None`` = alle Zeilen)."""
+    if window is None:
+        return None
+    start, end, undated = window
+    return get(path, version).zeit_index.mask(start, end, undated)
+
+
+def time_window(daten: Daten):
+    """Zeitfenster in der Sidebar; ``None``, solange nichts ausgeschlossen wird."""
+    span = daten.zeit_index.span()
+    if span is None:
+        return None
+    first, last = zeit.to_date(span[0]).year, zeit.to_date(span[1]).year
+    st.sidebar.header("Zeitraum")
+    years = st.sidebar.slider("Jahre", first, last, (first, last),
+                              help="Zeigt Einträge, deren Zeitangabe (zeit) das Fenster berührt.")
+    undated = st.sidebar.checkbox("Einträge ohne Datum zeigen", value=True)
+    if years == (first, last) and undated:
+        return None
+    return zeit.day(years[0]), zeit.day(years[1], 12, 31), undated
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _version(path: str, mtime: float) -> str:
+    return triplestore.data_version(path)
+
+
+def manifest_mtime(path: str = STORE) -> float:
+    return os.path.getmtime(os.path.join(path, triplestore.MANIFEST))
+
+
+def current_version(path: str = STORE) -> str:
+    """Datenversion; das Manifest wird nur nach einer Änderung neu gelesen."""
+    return _version(path, manifest_mtime(path))
+
+
+def load(path: str = STORE) -> Daten:
+    """Daten für die Seite; hält die Seite mit einer Meldung an, wenn der Speicher fehlt."""
+    if not triplestore.exists(path):
+        st.error("Triple-Speicher nicht gefunden (python -m pipeline.triplestore import).")
+        ziel_ordner = os.path.join(BASE, "..", "5.4.3_EL")
+        try:
+            st.write("Inhalt von:", os.path.abspath(ziel_ordner))
+            st.code("\n".join(sorted(os.listdir(ziel_ordner))))
+        except Exception as e:
+            st.write(f"Konnte Ordner nicht lesen: {e}")
+        st.stop()
+    return get(path, current_version(path))
+
+
+def source_sidebar(daten: Daten, path: str = STORE):
+    """Sichtbare Quelle + Zeitstempel und Button zum Neuladen in der Sidebar."""
+    mtime = manifest_mtime(path)
+    st.sidebar.caption(
+        f"Quelle: {path} (Version {daten.version}) — Stand: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(mtime))}"
+    )
+    if st.sidebar.button("Daten neu laden"):
+        st.cache_data.clear()
+        get.clear()
+        st.rerun()
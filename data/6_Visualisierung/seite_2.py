@@ -1,12 +1,11 @@
 import streamlit as st
 st.set_page_config(layout="wide", page_title="Visualisierung")
 
-import pandas as pd
-import networkx as nx
+import pyvis
 from pyvis.network import Network
-from collections import defaultdict
 import os
-import time
+import re
+import shutil
 
 # ---------- Styles ----------
 st.markdown("""
@@ -37,37 +36,17 @@ section[data-testid="stSidebar"] div[data-baseweb="tag"] { max-width: 100% !impo
 st.markdown('<div class="hyphenate" lang="de"><h1>Visualisierung</h1></div>', unsafe_allow_html=True)
 st.divider()
 
-# ---------- Daten laden ----------
-BASE = os.path.dirname(os.path.abspath(__file__))
-XLSX = os.path.normpath(os.path.join(BASE, "..", "5.4.3_EL", "graphen_bereinigt.xlsx"))
-
-if not os.path.exists(XLSX):
-    st.error("Datei nicht gefunden.")
-    ziel_ordner = os.path.join(BASE, "..", "5.4.3_EL")
-    try:
-        st.write("Inhalt von:", os.path.abspath(ziel_ordner))
-        st.code("\n".join(sorted(os.listdir(ziel_ordner))))
-    except Exception as e:
-        st.write(f"Konnte Ordner nicht lesen: {e}")
-    st.stop()
-
-# --- Cache an die Datei-Änderungszeit binden (Cache-Key = (path, mtime)) ---
-@st.cache_data(show_spinner=False)
-def load_df(path: str, mtime: float) -> pd.DataFrame:
-    return pd.read_excel(path)
+# ---------- Daten laden (gemeinsam für alle Seiten, neu bei geänderter Datenversion) ----------
+import daten
+from pipeline import graph
 
-mtime = os.path.getmtime(XLSX)
-df = load_df(XLSX, mtime)
+STORE = daten.STORE
+d = daten.load()
+version = d.version
+df = d.triples
 
-# Sichtbare Quelle + Zeitstempel
-st.sidebar.caption(
-    f"Quelle: {os.path.abspath(XLSX)} — Stand: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(mtime))}"
-)
-
-# Manueller Reload-Button
-if st.sidebar.button("Daten neu laden"):
-    st.cache_data.clear()
-    st.rerun()
+# Sichtbare Quelle + Zeitstempel, manueller Reload-Button
+daten.source_sidebar(d)
 
 # ---------- Spalten robust ermitteln ----------
 needed = {"subjekt", "subjekt_type", "prädikat", "objekt", "objekt_type"}
@@ -86,60 +65,77 @@ o_type_col = cols_map["objekt_type"]
 st.sidebar.header("Filter")
 viz_h = st.sidebar.slider("Höhe Visualisierung (px)", 600, 2000, 1000, 50)
 
-subj_types_all = sorted(df[s_type_col].dropna().astype(str).unique())
-obj_types_all  = sorted(df[o_type_col].dropna().astype(str).unique())
-preds_all      = sorted(df[p_col].dropna().astype(str).unique())
+subj_types_all = d.subj_types
+obj_types_all  = d.obj_types
+preds_all      = d.predicates
 
 sel_subj_types = st.sidebar.multiselect("Subjekt-Typen", subj_types_all, default=subj_types_all)
 sel_obj_types  = st.sidebar.multiselect("Objekt-Typen",  obj_types_all,  default=obj_types_all)
 sel_preds      = st.sidebar.multiselect("Prädikate",      preds_all,      default=preds_all)
-node_query     = st.sidebar.text_input("Knoten-Suche (optional, enthält)")
-
-# ---------- DataFrame filtern ----------
-f = df[
-    df[s_type_col].astype(str).isin(sel_subj_types) &
-    df[o_type_col].astype(str).isin(sel_obj_types) &
-    df[p_col].astype(str).isin(sel_preds)
-].copy()
-
-if node_query:
-    q = node_query.strip().lower()
-    mask = (
-        f[s_col].astype(str).str.lower().str.contains(q) |
-        f[o_col].astype(str).str.lower().str.contains(q)
-    )
-    f = f[mask]
+node_query     = st.sidebar.text_input("Knoten-Suche (optional, enthält)",
+                                       help="Findet auch Schreibvarianten (ſ, Umlaute, Bonaß/Bonatz).")
+in_text        = st.sidebar.checkbox("Auch im Satztext suchen", disabled=not node_query)
+window         = daten.time_window(d)
 
-st.caption(f"Gefiltert: {len(f)} Kanten")
-
-# ---------- Typ-Normalisierung ----------
+# ---------- Filtern + Graph bauen (gecached je Filterauswahl) ----------
 def norm_type(x: str) -> str:
     return (x or "").strip().lower()
 
-# ---------- Knoten-Typen sammeln (Mehrfach-Typen unterstützen) ----------
-node_types = defaultdict(set)
-for _, r in f[[s_col, s_type_col, o_col, o_type_col]].dropna(subset=[s_col, o_col]).iterrows():
-    node_types[str(r[s_col])].add(norm_type(str(r[s_type_col])))
-    node_types[str(r[o_col])].add(norm_type(str(r[o_type_col])))
-
-def group_for(node: str) -> str:
-    ts = sorted(t for t in node_types.get(node, set()) if t and t != "nan")
-    if not ts:
-        return "unbekannt"
-    if len(ts) == 1:
-        return ts[0]
-    return "gemischt"
-
-def tooltip_for(node: str) -> str:
-    ts = sorted(node_types.get(node, set()))
-    pretty = ", ".join(ts) if ts else "n/a"
-    return f"{node} — Typ(en): {pretty}"
-
-# ---------- Graph bauen ----------
-G = nx.DiGraph()
-for _, row in f[[s_col, p_col, o_col]].dropna(subset=[s_col, o_col]).iterrows():
-    s, p, o = str(row[s_col]), str(row[p_col]), str(row[o_col])
-    G.add_edge(s, o, label=p)  # Nodes entstehen implizit
+@st.cache_data(show_spinner=False, max_entries=64)
+def build_view(path: str, version: str, cols: tuple, sel_subj_types: tuple, sel_obj_types: tuple,
+               sel_preds: tuple, node_search: tuple, window: tuple):
+    s_col, s_type_col, p_col, o_col, o_type_col = cols
+    node_query, in_text = node_search
+    f = graph.filter_triples(daten.get(path, version).triples, s_col, s_type_col, p_col, o_col, o_type_col,
+                             sel_subj_types, sel_obj_types, sel_preds, node_query,
+                             index=daten.search_index(path, version) if node_query else None, in_text=in_text,
+                             keep=daten.time_mask(path, version, window))
+    G = graph.build_graph(f, s_col, p_col, o_col)
+    nodes = graph.node_table(f, s_col, s_type_col, o_col, o_type_col).reindex(list(G.nodes()))
+    return len(f), G, nodes
+
+# ---------- Layout: einmal je Datenversion auf dem Server (layout.parquet im Speicher) ----------
+@st.cache_resource(show_spinner="Layout wird berechnet …")
+def stored_layout(path: str, version: str) -> dict:
+    return graph.update_layout(path)
+
+# ---------- Großansicht: Stichprobe, Gemeinschaften ----------
+LARGE_GRAPH = 1000  # ab so vielen Knoten ist die Großansicht voreingestellt
+SAMPLING = {"alle": "Alle Knoten", "grad": "Höchster Grad", "k-kern": "k-Kern", "ego": "Ego-Netz"}
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def sampled_view(path: str, version: str, cols: tuple, sel_subj_types: tuple, sel_obj_types: tuple,
+                 sel_preds: tuple, node_search: tuple, window: tuple, method: str, budget: int, center: str):
+    _, G, nodes = build_view(path, version, cols, sel_subj_types, sel_obj_types, sel_preds, node_search, window)
+    if method != "alle":
+        G = graph.sample(G, method, budget, center)
+    return G, nodes.reindex(list(G))
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def sampled_communities(path: str, version: str, cols: tuple, sel_subj_types: tuple, sel_obj_types: tuple,
+                        sel_preds: tuple, node_search: tuple, window: tuple, method: str, budget: int,
+                        center: str) -> dict:
+    # Nur für zusammengefasste Gemeinschaften nötig
+    G, _ = sampled_view(path, version, cols, sel_subj_types, sel_obj_types, sel_preds, node_search, window,
+                        method, budget, center)
+    return graph.communities(G)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def large_view(path: str, version: str, cols: tuple, sel_subj_types: tuple, sel_obj_types: tuple,
+               sel_preds: tuple, node_search: tuple, window: tuple, method: str, budget: int, center: str,
+               collapse: bool, expanded: tuple):
+    G, nodes = sampled_view(path, version, cols, sel_subj_types, sel_obj_types, sel_preds,
+                            node_search, window, method, budget, center)
+    pos = stored_layout(path, version)
+    if collapse:
+        membership = sampled_communities(path, version, cols, sel_subj_types, sel_obj_types, sel_preds,
+                                         node_search, window, method, budget, center)
+        G, nodes = graph.collapse(G, nodes, membership, expanded)
+        # Nur die Superknoten (Start im Schwerpunkt ihrer Mitglieder) werden nachrelaxiert
+        init = {n: pos[n] for n in G if n in pos}
+        init.update(graph.super_positions(membership, pos, expanded))
+        pos = graph.layout(G, pos=init, fixed=[n for n in G if n in pos])
+    return G, nodes, pos
 
 # ---------- Farbzuordnung + Legende (eine Quelle für beides) ----------
 COLOR_PRESET = {
@@ -152,13 +148,11 @@ COLOR_PRESET = {
     "tätigkeit":    "#76b7b2",
     "gemischt":     "#9e9e9e",
     "unbekannt":    "#bab0ac",
+    "gemeinschaft": "#d3d3d3",
 }
 def color_for(group: str) -> str:
     return COLOR_PRESET.get(norm_type(group), "#7f7f7f")
 
-groups_in_use = sorted({group_for(n) for n in G.nodes()})
-group_colors = {g: color_for(g) for g in groups_in_use}
-
 def legend_html(group_colors: dict) -> str:
     items = "".join(
         f'<div class="legend-item"><span class="legend-color" style="background:{c}"></span>{g}</div>'
@@ -176,44 +170,123 @@ def legend_html(group_colors: dict) -> str:
     <div class="legend">{items}</div>
     """
 
-st.markdown(legend_html(group_colors), unsafe_allow_html=True)
+# ---------- PyVis rendern (LRU-Cache je Filterauswahl + Höhe) ----------
+# vis.js wird nicht mehr in jedes HTML eingebettet (cdn_resources="remote");
+# die Seite bindet es aus static/ ein, der Download behält die CDN-Links.
+@st.cache_data(show_spinner=False, max_entries=32)
+def render_view(path: str, version: str, cols: tuple, sel_subj_types: tuple, sel_obj_types: tuple,
+                sel_preds: tuple, node_search: tuple, window: tuple, height: int, lod: tuple = None):
+    n_edges, G, nodes = build_view(path, version, cols, sel_subj_types, sel_obj_types, sel_preds, node_search, window)
+    # Feste Positionen aus dem gespeicherten Layout, keine Physik im Browser
+    pos = stored_layout(path, version)
+    if lod is not None:
+        G, nodes, pos = large_view(path, version, cols, sel_subj_types, sel_obj_types, sel_preds,
+                                   node_search, window, *lod)
+    groups_in_use = sorted(nodes["group"].unique())
+    group_colors = {g: color_for(g) for g in groups_in_use}
+
+    physics = '{"enabled": false}' if pos else """{
+        "barnesHut": {"gravitationalConstant": -15000, "springLength": 260, "springConstant": 0.02},
+        "stabilization": {"enabled": true, "iterations": 200}
+      }"""
+
+    net = Network(height=f"{height}px", width="100%", directed=True, cdn_resources="remote")
+
+    # Gruppenfarben an vis.js übergeben, damit Graph = Legende
+    group_opts = ",\n".join([f'"{g}": {{"color": "{c}"}}' for g, c in group_colors.items()])
+    net.set_options(f"""
+    {{
+      "nodes": {{"size": 28, "borderWidth": 2, "font": {{"size": 22}}}},
+      "edges": {{
+        "width": 2,
+        "smooth": false,
+        "arrows": {{"to": {{"enabled": true, "scaleFactor": 0.8}}}},
+        "font": {{"size": 16, "align": "top"}}
+      }},
+      "interaction": {{"zoomView": true, "dragView": true}},
+      "physics": {physics},
+      "layout": {{"improvedLayout": {"false" if pos else "true"}}},
+      "groups": {{ {group_opts} }}
+    }}
+    """)
+
+    # --- Knoten & Kanten direkt als Listen; Farbe kommt aus "group" ---
+    # (Network.add_node/add_edge prüfen bei jedem Aufruf alle vorhandenen Knoten)
+    net.nodes = [{"id": n, "label": n, "title": title, "group": g, "shape": "dot"}
+                 for n, title, g in zip(nodes.index, nodes["title"], nodes["group"])]
+    if pos:
+        labels = nodes["label"] if "label" in nodes else nodes.index
+        sizes = nodes["size"] if "size" in nodes else [28] * len(nodes)
+        for node, label, size in zip(net.nodes, labels, sizes):
+            node["x"], node["y"] = pos[node["id"]]
+            node["label"], node["size"] = label, int(size)
+    net.node_ids = list(nodes.index)
+    net.node_map = {node["id"]: node for node in net.nodes}
+    net.edges = [{"from": u, "to": v, "label": str(edata.get("label", "")), "arrows": "to"}
+                 for u, v, edata in G.edges(data=True)]
+    return n_edges, (len(G), G.number_of_edges()), group_colors, net.generate_html()
+
+# vis.js einmal als statische Datei ausliefern (server.enableStaticServing)
+STATIC = os.path.join(daten.BASE, "static")
+VIS_LIB = os.path.join(os.path.dirname(pyvis.__file__), "lib", "vis-9.1.2")
+VIS_ASSETS = {
+    "vis-network.min.js": re.compile(r'<script src="https://cdnjs[^"]*/vis-network\.min\.js"[^>]*></script>'),
+    "vis-network.css": re.compile(r'<link rel="stylesheet" href="https://cdnjs[^"]*/vis-network\.min\.css"[^>]*/>'),
+}
 
-# ---------- PyVis erzeugen (Gruppenfarben explizit übergeben) ----------
-net = Network(height=f"{viz_h}px", width="100%", directed=True, cdn_resources="in_line")
-
-# Gruppenfarben an vis.js übergeben, damit Graph = Legende
-group_opts = ",\n".join([f'"{g}": {{"color": "{c}"}}' for g, c in group_colors.items()])
-net.set_options(f"""
-{{
-  "nodes": {{"size": 28, "borderWidth": 2, "font": {{"size": 22}}}},
-  "edges": {{
-    "width": 2,
-    "smooth": false,
-    "arrows": {{"to": {{"enabled": true, "scaleFactor": 0.8}}}},
-    "font": {{"size": 16, "align": "top"}}
-  }},
-  "interaction": {{"zoomView": true, "dragView": true}},
-  "physics": {{
-    "barnesHut": {{"gravitationalConstant": -15000, "springLength": 260, "springConstant": 0.02}},
-    "stabilization": {{"enabled": true, "iterations": 200}}
-  }},
-  "groups": {{ {group_opts} }}
-}}
-""")
-
-# --- Knoten & Kanten hinzufügen; Farbe kommt aus "group" ---
-for n in G.nodes():
-    g = group_for(n)  # z. B. "datum", "person", "weg", ...
-    net.add_node(n, label=n, title=tooltip_for(n), group=g)
-
-for u, v, edata in G.edges(data=True):
-    net.add_edge(u, v, label=str(edata.get("label", "")))
+@st.cache_resource
+def static_assets() -> bool:
+    """vis.js aus dem pyvis-Paket nach static/ kopieren; False, wenn nicht auslieferbar."""
+    if not st.get_option("server.enableStaticServing"):
+        return False
+    os.makedirs(STATIC, exist_ok=True)
+    for name in VIS_ASSETS:
+        src, dst = os.path.join(VIS_LIB, name), os.path.join(STATIC, name)
+        if not os.path.exists(dst) or os.path.getsize(dst) != os.path.getsize(src):
+            shutil.copyfile(src, dst + ".tmp")
+            os.replace(dst + ".tmp", dst)
+    return True
+
+def with_static_assets(html: str) -> str:
+    html = VIS_ASSETS["vis-network.min.js"].sub('<script src="app/static/vis-network.min.js"></script>', html, count=1)
+    return VIS_ASSETS["vis-network.css"].sub('<link rel="stylesheet" href="app/static/vis-network.css" />', html, count=1)
+
+cols = (s_col, s_type_col, p_col, o_col, o_type_col)
+view = (STORE, version, cols, tuple(sel_subj_types), tuple(sel_obj_types), tuple(sel_preds),
+        (node_query, in_text), window)
+
+# ---------- Sidebar: Großansicht ----------
+_, G_full, _ = build_view(*view)
+st.sidebar.header("Große Netzwerke")
+large = st.sidebar.toggle("Großansicht (Stichproben, Gemeinschaften)", value=len(G_full) > LARGE_GRAPH)
+lod = None
+if large:
+    method = st.sidebar.selectbox("Stichprobe", list(SAMPLING), format_func=SAMPLING.get)
+    budget = int(st.sidebar.number_input("Knotenbudget", 50, 20000, 500, 50, disabled=method == "alle"))
+    center = None
+    if method == "ego":
+        by_degree = sorted(G_full, key=lambda n: -G_full.degree(n))
+        center = st.sidebar.selectbox("Ego-Zentrum", by_degree)
+    collapse = st.sidebar.checkbox("Gemeinschaften zu Superknoten zusammenfassen")
+    expanded = ()
+    if collapse:
+        membership = sampled_communities(*view, method, budget, center)
+        expanded = tuple(st.sidebar.multiselect(
+            "Gemeinschaften aufklappen", sorted(set(membership.values())), format_func=graph.community_id,
+        ))
+    lod = (method, budget, center, collapse, expanded)
+
+n_edges, (n_shown, e_shown), group_colors, html = render_view(*view, viz_h, lod)
+
+st.caption(f"Gefiltert: {n_edges} Kanten")
+if lod is not None:
+    st.caption(f"Angezeigt: {n_shown} Knoten, {e_shown} Kanten (von {len(G_full)} Knoten)")
+st.markdown(legend_html(group_colors), unsafe_allow_html=True)
 
 # ---------- Rendern ----------
-html = net.generate_html()
-st.components.v1.html(html, height=viz_h, scrolling=True)
+st.components.v1.html(with_static_assets(html) if static_assets() else html, height=viz_h, scrolling=True)
 
-# Download in der Sidebar
+# Download in der Sidebar (gecachtes HTML; vis.js per CDN, damit die Datei eigenständig ist)
 st.sidebar.download_button(
     "Graph als HTML herunterladen",
     data=html,
@@ -1,11 +1,7 @@
 import streamlit as st
 st.set_page_config(layout="wide", page_title="karte")
 
-import pandas as pd
-import folium
-from folium.plugins import MarkerCluster
 from streamlit.components.v1 import html
-import os
 
 # ---------- Styles ----------
 st.markdown("""
@@ -36,25 +32,14 @@ section[data-testid="stSidebar"] div[data-baseweb="tag"] { max-width: 100% !impo
 st.markdown('<div class="hyphenate" lang="de"><h1>Visualisierung</h1></div>', unsafe_allow_html=True)
 st.divider()
 
-# ---------- Daten laden ----------
-BASE = os.path.dirname(os.path.abspath(__file__))
-XLSX = os.path.normpath(os.path.join(BASE, "..", "5.4.3_EL", "graphen_bereinigt.xlsx"))
-
-if not os.path.exists(XLSX):
-    st.error("Datei nicht gefunden.")
-    ziel_ordner = os.path.join(BASE, "..", "5.4.3_EL")
-    try:
-        st.write("Inhalt von:", os.path.abspath(ziel_ordner))
-        st.code("\n".join(sorted(os.listdir(ziel_ordner))))
-    except Exception as e:
-        st.write(f"Konnte Ordner nicht lesen: {e}")
-    st.stop()
-
-@st.cache_data(show_spinner=False)
-def load_df(path):
-    return pd.read_excel(path)
+# ---------- Daten laden (gemeinsam für alle Seiten, neu bei geänderter Datenversion) ----------
+import daten
+from pipeline import geo, routen
 
-df = load_df(XLSX) 
+STORE = daten.STORE
+d = daten.load()
+version = d.version
+df = d.triples
 
 # ---------- Prüfen, ob nötige Spalten existieren ----------
 required_cols = {"objekt_type", "lat", "lon", "prädikat"}
@@ -66,28 +51,16 @@ if missing:
 # ---------- Orte auf Karte (objekt_type == "location"; Farbe/Filter nach "prädikat") ----------
 st.subheader("Orte auf der Karte (farblich & filterbar nach »prädikat«)")
 
-# 1) Filtern & bereinigen (nur Locations)
-locs = df[df["objekt_type"].astype(str).str.lower().eq("location")].copy()
-for col in ["lat", "lon"]:
-    locs[col] = pd.to_numeric(locs[col], errors="coerce")
-locs = locs.dropna(subset=["lat", "lon"])
-locs = locs[locs["lat"].between(-90, 90) & locs["lon"].between(-180, 180)]
+# 1) Filtern & bereinigen (nur Locations, vorberechnet)
+locs = d.locations
 
 if locs.empty:
     st.warning("Keine gültigen Orte gefunden (objekt_type='location' mit lat/lon).")
     st.stop()
 
 # 2) Kategorien + Farben einmalig festlegen (stabile Farben)
-locs["__cat"] = locs["prädikat"].fillna("Unbekannt").astype(str)
-unique_all = sorted(locs["__cat"].unique())
-palette = [
-    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
-    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
-    "#393b79", "#637939", "#8c6d31", "#843c39", "#7b4173",
-    "#3182bd", "#e6550d", "#31a354", "#756bb1", "#636363"
-]
-color_map = {cat: palette[i % len(palette)] for i, cat in enumerate(unique_all)}
-locs["__color"] = locs["__cat"].map(color_map)
+unique_all = d.loc_categories
+color_map = geo.color_map(unique_all)
 
 # 3) Sidebar-Filter
 st.sidebar.header("Filter")
@@ -102,55 +75,43 @@ if not selected:
     st.info("Bitte mindestens eine Kategorie im Filter wählen.")
     st.stop()
 
-locs_f = locs[locs["__cat"].isin(selected)].copy()
-
-# 4) Karte bauen
-center = [float(locs_f["lat"].median()), float(locs_f["lon"].median())]
-m = folium.Map(
-    location=center,
-    zoom_start=5,
-    tiles="OpenStreetMap",
-    control_scale=True,
-    width="100%",
-    height="100%"
-)
-
-cluster = MarkerCluster(name="Orte").add_to(m)
-
-# 5) Marker erzeugen
-popup_cols = [c for c in ["prädikat", "objekt_type"] if c in locs_f.columns]
-
-for _, row in locs_f.iterrows():
-    tooltip = f"{row.get('prädikat', '—')}"
-    html_info = "<b>Info</b><br>" + "<br>".join(
-        f"<b>{c}:</b> {row.get(c, '')}" for c in popup_cols
-    )
-    folium.CircleMarker(
-        location=[row["lat"], row["lon"]],
-        radius=6,
-        weight=1,
-        fill=True,
-        fill_opacity=0.9,
-        color=row["__color"],
-        fill_color=row["__color"],
-        tooltip=tooltip,
-        popup=folium.Popup(html_info, max_width=300),
-    ).add_to(cluster)
-
-# 6) Legende (nur ausgewählte Kategorien anzeigen, Farben bleiben stabil)
-legend_html = """<div style="position: fixed; bottom: 20px; left: 20px; z-index:9999;
-background: white; padding: 10px 14px; border:1px solid #ddd; border-radius: 8px;
-box-shadow: 0 2px 10px rgba(0,0,0,.1); font-size:14px; max-height: 50vh; overflow:auto;">
-<b>Prädikat</b><br>{items}</div>"""
-items = "".join(
-    f'<span style="display:inline-block;width:12px;height:12px;background:{color_map[c]};'
-    f'margin-right:8px;border-radius:50%;"></span>{c}<br>'
-    for c in selected
-)
-m.get_root().html.add_child(folium.Element(legend_html.format(items=items)))
+# Zeitfenster über zeit_von/zeit_bis (Zeit-Index, keine Textsuche)
+window = daten.time_window(d)
+
+# Reiserouten je Person: einmal je Datenversion vorberechnet (pipeline.routen)
+show_routes = st.sidebar.checkbox("Reiserouten zeigen", value=True,
+                                  help="Stationen je Person nach Zeitangabe verbunden; "
+                                       "gezeichnet werden nur Routen im sichtbaren Kartenausschnitt.")
+
+# 4) Karte bauen (gecached je Prädikat-Auswahl): gleiche Punkte zusammengefasst,
+#    eine FastMarkerCluster-Ebene, Popups entstehen erst beim Anklicken
+@st.cache_data(show_spinner=False, max_entries=32)
+def render_map(path: str, version: str, selected: tuple, window: tuple, show_routes: bool):
+    locs = daten.get(path, version).locations
+    locs_f = locs[locs["__cat"].isin(selected)]
+    keep = daten.time_mask(path, version, window)
+    if keep is not None:
+        # Ortszeilen behalten die Zeilennummern der Triple-Tabelle
+        locs_f = locs_f[keep[locs_f.index]]
+    if locs_f.empty:
+        return 0, 0, None
+    routes = None
+    if show_routes:
+        routes = daten.routes(path, version)
+        if window is not None:
+            routes = routen.in_window(routes, *window)
+    points, _ = geo.aggregate(locs_f)
+    m = geo.build_map(points, geo.color_map(locs["__cat"].unique()), selected, tooltips=points["__cat"],
+                      routes=routes)
+    return len(locs_f), 0 if routes is None else len(routes), m.get_root().render()
+
+n_locs, n_routes, map_html = render_map(STORE, version, tuple(selected), window, show_routes)
+if map_html is None:
+    st.info("Keine Orte im gewählten Zeitraum.")
+    st.stop()
 
-# 7) Karte einbetten
-map_html = m.get_root().render()
+# 5) Karte einbetten
 html(map_html, height=650, scrolling=False)
 
-st.caption(f"{len(locs_f):,} Orte dargestellt • {len(selected)} ausgewählte Kategorie(n)")
+st.caption(f"{n_locs:,} Orte dargestellt • {len(selected)} ausgewählte Kategorie(n)"
+           + (f" • {n_routes} Reiserouten" if show_routes else ""))
@@ -1,10 +1,9 @@
 import streamlit as st
 st.set_page_config(layout="wide", page_title="karte")
 
-import pandas as pd
-import folium
-from folium.plugins import MarkerCluster
 from streamlit.components.v1 import html
+import glob
+import json
 import os
 
 # ---------- Styles ----------
@@ -37,25 +36,14 @@ section[data-testid="stSidebar"] div[data-baseweb="tag"] { max-width: 100% !impo
 st.markdown('<div class="hyphenate" lang="de"><h1>Visualisierung</h1></div>', unsafe_allow_html=True)
 st.divider() 
 
-# ---------- Daten laden ----------
-BASE = os.path.dirname(os.path.abspath(__file__))
-XLSX = os.path.normpath(os.path.join(BASE, "..", "5.4.3_EL", "graphen_bereinigt.xlsx"))
-
-if not os.path.exists(XLSX):
-    st.error("Datei nicht gefunden.")
-    ziel_ordner = os.path.join(BASE, "..", "5.4.3_EL")
-    try:
-        st.write("Inhalt von:", os.path.abspath(ziel_ordner))
-        st.code("\n".join(sorted(os.listdir(ziel_ordner))))
-    except Exception as e:
-        st.write(f"Konnte Ordner nicht lesen: {e}")
-    st.stop()
-
-@st.cache_data(show_spinner=False)
-def load_df(path):
-    return pd.read_excel(path)
+# ---------- Daten laden (gemeinsam für alle Seiten, neu bei geänderter Datenversion) ----------
+import daten
+from pipeline import geo
 
-df = load_df(XLSX)
+STORE = daten.STORE
+d = daten.load()
+version = d.version
+df = d.triples
 
 # ---------- Prüfen, ob nötige Spalten existieren ----------
 required_cols = {"objekt_type", "lat", "lon", "prädikat", "subjekt"}
@@ -67,28 +55,16 @@ if missing:
 # ---------- Orte auf Karte (objekt_type == "location"; Farbe/Filter nach "prädikat") ----------
 st.subheader("Orte auf der Karte (farblich & filterbar nach »prädikat«)")
 
-# 1) Filtern & bereinigen (nur Locations)
-locs = df[df["objekt_type"].astype(str).str.lower().eq("location")].copy()
-for col in ["lat", "lon"]:
-    locs[col] = pd.to_numeric(locs[col], errors="coerce")
-locs = locs.dropna(subset=["lat", "lon"])
-locs = locs[locs["lat"].between(-90, 90) & locs["lon"].between(-180, 180)]
+# 1) Filtern & bereinigen (nur Locations, vorberechnet)
+locs = d.locations
 
 if locs.empty:
     st.warning("Keine gültigen Orte gefunden (objekt_type='location' mit lat/lon).")
     st.stop()
 
 # 2) Kategorien + Farben einmalig festlegen (stabile Farben)
-locs["__cat"] = locs["prädikat"].fillna("Unbekannt").astype(str)
-unique_all = sorted(locs["__cat"].unique())
-palette = [
-    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
-    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
-    "#393b79", "#637939", "#8c6d31", "#843c39", "#7b4173",
-    "#3182bd", "#e6550d", "#31a354", "#756bb1", "#636363"
-]
-color_map = {cat: palette[i % len(palette)] for i, cat in enumerate(unique_all)}
-locs["__color"] = locs["__cat"].map(color_map)
+unique_all = d.loc_categories
+color_map = geo.color_map(unique_all)
 
 # 3) Sidebar-Filter
 st.sidebar.header("Filter")
@@ -103,81 +79,66 @@ if not selected:
     st.info("Bitte mindestens eine Kategorie im Filter wählen.")
     st.stop()
 
-locs_f = locs[locs["__cat"].isin(selected)].copy()
-
-# 3a) Personen pro Ort zusammenfassen (falls mehrere Zeilen je Koordinate)
-def normalize_subject(x):
-    s = str(x).strip()
-    return s if s and s.lower() not in {"nan", "none"} else None
-
-locs_f["subjekt_norm"] = locs_f["subjekt"].map(normalize_subject)
-
-grouped = (
-    locs_f.groupby(["lat", "lon", "__cat"], as_index=False)
-          .agg(
-              subjekt_list=("subjekt_norm", lambda s: sorted({v for v in s if v})),
-              objekt_type=("objekt_type", "first")
-          )
-)
-grouped["__color"] = grouped["__cat"].map(color_map)
-grouped["person_count"] = grouped["subjekt_list"].apply(len)
-
-# 4) Karte bauen
-center = [float(locs_f["lat"].median()), float(locs_f["lon"].median())]
-m = folium.Map(
-    location=center,
-    zoom_start=5,
-    tiles="OpenStreetMap",
-    control_scale=True,
-    width="100%",
-    height="100%"
-)
-
-cluster = MarkerCluster(name="Orte").add_to(m)
-
-# 5) Marker erzeugen (mit Personenliste im Popup)
-for _, row in grouped.iterrows():
-    persons = row["subjekt_list"]
-    persons_html = (
-        "<i>keine Person angegeben</i>" if not persons
-        else "<br>".join(f"• {p}" for p in persons)
-    )
-
-    tooltip = f"{row['__cat']} — {row['person_count']} Person(en)"
-    html_info = f"""
-    <b>Info</b><br>
-    <b>prädikat:</b> {row['__cat']}<br>
-    <b>objekt_type:</b> {row['objekt_type']}<br>
-    <b>Person(en):</b><br>
-    {persons_html}
-    """
-
-    folium.CircleMarker(
-        location=[row["lat"], row["lon"]],
-        radius=6,
-        weight=1,
-        fill=True,
-        fill_opacity=0.9,
-        color=row["__color"],
-        fill_color=row["__color"],
-        tooltip=tooltip,
-        popup=folium.Popup(html_info, max_width=320),
-    ).add_to(cluster)
-
-# 6) Legende (nur ausgewählte Kategorien anzeigen, Farben bleiben stabil)
-legend_html = """<div style="position: fixed; bottom: 20px; left: 20px; z-index:9999;
-background: white; padding: 10px 14px; border:1px solid #ddd; border-radius: 8px;
-box-shadow: 0 2px 10px rgba(0,0,0,.1); font-size:14px; max-height: 50vh; overflow:auto;">
-<b>Prädikat</b><br>{items}</div>"""
-items = "".join(
-    f'<span style="display:inline-block;width:12px;height:12px;background:{color_map[c]};'
-    f'margin-right:8px;border-radius:50%;"></span>{c}<br>'
-    for c in selected
-)
-m.get_root().html.add_child(folium.Element(legend_html.format(items=items)))
+# Zeitfenster über zeit_von/zeit_bis (Zeit-Index, keine Textsuche)
+window = daten.time_window(d)
+
+# 4) Personen pro Ort zusammenfassen und Karte bauen (gecached je Prädikat-Auswahl).
+#    Die Personenlisten stehen nicht in den Popups, sondern werden beim Anklicken
+#    aus static/ nachgeladen (server.enableStaticServing), sonst einmal eingebettet.
+#    Nachgeladen wird eine Datei je Datenversion mit allen Punkten; mit Zeitfenster
+#    hängen die Listen vom Fenster ab und werden eingebettet.
+STATIC = os.path.join(daten.BASE, "static")
+
+def point_keys(points):
+    return points["lat"].astype(str) + "|" + points["lon"].astype(str) + "|" + points["__cat"].astype(str)
+
+@st.cache_resource(show_spinner=False)
+def persons_file(path: str, version: str) -> str:
+    """Personen je Punkt (Schlüssel ``lat|lon|Kategorie``) für diese Version; ältere Dateien werden gelöscht."""
+    name = f"personen-{version}.json"
+    target = os.path.join(STATIC, name)
+    if not os.path.exists(target):
+        points, persons = geo.aggregate(daten.get(path, version).locations, persons=True)
+        os.makedirs(STATIC, exist_ok=True)
+        with open(target + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(dict(zip(point_keys(points), persons)), f, ensure_ascii=False)
+        os.replace(target + ".tmp", target)
+    for old in glob.glob(os.path.join(STATIC, "personen-*.json")):
+        if os.path.basename(old) != name:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return f"app/static/{name}"
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def render_map(path: str, version: str, selected: tuple, window: tuple):
+    locs = daten.get(path, version).locations
+    locs_f = locs[locs["__cat"].isin(selected)]
+    keep = daten.time_mask(path, version, window)
+    if keep is not None:
+        # Ortszeilen behalten die Zeilennummern der Triple-Tabelle
+        locs_f = locs_f[keep[locs_f.index]]
+    if locs_f.empty:
+        return 0, None
+    points, persons = geo.aggregate(locs_f, persons=True)
+    tooltips = points["__cat"] + " — " + points["person_count"].astype(str) + " Person(en)"
+
+    persons_url = None
+    if keep is None and st.get_option("server.enableStaticServing"):
+        persons_url, persons = persons_file(path, version), None
+        points = points.assign(id=point_keys(points))
+
+    m = geo.build_map(points, geo.color_map(locs["__cat"].unique()), selected, tooltips,
+                      persons_url=persons_url, persons=persons)
+    return len(points), m.get_root().render()
+
+n_points, map_html = render_map(STORE, version, tuple(selected), window)
+if map_html is None:
+    st.info("Keine Orte im gewählten Zeitraum.")
+    st.stop()
 
-# 7) Karte einbetten
-map_html = m.get_root().render()
+# 5) Karte einbetten
 html(map_html, height=650, scrolling=False)
 
-st.caption(f"{len(grouped):,} Orte dargestellt • {len(selected)} ausgewählte Kategorie(n) • Personen aggregiert pro Koordinate")
+st.caption(f"{n_points:,} Orte dargestellt • {len(selected)} ausgewählte Kategorie(n) • Personen aggregiert pro Koordinate")
@@ -0,0 +1,6 @@
+"""Pipeline-Stufen von Digitalisat2Graph (OCR → Bereinigung → TEI → NER → RE → EL).
+
+Die Module ersetzen die entsprechenden Zellen in ``script.ipynb`` und werden
+von dort aus (Arbeitsverzeichnis = Repository-Wurzel) importiert.
+``python -m pipeline.make`` führt sie ohne Notebook inkrementell aus.
+"""
@@ -0,0 +1,127 @@
+"""Persistenter Schlüssel-Wert-Cache (SQLite) für die Pipeline-Stufen.
+
+Jeder Eintrag wird sofort festgeschrieben – ein abgebrochener Lauf verliert
+daher höchstens das gerade bearbeitete Element. ``put_many`` schreibt viele
+Einträge mit einem Commit (z. B. alle Absätze eines Dokuments).
+Lesezugriffe schreiben nichts (nur mit ``max_entries`` die Zugriffszeit,
+festgeschrieben beim nächsten ``put`` oder ``close``).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+def hash_key(*parts) -> str:
+    """Stabiler SHA-256-Schlüssel aus beliebigen JSON-serialisierbaren Teilen."""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 des Dateiinhalts (blockweise gelesen)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Cache:
+    """Einfacher Cache mit optionaler Größenbegrenzung (LRU) und TTL in Sekunden.
+
+    Mit ``version`` wird der Cache beim Öffnen geleert, sobald sich die
+    gespeicherte Version unterscheidet (``invalidated`` ist dann ``True``).
+    """
+
+    def __init__(self, path: str, max_entries: int | None = None, ttl: float | None = None,
+                 version: str | None = None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = False
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if version is not None:
+            row = self._db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+            if row is not None and row[0] != version:
+                self._db.execute("DELETE FROM cache")
+                self.invalidated = True
+            self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (version,))
+        self._db.commit()
+
+    def get(self, key: str, default=None):
+        row = self._db.execute(
+            "SELECT value, created FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+            self.misses += 1
+            return default
+        if self.max_entries is not None:
+            # Zugriffszeit nur für die LRU-Begrenzung; festgeschrieben mit dem nächsten put/close
+            self._db.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value) -> None:
+        self.put_many([(key, value)])
+
+    def put_many(self, items) -> None:
+        """Mehrere (Schlüssel, Wert)-Paare mit einem einzigen Commit schreiben."""
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+            ((key, json.dumps(value, ensure_ascii=False), now, now) for key, value in items),
+        )
+        if self.max_entries is not None:
+            # Am längsten nicht genutzte Einträge verwerfen
+            self._db.execute(
+                "DELETE FROM cache WHERE key IN ("
+                " SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        self._db.commit()
+
+    def __contains__(self, key: str) -> bool:
+        row = self._db.execute("SELECT created FROM cache WHERE key = ?", (key,)).fetchone()
+        return row is not None and (self.ttl is None or time.time() - row[0] <= self.ttl)
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def purge_expired(self) -> int:
+        """Abgelaufene Einträge löschen; gibt die Anzahl gelöschter Einträge zurück."""
+        if self.ttl is None:
+            return 0
+        cur = self._db.execute("DELETE FROM cache WHERE created < ?", (time.time() - self.ttl,))
+        self._db.commit()
+        return cur.rowcount
+
+    def clear(self) -> None:
+        self._db.execute("DELETE FROM cache")
+        self._db.commit()
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"Cache {self.path}: {self.hits} Treffer, {self.misses} Fehlschläge ({rate:.0%}), {len(self)} Einträge"
+
+    def close(self) -> None:
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,264 @@
+"""Bereinigung der OCR-Ergebnisse in einem einzigen Durchlauf.
+
+Alle Regeln werden zu einer einzigen Regex-Alternation kompiliert; der Text
+wird damit genau einmal gelesen, statt einmal pro Regel. Die Regeln wirken
+auf den Text nach dem Zusammenfügen getrennter Wörter und nicht auf die
+Ausgabe anderer Regeln.
+
+Vorher läuft ein eigener Durchgang, der Silbentrennungen am Zeilenende
+(``-\n``) entfernt (``JOIN_RULES``). Wie in der früheren Abfolge einzelner
+Ersetzungen sehen die Fraktur-Regeln damit das zusammengefügte Wort:
+``"fi-\nc"`` wird zu ``"sich"``, ``"i-\nc)"`` zu ``"ich"``.
+
+Welche Regelversion eine Datei erzeugt hat, steht im Manifest
+(``CLEAN_MANIFEST``). Beim nächsten Lauf werden nur Dateien bereinigt, die
+neu sind, sich seitdem geändert haben (z. B. neue OCR) oder mit einer älteren
+Regelversion bereinigt wurden.
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pipeline.cleaning
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+
+# Ordner mit den TXT-Dateien der OCR
+TXT_FOLDER = "data/5.2_OCR-Erkennung/txt"
+
+# Regelversion je Datei
+CLEAN_MANIFEST = "data/5.2_OCR-Erkennung/clean_manifest.json"
+
+# Erster Durchgang: Silbentrennung am Zeilenende entfernen (Literal, Ersetzung)
+JOIN_RULES = [
+    ("-\n", ""),
+]
+
+# (Muster, Ersetzung, ist_regex) – Formatierung/Zeilenumbrüche bleiben unangetastet
+RULES = [
+    # Punkt nach Ziffer; im Notebook erst zu ',' und anschließend durch die
+    # ','-Regel zu ' ' – hier direkt mit dem tatsächlichen Ergebnis
+    (r"(?<=\d)\.", " ", True),
+    # Typische Fraktur-Fehlerkennungen
+    ("ic)", "ich", False),
+    ("auc)", "auch", False),
+    ("nac)", "nach", False),
+    ("aud)", "auch", False),
+    ("Jh", "Ich", False),
+    ("IJ)", "Ich", False),
+    ("nad)", "nach", False),
+    ("fic", "sich", False),
+    ("i<ß", "ich", False),
+    ("ic?", "ich", False),
+    ("zurü>", "zurück", False),
+    ("durc<zumachen", "durchzumachen", False),
+    # Satzzeichen
+    ("» ", "", False),
+    ("!", " ", False),
+    ("/", " ", False),
+    ("'", " ", False),
+    (",", " ", False),
+    ("„", " ", False),
+    ("“", " ", False),
+]
+
+
+class RuleSet:
+    """Kompilierte Regeltabelle mit Versionskennung (Hash über die Regeln)."""
+
+    def __init__(self, rules=RULES, join=JOIN_RULES, max_regex_len: int = 2):
+        self.rules = [tuple(r) for r in rules]
+        self.join = [tuple(r) for r in join]
+        self.version = hashlib.sha256(
+            json.dumps([self.join, self.rules], ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:12]
+
+        # Längere Literale zuerst, damit bei gleichem Startpunkt der längste Treffer gewinnt
+        order = sorted(range(len(self.rules)), key=lambda i: (self.rules[i][2], -len(self.rules[i][0])))
+        self._replacements = [self.rules[i][1] for i in order]
+        self.pattern = re.compile("|".join(
+            f"({pat if is_regex else re.escape(pat)})" for pat, _, is_regex in (self.rules[i] for i in order)
+        ))
+        # Längster möglicher Treffer (für das Streaming); Regex-Regeln treffen
+        # höchstens ``max_regex_len`` Zeichen
+        self.max_len = max(max_regex_len if is_regex else len(pat) for pat, _, is_regex in self.rules)
+
+    def _repl(self, m: re.Match) -> str:
+        return self._replacements[m.lastindex - 1]
+
+    def _join(self, text: str) -> str:
+        for pat, repl in self.join:
+            text = text.replace(pat, repl)
+        return text
+
+    def _join_stream(self, chunks):
+        """Erster Durchgang blockweise; ein möglicher Trennungsrest am Blockende wartet auf den nächsten Block."""
+        keep = max((len(pat) for pat, _ in self.join), default=1) - 1
+        tail = ""
+        for chunk in chunks:
+            buf = tail + chunk
+            cut = len(buf)
+            # Nur zurückhalten, was Anfang eines Musters sein kann
+            for k in range(min(keep, len(buf)), 0, -1):
+                if any(pat.startswith(buf[-k:]) for pat, _ in self.join):
+                    cut = len(buf) - k
+                    break
+            tail = buf[cut:]
+            yield self._join(buf[:cut])
+        yield self._join(tail)
+
+    def clean(self, text: str) -> str:
+        if text is None:
+            return ""
+        return self.pattern.sub(self._repl, self._join(text))
+
+    def clean_stream(self, chunks):
+        """Textblöcke bereinigen, ohne den ganzen Text im Speicher zu halten.
+
+        Die Blöcke durchlaufen zuerst das Zusammenfügen getrennter Wörter. Am
+        Blockende werden ``max_len - 1`` Zeichen zurückgehalten, damit kein
+        Treffer über eine Blockgrenze verloren geht; das letzte bereits
+        verarbeitete Zeichen bleibt für Lookbehinds sichtbar.
+        """
+        keep = self.max_len - 1
+        prev, tail = "", ""
+        for chunk in self._join_stream(chunks):
+            buf = prev + tail + chunk
+            limit = len(buf) - keep
+            pos = len(prev)
+            out = []
+            for m in self.pattern.finditer(buf, pos):
+                if m.start() >= limit:
+                    break
+                out.append(buf[pos:m.start()])
+                out.append(self._repl(m))
+                pos = m.end()
+            cut = max(pos, limit)
+            out.append(buf[pos:cut])
+            yield "".join(out)
+            prev, tail = buf[max(cut - 1, 0):cut], buf[cut:]
+        # Rest ohne Rückhalt verarbeiten
+        buf = prev + tail
+        out, pos = [], len(prev)
+        for m in self.pattern.finditer(buf, pos):
+            out.append(buf[pos:m.start()])
+            out.append(self._repl(m))
+            pos = m.end()
+        out.append(buf[pos:])
+        yield "".join(out)
+
+
+DEFAULT_RULES = RuleSet()
+
+
+# Textbereinigungsfunktion
+def clean_text(text, rules: RuleSet = DEFAULT_RULES) -> str:
+    # KEINE Whitespace-Normalisierung, KEIN strip()
+    return rules.clean(text)
+
+
+def _read_chunks(f, size=1 << 16):
+    return iter(lambda: f.read(size), "")
+
+
+def _sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_manifest(path: str = CLEAN_MANIFEST) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict, path: str = CLEAN_MANIFEST) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def is_stale(rel_path: str, file_path: str, manifest: dict, rules: RuleSet = DEFAULT_RULES) -> bool:
+    entry = manifest.get(rel_path)
+    return not entry or entry.get("version") != rules.version or entry.get("sha256") != _sha256(file_path)
+
+
+def clean_file(file_path: str, rules: RuleSet = DEFAULT_RULES) -> bool:
+    """Datei blockweise bereinigen; schreibt nur, wenn sich etwas geändert hat."""
+    tmp = file_path + ".tmp"
+    src_hash, dst_hash = hashlib.sha256(), hashlib.sha256()
+
+    def tee(chunks):
+        for chunk in chunks:
+            src_hash.update(chunk.encode("utf-8"))
+            yield chunk
+
+    # Zeilenenden beibehalten: newline="" verhindert Übersetzung der Zeilenumbrüche
+    with open(file_path, "r", encoding="utf-8", newline="") as src, \
+            open(tmp, "w", encoding="utf-8", newline="") as dst:
+        for cleaned in rules.clean_stream(tee(_read_chunks(src))):
+            dst_hash.update(cleaned.encode("utf-8"))
+            dst.write(cleaned)
+
+    changed = src_hash.digest() != dst_hash.digest()
+    if changed:
+        os.replace(tmp, file_path)
+    else:
+        # Nichts geändert: Original (und Zeitstempel) unangetastet lassen
+        os.remove(tmp)
+    return changed
+
+
+def _walk(folder_path: str, folders=None):
+    if folders is None:
+        yield from os.walk(folder_path)
+        return
+    for name in sorted(folders):
+        yield from os.walk(os.path.join(folder_path, name))
+
+
+def run(folder_path: str = TXT_FOLDER, manifest_path: str = CLEAN_MANIFEST,
+        rules: RuleSet = DEFAULT_RULES, force: bool = False, folders=None):
+    """Alle veralteten TXT-Dateien bereinigen; gibt (bereinigt, übersprungen) zurück.
+
+    ``folders`` beschränkt den Lauf auf diese Unterordner (Personenordner).
+    """
+    manifest = load_manifest(manifest_path)
+    cleaned = skipped = 0
+
+    # Alle .txt-Dateien im Ordner UND in Unterordnern durchgehen
+    for root, dirs, files in _walk(folder_path, folders):
+        for filename in sorted(files):
+            if not filename.lower().endswith(".txt"):
+                continue
+            file_path = os.path.join(root, filename)
+            rel_path = os.path.relpath(file_path, folder_path).replace(os.sep, "/")
+
+            if not force and not is_stale(rel_path, file_path, manifest, rules):
+                skipped += 1
+                continue
+
+            clean_file(file_path, rules)
+            manifest[rel_path] = {"version": rules.version, "sha256": _sha256(file_path)}
+            cleaned += 1
+
+    save_manifest(manifest, manifest_path)
+    print(f"Bereinigung (Regeln {rules.version}): {cleaned} bereinigt, {skipped} aktuell")
+    return cleaned, skipped
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="OCR-Texte bereinigen (nur veraltete Dateien)")
+    ap.add_argument("--input", default=TXT_FOLDER)
+    ap.add_argument("--manifest", default=CLEAN_MANIFEST)
+    ap.add_argument("--force", action="store_true", help="alle Dateien neu bereinigen")
+    args = ap.parse_args(argv)
+    run(args.input, args.manifest, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""Zusammenführen von Schreibvarianten derselben Entität vor dem Datenabgleich (EL).
+
+OCR und Schreibweisen erzeugen Varianten wie „Johann Adolf Bonaß“ /
+„Johann Adolph Bonatz“ oder „Hoffman“ / „Hoffmann“. Jede Variante würde
+sonst einzeln bei Wikidata nachgeschlagen und als eigener Knoten gezeichnet.
+
+Die Erwähnungen aus ``triple_bereinigt.json`` werden je Typ gruppiert. Statt
+alle Paare zu vergleichen, werden Kandidaten nur innerhalb von Blöcken
+gebildet:
+
+- Kölner Phonetik des ganzen Namens
+- MinHash-LSH über Zeichen-Trigramme des vereinheitlichten Namens
+  (``search.fold``), gebündelt in Bänder
+
+Ein Kandidatenpaar wird verbunden, wenn der ganze Name ähnlich genug ist
+und zusätzlich jedes Wort (von rechts ausgerichtet, also zuerst der
+Nachname) höchstens so viele Abweichungen hat, wie seine Länge erlaubt:
+sehr kurze Wörter müssen nach ``fold`` gleich sein, kurze dürfen sich nur
+in einem Buchstaben unterscheiden (keine andere Endung). So bleiben
+„Bruder Kühnel“ / „Brüder Kühn“, „Geſchw. Tietze“ / „Geſchw. Tießen“ oder
+„Gottlieb“ / „Gottlob Martin Schneider“ getrennt.
+Überzählige Wörter vorn (Anrede wie „Br.“) werden nicht verglichen;
+Namen aus nur einem Wort prüft allein die Gesamtähnlichkeit.
+
+Die Paare werden per Union-Find zu Clustern verbunden; die häufigste
+Schreibweise (mit ſ → s) wird die kanonische. Bei Gleichstand gewinnt die
+Variante, deren seltenste Wörter in den Satztexten häufiger vorkommen –
+ein OCR-Fehler („Ansſtalt“, „Miſſionedienſt“) steht dort meist nur einmal. Die
+Zuordnung (``ENTITY_FILE``) nutzen ``pipeline.linking`` (eine Suche je
+Cluster) und die Knoten-Suche der Visualisierung (Varianten finden den
+kanonischen Knoten).
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pipeline.dedup     # triple_bereinigt.json → entitaeten.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import zlib
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from pipeline.search import fold, light_fold
+
+# Pfade
+TRIPLE_FILE = "data/5.4.2_RE/triple_bereinigt.json"
+ENTITY_FILE = "data/5.4.2_RE/entitaeten.json"
+
+THRESHOLD = 0.9      # Mindestähnlichkeit (SequenceMatcher auf fold(Name))
+WORD_EDITS = ((4, 0), (9, 1))  # erlaubte Abweichungen je Wort bis zu dieser Länge, sonst 2
+SHORT_WORD = 6       # bis zu dieser Länge nur Ersetzungen (Tietze/Tießen, Kühn/Kühnel)
+NUM_PERM = 32        # MinHash-Permutationen
+BANDS = 8            # LSH-Bänder (je NUM_PERM // BANDS Zeilen)
+MAX_BLOCK = 200      # größere Blöcke werden nicht paarweise verglichen
+
+_PRIME = (1 << 61) - 1
+_WORD = re.compile(r"\w+")
+
+
+# ---------- Kölner Phonetik ----------
+
+def _koelner_code(chars: str, i: int) -> str:
+    c = chars[i]
+    prev = chars[i - 1] if i > 0 else ""
+    nxt = chars[i + 1] if i + 1 < len(chars) else ""
+    if c in "aeijouy":
+        return "0"
+    if c == "h":
+        return ""
+    if c == "b":
+        return "1"
+    if c == "p":
+        return "3" if nxt == "h" else "1"
+    if c in "dt":
+        return "8" if nxt in ("c", "s", "z") and nxt else "2"
+    if c in "fvw":
+        return "3"
+    if c in "gkq":
+        return "4"
+    if c == "c":
+        if i == 0:
+            return "4" if nxt and nxt in "ahkloqrux" else "8"
+        if prev and prev in "sz":
+            return "8"
+        return "4" if nxt and nxt in "ahkoqux" else "8"
+    if c == "x":
+        return "8" if prev and prev in "ckq" else "48"
+    if c == "l":
+        return "5"
+    if c in "mn":
+        return "6"
+    if c == "r":
+        return "7"
+    if c in "sz":
+        return "8"
+    return ""
+
+
+def koelner_phonetik(text: str) -> str:
+    """Kölner Phonetik eines Wortes oder Namens (Wörter ohne Trenner codiert)."""
+    s = str(text).lower().replace("ſ", "s").replace("ß", "s")
+    s = s.replace("ä", "a").replace("ö", "o").replace("ü", "u")
+    chars = "".join(c for c in s if "a" <= c <= "z")
+    codes = "".join(_koelner_code(chars, i) for i in range(len(chars)))
+    out = []
+    for ch in codes:
+        if not out or out[-1] != ch:
+            out.append(ch)
+    return (out[0] if out else "") + "".join(ch for ch in out[1:] if ch != "0")
+
+
+# ---------- MinHash-LSH ----------
+
+def _perms(num_perm: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash(text: str, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """MinHash-Signatur über die Zeichen-Trigramme von ``text`` (mit Rand)."""
+    s = f" {text} "
+    grams = {s[i:i + 3] for i in range(max(1, len(s) - 2))}
+    h = np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint64)
+    # (a·h + b) mod p; die Werte von h (< 2^32) und a (< 2^61) passen nach mod in uint64
+    return ((np.outer(h, a % (1 << 32)) + b) % _PRIME).min(axis=0)
+
+
+# ---------- Clustering ----------
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein-Abstand (Einfügen, Löschen, Ersetzen)."""
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def _word_budget(length: int) -> int:
+    for limit, edits in WORD_EDITS:
+        if length <= limit:
+            return edits
+    return 2
+
+
+def same_words(a: str, b: str) -> bool:
+    """Gefaltete Namen wortweise vergleichen (von rechts, überzählige Wörter vorn frei)."""
+    if a.replace(" ", "") == b.replace(" ", ""):
+        # nur Leerzeichen/Satzzeichen verschieden („Br. La Trobe“ / „Br. Latrobe“)
+        return True
+    wa, wb = a.split(), b.split()
+    if len(wa) < 2 or len(wb) < 2:
+        # Einzelne Wörter (meist Orte): die Gesamtähnlichkeit genügt („Niesky“ / „Nisky“)
+        return True
+    return all(_same_word(x, y) for x, y in zip(reversed(wa), reversed(wb)))
+
+
+def _same_word(x: str, y: str) -> bool:
+    length = max(len(x), len(y))
+    if length <= SHORT_WORD and len(x) != len(y):
+        return False
+    return edit_distance(x, y) <= _word_budget(length)
+
+
+def spelling(label: str) -> str:
+    """Schreibweise für den kanonischen Namen (langes ſ → s)."""
+    return label.replace("ſ", "s")
+
+
+def mentions(data: list) -> Counter:
+    """(Typ, Name) → Anzahl der Erwähnungen als Subjekt oder Objekt."""
+    counts = Counter()
+    for entry in data:
+        for g in entry.get("graph", []):
+            for role in ("subjekt", "objekt"):
+                label, kind = g.get(role), g.get(f"{role}_type")
+                if isinstance(label, str) and label.strip():
+                    counts[(str(kind or "").strip().lower(), label.strip())] += 1
+    return counts
+
+
+def corpus_words(data: list) -> Counter:
+    """Wort (``light_fold``) → Häufigkeit in den Satztexten."""
+    words = Counter()
+    for entry in data:
+        words.update(_WORD.findall(light_fold(entry.get("text") or "")))
+    return words
+
+
+def _word_counts(label: str, words: Counter) -> tuple:
+    """Häufigkeiten der Wörter eines Namens, aufsteigend (das seltenste zuerst vergleichen)."""
+    return tuple(sorted(words[w] for w in _WORD.findall(light_fold(label))))
+
+
+def cluster(counts: Counter, threshold: float = THRESHOLD, num_perm: int = NUM_PERM,
+            bands: int = BANDS, max_block: int = MAX_BLOCK, words: Counter = None):
+    """Cluster der Namen je Typ; gibt (Cluster, Statistik) zurück.
+
+    Ein Cluster ist ein Dict mit ``id``, ``type``, ``label`` (häufigste
+    Schreibweise mit ſ → s, nicht unbedingt unter den Varianten),
+    ``varianten`` und ``anzahl`` (Erwähnungen). ``words`` (siehe
+    ``corpus_words``) entscheidet Gleichstände; ohne zählen die Wörter der
+    Namen selbst.
+    """
+    if words is None:
+        words = Counter()
+        for (_, label), n in counts.items():
+            for w in _WORD.findall(light_fold(label)):
+                words[w] += n
+    a, b = _perms(num_perm)
+    rows = num_perm // bands
+    stats = {"namen": len(counts), "kandidaten": 0, "alle_paare": 0, "übersprungen": 0, "verbunden": 0}
+
+    by_type = defaultdict(list)
+    for kind, label in counts:
+        by_type[kind].append(label)
+
+    clusters = []
+    for kind, labels in sorted(by_type.items()):
+        labels.sort()
+        folded = [fold(l) for l in labels]
+        n = len(labels)
+        stats["alle_paare"] += n * (n - 1) // 2
+
+        blocks = defaultdict(list)
+        for i, (label, f) in enumerate(zip(labels, folded)):
+            blocks[("k", koelner_phonetik(label))].append(i)
+            sig = minhash(f, a, b)
+            for band in range(bands):
+                blocks[("lsh", band, sig[band * rows:(band + 1) * rows].tobytes())].append(i)
+
+        pairs = set()
+        for members in blocks.values():
+            if len(members) < 2:
+                continue
+            if len(members) > max_block:
+                stats["übersprungen"] += 1
+                continue
+            pairs.update((members[x], members[y]) for x in range(len(members)) for y in range(x + 1, len(members)))
+        stats["kandidaten"] += len(pairs)
+
+        uf = _UnionFind(n)
+        for i, j in pairs:
+            if similarity(folded[i], folded[j]) >= threshold and same_words(folded[i], folded[j]):
+                uf.union(i, j)
+                stats["verbunden"] += 1
+
+        groups = defaultdict(list)
+        for i in range(n):
+            groups[uf.find(i)].append(labels[i])
+        for variants in groups.values():
+            # Häufigste Schreibweise (ſ und s zusammengezählt); bei Gleichstand die
+            # mit den geläufigeren Wörtern, dann die längere, dann alphabetisch
+            spellings = Counter()
+            for l in variants:
+                spellings[spelling(l)] += counts[(kind, l)]
+            canon = max(spellings, key=lambda l: (spellings[l], _word_counts(l, words), len(l),
+                                                  [-ord(c) for c in l]))
+            clusters.append({
+                "id": "E" + hashlib.sha1(f"{kind}\x1f{canon}".encode("utf-8")).hexdigest()[:10],
+                "type": kind,
+                "label": canon,
+                "varianten": sorted(variants),
+                "anzahl": sum(counts[(kind, l)] for l in variants),
+            })
+    clusters.sort(key=lambda c: (c["type"], c["label"]))
+    return clusters, stats
+
+
+# ---------- Zuordnung lesen und anwenden ----------
+
+def load_mapping(path: str = ENTITY_FILE) -> dict:
+    """(Typ, Name) → (ID, kanonischer Name) für alle Varianten; leer ohne Datei."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        clusters = json.load(f)["clusters"]
+    return {(c["type"], v): (c["id"], c["label"]) for c in clusters for v in c["varianten"]}
+
+
+def canonical(label, kind, mapping: dict):
+    """Kanonischer Name (oder ``label`` selbst, wenn nicht zugeordnet)."""
+    if not isinstance(label, str):
+        return label
+    return mapping.get((str(kind or "").strip().lower(), label.strip()), (None, label))[1]
+
+
+def aliases(mapping: dict) -> dict:
+    """Variante → kanonischer Name (nur echte Varianten), z. B. für die Knoten-Suche."""
+    return {label: canon for (_, label), (_, canon) in mapping.items() if label != canon}
+
+
+def run(input_file: str = TRIPLE_FILE, output_file: str = ENTITY_FILE, threshold: float = THRESHOLD) -> list:
+    with open(input_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    clusters, stats = cluster(mentions(data), threshold=threshold, words=corpus_words(data))
+    merged = [c for c in clusters if len(c["varianten"]) > 1]
+
+    tmp = output_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        # Nur Cluster mit Varianten; alle anderen Namen sind ihr eigener kanonischer Name
+        json.dump({"threshold": threshold, "clusters": merged}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, output_file)
+
+    print(f"{stats['namen']} Namen → {len(clusters)} Entitäten ({len(merged)} mit Varianten)")
+    print(f"Kandidatenpaare: {stats['kandidaten']} statt {stats['alle_paare']} "
+          f"(übersprungene Blöcke: {stats['übersprungen']})")
+    print(f"Gespeichert in: {output_file}")
+    return clusters
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Schreibvarianten von Entitäten zusammenführen (vor EL)")
+    ap.add_argument("--input", default=TRIPLE_FILE)
+    ap.add_argument("--output", default=ENTITY_FILE)
+    ap.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = ap.parse_args(argv)
+    run(args.input, args.output, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
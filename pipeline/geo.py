@@ -0,0 +1,245 @@
+"""Orte für die Kartenseiten (``seite_3.py``, ``test.py``) ohne Zeilenschleifen.
+
+Die Ortszeilen werden spaltenweise bereinigt und je Koordinate und Kategorie
+(Prädikat) mit ``groupby`` zusammengefasst. Die Karte bekommt alle Punkte als
+eine Datenliste für ``FastMarkerCluster``; Marker, Tooltips und Popups
+entstehen erst im Browser. Popups werden beim Anklicken gebaut, die
+Personenlisten dabei aus einer JSON-Datei nachgeladen (oder, ohne statische
+Auslieferung, aus einer einmal eingebetteten Liste gelesen).
+
+Reiserouten (``pipeline.routen``) kommen als kodierte Polylines mit
+Begrenzungsrahmen auf die Karte; ``RouteLayer`` dekodiert und zeichnet eine
+Route erst, wenn ihr Rahmen den sichtbaren Ausschnitt berührt.
+"""
+import json
+
+import folium
+import numpy as np
+import pandas as pd
+from branca.element import MacroElement
+from folium.plugins import FastMarkerCluster
+from jinja2 import Template
+
+UNKNOWN = "Unbekannt"
+
+# Stabile Farben je Kategorie (Reihenfolge der sortierten Kategorien)
+PALETTE = [
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+    "#393b79", "#637939", "#8c6d31", "#843c39", "#7b4173",
+    "#3182bd", "#e6550d", "#31a354", "#756bb1", "#636363"
+]
+
+# Reiserouten (gestrichelt, wie im Prototyp test/web/script_weg.js)
+ROUTE_COLOR = "#4f4849"
+
+
+def locations(df: pd.DataFrame) -> pd.DataFrame:
+    """Zeilen mit ``objekt_type == "location"`` und gültigen numerischen Koordinaten.
+
+    ``__cat`` ist das Prädikat als Text (fehlend → „Unbekannt“).
+    """
+    locs = df[df["objekt_type"].astype(str).str.lower().eq("location")].copy()
+    for col in ["lat", "lon"]:
+        locs[col] = pd.to_numeric(locs[col], errors="coerce")
+    locs = locs.dropna(subset=["lat", "lon"])
+    locs = locs[locs["lat"].between(-90, 90) & locs["lon"].between(-180, 180)]
+    locs["__cat"] = locs["prädikat"].astype(object).fillna(UNKNOWN).astype(str)
+    return locs
+
+
+def color_map(categories) -> dict:
+    return {cat: PALETTE[i % len(PALETTE)] for i, cat in enumerate(sorted(categories))}
+
+
+def _persons(col: pd.Series) -> pd.Series:
+    """Subjekte als bereinigter Text; leere Werte, "nan" und "none" → None."""
+    s = col.astype(object).where(col.notna(), "").astype(str).str.strip()
+    return s.where((s != "") & ~s.str.lower().isin(["nan", "none"]))
+
+
+def aggregate(locs: pd.DataFrame, persons: bool = False):
+    """Punkte je (lat, lon, Kategorie) zusammenfassen.
+
+    Gibt (Punkte, Personenlisten) zurück. Punkte haben ``count`` (Zeilen),
+    ``objekt_type`` (erste Zeile) und ``id`` (Position in der Liste); mit
+    ``persons`` zusätzlich ``person_count`` und je Punkt die sortierte Liste
+    der verschiedenen Subjekte, sonst ist die Personenliste ``None``.
+    """
+    keys = ["lat", "lon", "__cat"]
+    points = (locs.groupby(keys, sort=True, observed=True)
+                  .agg(count=("__cat", "size"), objekt_type=("objekt_type", "first"))
+                  .reset_index())
+    points["objekt_type"] = points["objekt_type"].astype(object).astype(str)
+    points["id"] = np.arange(len(points))
+    if not persons:
+        return points, None
+
+    named = (locs.assign(__person=_persons(locs["subjekt"]))[keys + ["__person"]]
+                 .dropna(subset=["__person"])
+                 .drop_duplicates()
+                 .merge(points[keys + ["id"]], on=keys)
+                 .sort_values(["id", "__person"]))
+    counts = named.groupby("id").size()
+    points["person_count"] = counts.reindex(points["id"], fill_value=0).to_numpy()
+    lists = named.groupby("id")["__person"].agg(list).reindex(points["id"])
+    return points, [p if isinstance(p, list) else [] for p in lists]
+
+
+# Marker, Tooltip und Popup entstehen im Browser; ``row`` ist
+# [lat, lon, Farbe, Kategorie, objekt_type, Anzahl, id, Tooltip]
+CALLBACK = """(function () {
+    var PERSONS_URL = %(persons_url)s;
+    var PERSONS = %(persons)s;
+    var loading = null;
+    function esc(s) {
+        return String(s).replace(/[&<>"']/g, function (c) {
+            return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+        });
+    }
+    function personsHtml(list) {
+        if (!list || !list.length) { return "<i>keine Person angegeben</i>"; }
+        return list.map(function (p) { return "• " + esc(p); }).join("<br>");
+    }
+    function popupHtml(row, list) {
+        var html = "<b>Info</b><br><b>prädikat:</b> " + esc(row[3]) +
+                   "<br><b>objekt_type:</b> " + esc(row[4]);
+        if (PERSONS_URL === null && PERSONS === null) {
+            return row[5] > 1 ? html + "<br><b>Einträge:</b> " + row[5] : html;
+        }
+        return html + "<br><b>Person(en):</b><br>" + (list === undefined ? "<i>lädt …</i>" : personsHtml(list));
+    }
+    return function (row) {
+        var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+            radius: 6, weight: 1, fill: true, fillOpacity: 0.9, color: row[2], fillColor: row[2]
+        });
+        marker.bindTooltip(row[7]);
+        marker.bindPopup(function () {
+            if (PERSONS !== null) { return popupHtml(row, PERSONS[row[6]]); }
+            if (PERSONS_URL !== null) {
+                loading = loading || fetch(PERSONS_URL).then(function (r) { return r.json(); });
+                loading.then(function (data) {
+                    PERSONS = data;
+                    marker.setPopupContent(popupHtml(row, data[row[6]]));
+                });
+            }
+            return popupHtml(row);
+        }, {maxWidth: 320});
+        return marker;
+    };
+})()"""
+
+LEGEND = """<div style="position: fixed; bottom: 20px; left: 20px; z-index:9999;
+background: white; padding: 10px 14px; border:1px solid #ddd; border-radius: 8px;
+box-shadow: 0 2px 10px rgba(0,0,0,.1); font-size:14px; max-height: 50vh; overflow:auto;">
+<b>Prädikat</b><br>{items}</div>"""
+
+
+class RouteLayer(MacroElement):
+    """Ebene mit Reiserouten, gezeichnet nur im sichtbaren Ausschnitt.
+
+    ``routes`` ist die Tabelle aus ``routen.build_routes``. Die Polylines
+    werden erst im Browser dekodiert, sobald der Rahmen einer Route nach dem
+    Verschieben oder Zoomen im Ausschnitt liegt, und danach wiederverwendet.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function () {
+                var map = {{ this._parent.get_name() }};
+                // [Name, [Süd, West, Nord, Ost], Polyline, Stationen]
+                var routes = {{ this.data }};
+                var layer = L.layerGroup().addTo(map);
+                var lines = {};
+                function esc(s) {
+                    return String(s).replace(/[&<>"']/g, function (c) {
+                        return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+                    });
+                }
+                function decode(str) {
+                    var coords = [], lat = 0, lng = 0, i = 0;
+                    function next() {
+                        var b, shift = 0, v = 0;
+                        do { b = str.charCodeAt(i++) - 63; v |= (b & 31) << shift; shift += 5; } while (b >= 32);
+                        return (v & 1) ? ~(v >> 1) : (v >> 1);
+                    }
+                    while (i < str.length) {
+                        lat += next(); lng += next();
+                        coords.push([lat / {{ this.factor }}, lng / {{ this.factor }}]);
+                    }
+                    return coords;
+                }
+                function line(r) {
+                    var html = "<b>" + esc(r[0]) + "</b><br>" +
+                               r[3].map(function (s, k) { return (k + 1) + ". " + esc(s); }).join("<br>");
+                    return L.polyline(decode(r[2]), {{ this.options|tojson }})
+                            .bindTooltip(esc(r[0])).bindPopup(html, {maxWidth: 360});
+                }
+                function update() {
+                    var view = map.getBounds();
+                    routes.forEach(function (r, i) {
+                        var box = L.latLngBounds([r[1][0], r[1][1]], [r[1][2], r[1][3]]);
+                        if (view.intersects(box)) {
+                            layer.addLayer(lines[i] = lines[i] || line(r));
+                        } else if (lines[i]) {
+                            layer.removeLayer(lines[i]);
+                        }
+                    });
+                }
+                map.on("moveend", update);
+                update();
+                return layer;
+            })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, routes: pd.DataFrame, precision: int = 5, color: str = ROUTE_COLOR):
+        super().__init__()
+        self._name = "RouteLayer"
+        self.factor = 10 ** precision
+        self.options = {"color": color, "weight": 2, "opacity": 0.6, "dashArray": "4,6"}
+        data = [[name, [s, w, n, e], line, list(stations)]
+                for name, s, w, n, e, line, stations in zip(
+                    routes["subjekt"], routes["sued"], routes["west"], routes["nord"],
+                    routes["ost"], routes["polyline"], routes["stationen"])]
+        # Polylines enthalten „{“ und „}“; branca liest das fertige Skript noch einmal
+        # als Jinja-Vorlage, daher nur maskiert einbetten (nur Listen, also alle in Strings)
+        self.data = (json.dumps(data, ensure_ascii=False).replace("<", "\\u003c")
+                     .replace("{", "\\u007b").replace("}", "\\u007d"))
+
+
+def build_map(points: pd.DataFrame, colors: dict, selected, tooltips: pd.Series,
+              persons_url: str = None, persons: list = None, routes: pd.DataFrame = None) -> folium.Map:
+    """Karte mit einer ``FastMarkerCluster``-Ebene für alle Punkte und Legende.
+
+    ``tooltips`` ist je Punkt vorberechnet. Personenlisten werden entweder
+    von ``persons_url`` nachgeladen oder als ``persons`` einmal eingebettet;
+    ohne beides zeigt das Popup nur Kategorie, Typ und Anzahl. Mit
+    ``routes`` kommt eine ``RouteLayer`` dazu.
+    """
+    center = [float(points["lat"].median()), float(points["lon"].median())]
+    m = folium.Map(
+        location=center,
+        zoom_start=5,
+        tiles="OpenStreetMap",
+        control_scale=True,
+        width="100%",
+        height="100%"
+    )
+    data = pd.DataFrame({
+        "lat": points["lat"], "lon": points["lon"], "color": points["__cat"].map(colors),
+        "cat": points["__cat"], "type": points["objekt_type"], "count": points["count"],
+        "id": points["id"], "tooltip": tooltips,
+    }).to_numpy().tolist()
+    callback = CALLBACK % {"persons_url": json.dumps(persons_url),
+                           "persons": json.dumps(persons, ensure_ascii=False)}
+    FastMarkerCluster(data, callback=callback, name="Orte").add_to(m)
+    if routes is not None and len(routes):
+        RouteLayer(routes).add_to(m)
+
+    items = "".join(
+        f'<span style="display:inline-block;width:12px;height:12px;background:{colors[c]};'
+        f'margin-right:8px;border-radius:50%;"></span>{c}<br>'
+        for c in selected
+    )
+    m.get_root().html.add_child(folium.Element(LEGEND.format(items=items)))
+    return m
@@ -0,0 +1,387 @@
+"""Netzwerk-Aufbereitung für die Visualisierung (``seite_2.py``) ohne Zeilenschleifen.
+
+Filter, Knotentypen, Gruppen und Tooltips werden spaltenweise mit pandas
+berechnet; der Graph entsteht in einem Aufruf über ``add_edges_from``. Die
+Funktionen kennen Streamlit nicht, die Seite cached ihr Ergebnis je
+Filterauswahl.
+
+Für große Netzwerke (Großansicht) gibt es Stichproben mit Knotenbudget
+(Grad, k-Kern, Ego-Netz), zu Superknoten zusammengefasste Gemeinschaften und
+ein Layout, das auf dem Server berechnet wird, sodass der Browser ohne
+Physik-Simulation auskommt.
+
+Das Layout des Gesamtgraphen wird einmal je Datenversion berechnet und als
+``layout.parquet`` im Triple-Speicher abgelegt; gefilterte Ansichten
+übernehmen die Positionen. Bei einer neuen Datenversion bleiben bekannte
+Knoten liegen, nur neue Knoten werden nachrelaxiert::
+
+    python -m pipeline.graph layout          # Layout aktualisieren
+    python -m pipeline.graph layout --neu    # komplett neu berechnen
+"""
+import argparse
+import os
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pipeline import triplestore
+
+# Gespeichertes Gesamtlayout neben den Triple-Tabellen
+LAYOUT_FILE = "layout.parquet"
+
+# Typen ohne Aussagekraft für die Gruppe (``str(NaN)`` ergibt "nan")
+EMPTY_TYPES = ("", "nan")
+
+
+def _isin(col: pd.Series, values) -> pd.Series:
+    """``col.astype(str).isin(values)``; bei Kategorien nur über die Kategorien."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col.isin(list(values))
+    return col.astype(str).isin(values)
+
+
+def _contains(col: pd.Series, query: str) -> pd.Series:
+    """``col.astype(str).str.lower().str.contains(query)`` (ohne Regex); bei Kategorien je Kategorie einmal."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        hits = np.asarray(col.cat.categories.astype(str).str.lower().str.contains(query, regex=False), dtype=bool)
+        codes = col.cat.codes.to_numpy()
+        # Fehlende Werte (Code -1) treffen nie
+        return pd.Series((codes >= 0) & hits[codes], index=col.index)
+    return col.astype(str).str.lower().str.contains(query, regex=False)
+
+
+def filter_triples(df: pd.DataFrame, s_col: str, s_type_col: str, p_col: str, o_col: str, o_type_col: str,
+                   subj_types, obj_types, preds, node_query: str = "", index=None,
+                   in_text: bool = False, keep=None) -> pd.DataFrame:
+    """Kanten nach Typen, Prädikaten und (optional) Knotennamen filtern.
+
+    Mit ``index`` (``search.NodeSearch``) wird die Knoten-Suche über den
+    Suchindex beantwortet, sonst per Teilwortvergleich auf den Spalten.
+    ``keep`` ist eine zusätzliche Zeilenmaske (z. B. ein Zeitfenster).
+    """
+    mask = (
+        _isin(df[s_type_col], subj_types) &
+        _isin(df[o_type_col], obj_types) &
+        _isin(df[p_col], preds)
+    )
+    f = df[mask if keep is None else mask & keep]
+    if node_query:
+        if index is not None:
+            matched = index.find(node_query, in_text=in_text)
+            f = f[_isin(f[s_col], matched) | _isin(f[o_col], matched)]
+        else:
+            q = node_query.strip().lower()
+            f = f[_contains(f[s_col], q) | _contains(f[o_col], q)]
+    return f
+
+
+def _text(col: pd.Series) -> pd.Series:
+    """Spalte als Text wie ``str(x)`` (fehlende Werte → "nan")."""
+    col = col.astype(object)
+    return col.where(col.notna(), "nan").astype(str)
+
+
+def node_table(f: pd.DataFrame, s_col: str, s_type_col: str, o_col: str, o_type_col: str) -> pd.DataFrame:
+    """Knoten mit Typen, Gruppe und Tooltip (Index = Knotenname).
+
+    Ein Knoten kann als Subjekt und Objekt mit verschiedenen Typen vorkommen:
+    genau ein gültiger Typ ergibt die Gruppe, mehrere „gemischt“, keiner
+    „unbekannt“.
+    """
+    f = f.dropna(subset=[s_col, o_col])
+    stacked = pd.DataFrame({
+        "node": pd.concat([_text(f[s_col]), _text(f[o_col])], ignore_index=True),
+        "type": pd.concat([_text(f[s_type_col]), _text(f[o_type_col])], ignore_index=True)
+                  .str.strip().str.lower(),
+    }).drop_duplicates().sort_values(["node", "type"])
+
+    nodes = stacked.groupby("node", sort=False)["type"].agg(", ".join).rename("types").to_frame()
+    valid = stacked[~stacked["type"].isin(EMPTY_TYPES)]
+    counts = valid.groupby("node", sort=False)["type"].agg(["nunique", "first"])
+    nodes["group"] = "unbekannt"
+    nodes.loc[counts.index, "group"] = np.where(counts["nunique"] == 1, counts["first"], "gemischt")
+    nodes["title"] = nodes.index + " — Typ(en): " + nodes["types"]
+    return nodes
+
+
+def build_graph(f: pd.DataFrame, s_col: str, p_col: str, o_col: str) -> nx.DiGraph:
+    """Gerichteter Graph aus den Kanten; doppelte Kanten behalten das letzte Prädikat."""
+    f = f.dropna(subset=[s_col, o_col])
+    G = nx.DiGraph()
+    G.add_edges_from(zip(_text(f[s_col]), _text(f[o_col]), ({"label": p} for p in _text(f[p_col]))))
+    return G
+
+
+# ---------- Große Netzwerke: Stichproben, Gemeinschaften, Layout ----------
+
+def _induced(G: nx.DiGraph, keep) -> nx.DiGraph:
+    """Teilgraph auf ``keep`` mit der Knoten- und Kantenreihenfolge von ``G``."""
+    keep = set(keep)
+    H = nx.DiGraph()
+    H.add_nodes_from(n for n in G if n in keep)
+    H.add_edges_from((u, v, d) for u, v, d in G.edges(data=True) if u in keep and v in keep)
+    return H
+
+
+def degree_sample(G: nx.DiGraph, budget: int) -> nx.DiGraph:
+    """Die ``budget`` Knoten mit dem höchsten Grad."""
+    ranked = sorted(G, key=lambda n: -G.degree(n))
+    return _induced(G, ranked[:budget])
+
+
+def core_sample(G: nx.DiGraph, budget: int) -> nx.DiGraph:
+    """Knoten aus den innersten k-Kernen, bis das Budget erreicht ist."""
+    U = nx.Graph(G)
+    U.remove_edges_from(nx.selfloop_edges(U))
+    core = nx.core_number(U)
+    ranked = sorted(G, key=lambda n: (-core[n], -G.degree(n)))
+    return _induced(G, ranked[:budget])
+
+
+def ego_sample(G: nx.DiGraph, center: str, budget: int) -> nx.DiGraph:
+    """Ego-Netz um ``center`` (Richtung egal), nach Abstand bis zum Budget aufgefüllt."""
+    if center not in G:
+        return nx.DiGraph()
+    dist = nx.single_source_shortest_path_length(G.to_undirected(as_view=True), center)
+    return _induced(G, list(dist)[:budget])
+
+
+SAMPLERS = {"grad": degree_sample, "k-kern": core_sample}
+
+
+def sample(G: nx.DiGraph, method: str, budget: int, center: str = None) -> nx.DiGraph:
+    """Stichprobe mit höchstens ``budget`` Knoten (``grad``, ``k-kern`` oder ``ego``)."""
+    if method == "ego":
+        return ego_sample(G, center, budget)
+    if len(G) <= budget:
+        return G
+    return SAMPLERS[method](G, budget)
+
+
+def communities(G: nx.DiGraph, seed: int = 0) -> dict:
+    """Knoten → Gemeinschaft (Louvain, ungerichtet); 0 ist die größte."""
+    parts = nx.community.louvain_communities(G.to_undirected(as_view=True), seed=seed)
+    parts = sorted(parts, key=lambda c: (-len(c), min(c)))
+    return {n: i for i, part in enumerate(parts) for n in part}
+
+
+def community_id(i: int) -> str:
+    return f"Gemeinschaft {i + 1}"
+
+
+def collapse(G: nx.DiGraph, nodes: pd.DataFrame, membership: dict, expanded=()):
+    """Gemeinschaften zu Superknoten zusammenfassen; ``expanded`` bleiben aufgeklappt.
+
+    Gibt (Graph, Knotentabelle) zurück. Superknoten tragen die Gruppe
+    „gemeinschaft“, Größe und Tooltip mit den Knoten mit dem höchsten Grad;
+    zusammengefasste Kanten die Anzahl der Einzelkanten als Beschriftung.
+    """
+    expanded = set(expanded)
+    node_of = pd.Series({n: n if membership[n] in expanded else community_id(membership[n]) for n in G})
+
+    edges = pd.DataFrame(list(G.edges(data="label")), columns=["u", "v", "label"])
+    edges["u"], edges["v"] = node_of.reindex(edges["u"]).to_numpy(), node_of.reindex(edges["v"]).to_numpy()
+    edges = edges[edges["u"] != edges["v"]]
+    agg = edges.groupby(["u", "v"], sort=False)["label"].agg(["size", "last"])
+    labels = np.where(agg["size"] == 1, agg["last"], agg["size"].astype(str) + " Kanten")
+
+    H = nx.DiGraph()
+    H.add_nodes_from(dict.fromkeys(node_of))
+    H.add_edges_from((u, v, {"label": l}) for (u, v), l in zip(agg.index, labels))
+
+    out = nodes.reindex(list(G)).copy()
+    out["label"], out["size"] = out.index, 28
+    collapsed = node_of[node_of != node_of.index]
+    if len(collapsed):
+        degree = pd.Series(dict(G.degree()))
+        members = (pd.DataFrame({"super": collapsed, "degree": degree.reindex(collapsed.index)})
+                   .sort_values("degree", ascending=False, kind="stable"))
+        grouped = members.groupby("super", sort=False)
+        supers = pd.DataFrame({
+            "count": grouped.size(),
+            "top": grouped.apply(lambda m: ", ".join(m.index[:5]), include_groups=False),
+        })
+        supers["group"] = "gemeinschaft"
+        supers["types"] = ""
+        supers["label"] = supers.index + " (" + supers["count"].astype(str) + ")"
+        supers["title"] = supers["label"] + " — u. a. " + supers["top"]
+        supers["size"] = (28 + 6 * np.sqrt(supers["count"])).round().astype(int)
+        out = pd.concat([out.drop(index=collapsed.index), supers[out.columns]])
+    return H, out.reindex(list(H))
+
+
+def _relax(z: np.ndarray, u: np.ndarray, v: np.ndarray, movable: np.ndarray, k: float, t: float,
+           iterations: int) -> np.ndarray:
+    """Fruchterman-Reingold-Schritte; nur die Knoten in ``movable`` bewegen sich.
+
+    Positionen sind komplexe Zahlen, damit die Abstoßung ``k²·δ/|δ|²`` je
+    Paar nur ein Kehrwert (``1/conj(δ)``) ist. Abstoßung wird nur für die
+    beweglichen Knoten (blockweise gegen alle) berechnet.
+    """
+    n, m = len(z), len(movable)
+    mask = np.zeros(n, dtype=bool)
+    mask[movable] = True
+    dt = t / (iterations + 1)
+    chunk = max(1, 4_000_000 // n)  # Block mit ~4 Mio. Paaren (64 MB)
+    for _ in range(iterations):
+        disp = np.zeros(n, dtype=complex)
+        for start in range(0, m, chunk):
+            rows = movable[start:start + chunk]
+            delta = z[rows, None] - z[None, :]
+            delta[np.arange(len(rows)), rows] = np.inf  # kein Beitrag des Knotens selbst
+            np.conjugate(delta, out=delta)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                np.reciprocal(delta, out=delta)
+            disp[rows] = delta.sum(axis=1)
+        disp *= k * k
+        disp[~np.isfinite(disp)] = 0  # zusammenfallende Knoten
+        delta = z[u] - z[v]
+        pull = delta * np.abs(delta) / k
+        np.add.at(disp, u, -pull)
+        np.add.at(disp, v, pull)
+        disp[~mask] = 0
+        z = z + disp * (t / np.maximum(np.abs(disp), 1e-9 * k))
+        t -= dt
+    return z
+
+
+def layout(G: nx.DiGraph, seed: int = 0, scale: float = None, iterations: int = 50,
+           pos: dict = None, fixed=()) -> dict:
+    """Kräftebasiertes Layout auf dem Server: Knoten → (x, y) in Pixeln.
+
+    Fruchterman-Reingold wie ``nx.spring_layout``, aber mit numpy; die
+    Kantenrichtung spielt keine Rolle. Ohne ``pos`` wird frisch gerechnet und
+    auf ``scale`` Pixel skaliert (Standard: wächst mit der Wurzel der
+    Knotenzahl). Mit ``pos`` (Pixel) wird nur nachgerelaxt: Knoten in
+    ``fixed`` bleiben liegen, Knoten ohne Position starten im Schwerpunkt
+    ihrer platzierten Nachbarn; es wird nicht neu skaliert.
+    """
+    nodes = list(G)
+    n = len(nodes)
+    if not n:
+        return {}
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[a], index[b]) for a, b in G.edges() if a != b], dtype=np.int64).reshape(-1, 2)
+    u, v = edges[:, 0], edges[:, 1]
+    rng = np.random.default_rng(seed)
+    known = [node for node in nodes if pos and node in pos]
+
+    if not known:
+        xy = rng.random((n, 2))
+        # Etwas größerer Abstand als bei nx.spring_layout für lesbare Beschriftungen
+        z = _relax(xy[:, 0] + 1j * xy[:, 1], u, v, np.arange(n), 2.0 / np.sqrt(n), 0.1, iterations)
+        if scale is None:
+            scale = max(1000.0, 60.0 * np.sqrt(n))
+        xy = nx.rescale_layout(np.column_stack([z.real, z.imag]), scale=scale)
+        return {node: (float(x), float(y)) for node, (x, y) in zip(nodes, xy)}
+
+    z = np.full(n, np.nan, dtype=complex)
+    for node in known:
+        z[index[node]] = complex(*pos[node])
+    placed = z[~np.isnan(z)]
+    # Knotenabstand aus der Dichte der vorhandenen Positionen
+    width, height = np.ptp(placed.real), np.ptp(placed.imag)
+    k = 2.0 * np.sqrt(max(width * height, 1.0) / len(placed))
+
+    # Neue Knoten von den platzierten aus (Breitensuche) in die Nähe ihrer Nachbarn setzen
+    U = G.to_undirected(as_view=True)
+    pending = [node for node in nodes if np.isnan(z[index[node]])]
+    while pending:
+        rest = []
+        for node in pending:
+            near = [z[index[nb]] for nb in U[node] if not np.isnan(z[index[nb]])]
+            if near:
+                z[index[node]] = np.mean(near) + k * 0.5 * np.exp(2j * np.pi * rng.random())
+            else:
+                rest.append(node)
+        if len(rest) == len(pending):
+            # Keine platzierten Nachbarn: zufällig im bisherigen Bereich
+            for node in rest:
+                z[index[node]] = complex(placed.real.min() + width * rng.random(),
+                                         placed.imag.min() + height * rng.random())
+            break
+        pending = rest
+
+    fixed = set(fixed)
+    movable = np.array([index[node] for node in nodes if node not in fixed], dtype=np.int64)
+    if len(movable):
+        z = _relax(z, u, v, movable, k, 2.0 * k, iterations)
+    return {node: (float(z[i].real), float(z[i].imag)) for i, node in enumerate(nodes)}
+
+
+def super_positions(membership: dict, pos: dict, expanded=()) -> dict:
+    """Startpositionen der Superknoten: Schwerpunkt ihrer Mitglieder."""
+    frame = pd.DataFrame([(m, *pos[n]) for n, m in membership.items() if n in pos and m not in set(expanded)],
+                         columns=["community", "x", "y"])
+    means = frame.groupby("community")[["x", "y"]].mean()
+    return {community_id(c): (x, y) for c, x, y in means.itertuples()}
+
+
+# ---------- Gespeichertes Gesamtlayout ----------
+
+def full_graph(store_dir: str = triplestore.STORE_DIR) -> nx.DiGraph:
+    """Graph aller Triples des Speichers (ohne Filter)."""
+    df = triplestore.read_triples(store_dir, columns=["subjekt", "prädikat", "objekt"])
+    return build_graph(df, "subjekt", "prädikat", "objekt")
+
+
+def read_layout(store_dir: str = triplestore.STORE_DIR):
+    """(Datenversion, Positionen) des gespeicherten Layouts oder (None, None)."""
+    path = os.path.join(store_dir, LAYOUT_FILE)
+    if not os.path.exists(path):
+        return None, None
+    table = pq.read_table(path)
+    version = (table.schema.metadata or {}).get(b"version", b"").decode() or None
+    nodes, xs, ys = (table.column(c).to_pylist() for c in ("node", "x", "y"))
+    return version, dict(zip(nodes, zip(xs, ys)))
+
+
+def write_layout(pos: dict, version: str, store_dir: str = triplestore.STORE_DIR) -> str:
+    path = os.path.join(store_dir, LAYOUT_FILE)
+    table = pa.table({
+        "node": pa.array(list(pos), pa.string()),
+        "x": pa.array([x for x, _ in pos.values()], pa.float64()),
+        "y": pa.array([y for _, y in pos.values()], pa.float64()),
+    }).replace_schema_metadata({"version": version})
+    pq.write_table(table, path + ".tmp", compression="zstd")
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def update_layout(store_dir: str = triplestore.STORE_DIR, fresh: bool = False) -> dict:
+    """Layout zur aktuellen Datenversion liefern; bei Bedarf (nach)rechnen und speichern."""
+    version = triplestore.data_version(store_dir)
+    old_version, old = read_layout(store_dir)
+    if old is not None and old_version == version and not fresh:
+        return old
+
+    G = full_graph(store_dir)
+    if old is None or fresh:
+        pos = layout(G)
+        print(f"Layout berechnet: {len(pos)} Knoten (Version {version})")
+    else:
+        keep = [n for n in G if n in old]
+        pos = layout(G, pos=old, fixed=keep)
+        print(f"Layout nachrelaxiert: {len(G) - len(keep)} neue von {len(pos)} Knoten (Version {version})")
+    try:
+        write_layout(pos, version, store_dir)
+    except OSError as e:
+        # z. B. schreibgeschützter Speicher in der Cloud: Layout nur im Speicher halten
+        print(f"Layout nicht gespeichert: {e}")
+    return pos
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Netzwerk-Layout für die Visualisierung")
+    ap.add_argument("step", choices=["layout"])
+    ap.add_argument("--store", default=triplestore.STORE_DIR)
+    ap.add_argument("--neu", action="store_true", help="Layout komplett neu berechnen")
+    args = ap.parse_args(argv)
+    update_layout(args.store, fresh=args.neu)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""5.4.3 Datenabgleich: Entitäten, Prädikate und Koordinaten aus Wikidata.
+
+Statt einer ungecachten ``requests.get``-Anfrage pro Label und einer
+SPARQL-Abfrage pro Ortszeile:
+
+- eine gemeinsame ``requests.Session`` mit Verbindungspool und Wiederholungen
+  (inkl. ``Retry-After`` bei 429/503) und festem Timeout
+- jedes Label und jede QID wird nur einmal nachgeschlagen
+- Label-Suchen laufen parallel, gedrosselt auf ``rate`` Anfragen pro Sekunde
+- Koordinaten werden mit ``VALUES``-Blöcken für viele QIDs auf einmal abgefragt
+- alle Antworten (auch "nicht gefunden") landen in einem persistenten Cache
+  mit TTL (``CACHE_PATH``); Fehler werden nicht gecacht
+
+Für Probeläufe ohne Netz gibt es ``test/wikidata_stub.py``.
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pipeline.dedup                 # Schreibvarianten → entitaeten.json
+    python -m pipeline.linking link          # triple_bereinigt.json → graphen.xlsx
+    python -m pipeline.linking coordinates   # lat/lon in graphen_bereinigt.xlsx
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from pipeline import dedup
+from pipeline.cache import Cache, hash_key
+
+WIKIDATA_API = "https://www.wikidata.org/w/api.php"
+SPARQL_ENDPOINT = "https://query.wikidata.org/sparql"
+USER_AGENT = "GeoKoordinatenBot/1.0 (example@domain.com)"
+
+# Pfade
+TRIPLE_FILE = "data/5.4.2_RE/triple_bereinigt.json"
+LINKED_FILE = "data/5.4.2_RE/graphen.xlsx"
+GRAPH_FILE = "data/5.4.3_EL/graphen_bereinigt.xlsx"
+
+# Antwort-Cache (Label-Suchen und Koordinaten), 30 Tage gültig
+CACHE_PATH = "data/5.4.3_EL/wikidata_cache.sqlite"
+CACHE_TTL = 30 * 24 * 3600
+
+
+class RateLimiter:
+    """Höchstens ``rate`` Anfragen pro Sekunde über alle Threads."""
+
+    def __init__(self, rate: float | None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _is_qid(qid) -> bool:
+    return isinstance(qid, str) and re.fullmatch(r"Q\d+", qid) is not None
+
+
+def parse_point(wkt: str):
+    """``Point(LON LAT)`` → (lat, lon)."""
+    lon_str, lat_str = wkt.replace("Point(", "").replace(")", "").split()
+    return float(lat_str), float(lon_str)
+
+
+class WikidataClient:
+    """Gepoolter, gedrosselter und gecachter Zugriff auf die Wikidata-API und den SPARQL-Endpunkt."""
+
+    def __init__(self, api_url: str = WIKIDATA_API, sparql_url: str = SPARQL_ENDPOINT,
+                 cache_path: str | None = CACHE_PATH, ttl: float | None = CACHE_TTL,
+                 workers: int = 8, rate: float | None = 10.0, timeout: float = 10.0,
+                 language: str = "de", batch_size: int = 200):
+        self.api_url = api_url
+        self.sparql_url = sparql_url
+        self.workers = workers
+        self.timeout = timeout
+        self.language = language
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate)
+        self.cache = Cache(cache_path, ttl=ttl) if cache_path else None
+        self.requests = 0
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET", "POST"), respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    # --- HTTP -----------------------------------------------------------
+
+    def _get_json(self, url: str, params: dict) -> dict:
+        self.limiter.wait()
+        self.requests += 1
+        resp = self.session.get(url, params=params, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def _sparql(self, query: str) -> list:
+        self.limiter.wait()
+        self.requests += 1
+        # POST, damit auch lange VALUES-Blöcke nicht an der URL-Länge scheitern
+        resp = self.session.post(self.sparql_url, data={"query": query}, timeout=self.timeout,
+                                 headers={"Accept": "application/sparql-results+json"})
+        resp.raise_for_status()
+        return resp.json().get("results", {}).get("bindings", [])
+
+    # --- Cache-Rahmen -----------------------------------------------------
+
+    def _cached(self, keys: dict, fetch, items, chunk_size: int = 1) -> dict:
+        """Nachschlagen mit Cache: ``keys`` ordnet jedem Element seinen Cache-Schlüssel zu.
+
+        ``fetch(chunk)`` liefert ein Dict Element → Wert für bis zu ``chunk_size``
+        Elemente; die Teilmengen laufen parallel. Fehlgeschlagene Teilmengen
+        fehlen im Ergebnis.
+        """
+        result, missing = {}, []
+        for item in items:
+            value = self.cache.get(keys[item]) if self.cache is not None else None
+            if value is None:
+                missing.append(item)
+            else:
+                result[item] = value
+        if not missing:
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+            futures = {pool.submit(fetch, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try:
+                    found = future.result()
+                except requests.RequestException as e:
+                    print(f"Fehler bei {futures[future][:3]}…: {e}")
+                    continue
+                for item, value in found.items():
+                    result[item] = value
+                    # Cache nur im Hauptthread beschreiben (SQLite-Verbindung)
+                    if self.cache is not None:
+                        self.cache.put(keys[item], value)
+        return result
+
+    # --- Label-Suche --------------------------------------------------------
+
+    def _fetch_search(self, chunk, kind: str) -> dict:
+        label = chunk[0]
+        data = self._get_json(self.api_url, {
+            "action": "wbsearchentities",
+            "search": label,
+            "language": self.language,
+            "format": "json",
+            "type": kind,
+            "limit": 1,
+        })
+        hits = data.get("search") or []
+        return {label: hits[0]["id"] if hits else ""}
+
+    def search(self, labels, kind: str = "item") -> dict:
+        """Label → Q-ID (``kind="item"``) bzw. P-ID (``kind="property"``); "" wenn nichts gefunden."""
+        unique = list(dict.fromkeys(l for l in labels if isinstance(l, str) and l.strip()))
+        keys = {l: hash_key("search", kind, self.language, l) for l in unique}
+        return self._cached(keys, lambda chunk: self._fetch_search(chunk, kind), unique)
+
+    # --- Koordinaten --------------------------------------------------------
+
+    def _fetch_coordinates(self, qids) -> dict:
+        values = " ".join(f"wd:{qid}" for qid in qids)
+        query = f"SELECT ?item ?coord WHERE {{ VALUES ?item {{ {values} }} ?item wdt:P625 ?coord . }}"
+        found = {qid: [None, None] for qid in qids}
+        for binding in self._sparql(query):
+            qid = binding["item"]["value"].rsplit("/", 1)[-1]
+            # Wie bisher: erste Koordinate gewinnt
+            if qid in found and found[qid][0] is None:
+                try:
+                    found[qid] = list(parse_point(binding["coord"]["value"]))
+                except ValueError:
+                    pass
+        return found
+
+    def coordinates(self, qids) -> dict:
+        """Q-ID → (lat, lon); (None, None) ohne Koordinate (P625)."""
+        unique = list(dict.fromkeys(q for q in (str(q).strip() for q in qids) if _is_qid(q)))
+        keys = {q: hash_key("coord", q) for q in unique}
+        found = self._cached(keys, self._fetch_coordinates, unique, chunk_size=self.batch_size)
+        return {qid: tuple(value) for qid, value in found.items()}
+
+    def report(self) -> str:
+        cache = self.cache.report() if self.cache is not None else "kein Cache"
+        return f"Wikidata: {self.requests} Anfragen; {cache}"
+
+    def close(self) -> None:
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- DataFrame-Schritte des Notebooks ---------------------------------------
+
+def build_frame(data: list, mapping: dict | None = None) -> pd.DataFrame:
+    """RE-Ergebnisse (text/ref/datei/autor/graph) → eine Zeile pro Triple.
+
+    Mit ``mapping`` (``dedup.load_mapping``) werden Subjekte und Objekte durch
+    ihren kanonischen Namen ersetzt, Varianten also nur einmal nachgeschlagen.
+    """
+    mapping = mapping or {}
+    records = []
+    for entry in data:
+        for g in entry.get("graph", []):
+            records.append({
+                "text": entry.get("text", ""),
+                "ref": entry.get("ref", ""),
+                "nbg": "",
+                "datei": entry.get("datei", ""),
+                "autor": entry.get("autor", ""),
+                "subjekt": dedup.canonical(g.get("subjekt", ""), g.get("subjekt_type"), mapping),
+                "subjekt_type": g.get("subjekt_type", ""),
+                "q_subjekt": "",
+                "prädikat": g.get("prädikat", ""),
+                "p_wert": "",
+                "objekt": dedup.canonical(g.get("objekt", ""), g.get("objekt_type"), mapping),
+                "objekt_type": g.get("objekt_type", ""),
+                "q_objekt": "",
+                "zeit": g.get("zeit", ""),
+            })
+    return pd.DataFrame(records)
+
+
+def link_frame(df: pd.DataFrame, client: WikidataClient) -> pd.DataFrame:
+    """Q-IDs für Subjekte und Objekte, P-IDs für Prädikate (jedes Label einmal)."""
+    qids = client.search(pd.concat([df["subjekt"], df["objekt"]]).unique(), kind="item")
+    pids = client.search(df["prädikat"].unique(), kind="property")
+    df["q_subjekt"] = df["subjekt"].map(qids).fillna("")
+    df["q_objekt"] = df["objekt"].map(qids).fillna("")
+    df["p_wert"] = df["prädikat"].map(pids).fillna("")
+    return df
+
+
+def add_coordinates(df: pd.DataFrame, client: WikidataClient) -> pd.DataFrame:
+    """lat/lon für alle Zeilen mit ``objekt_type == "location"`` (jede QID einmal).
+
+    Ortszeilen ohne gültige QID verlieren ihre Koordinaten. Nur Zeilen, deren
+    Abfrage keine Antwort brachte (z. B. ohne Netz), behalten die bisherigen.
+    """
+    locations = df["objekt_type"] == "location"
+    qids = df.loc[locations, "q_objekt"].astype(str).str.strip()
+    invalid = qids.index[~qids.map(_is_qid)]
+    df.loc[invalid, ["lat", "lon"]] = float("nan")
+    coords = client.coordinates(qids.unique())
+    qids = qids[qids.isin(coords.keys())]
+    df.loc[qids.index, "lat"] = qids.map(lambda q: coords[q][0]).astype(float)
+    df.loc[qids.index, "lon"] = qids.map(lambda q: coords[q][1]).astype(float)
+    return df
+
+
+def run_link(input_file: str = TRIPLE_FILE, output_file: str = LINKED_FILE,
+             client: WikidataClient | None = None, entity_file: str = dedup.ENTITY_FILE) -> pd.DataFrame:
+    with open(input_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    # Kanonische Namen aus ``python -m pipeline.dedup`` (ohne Datei: unverändert)
+    mapping = dedup.load_mapping(entity_file)
+    if mapping:
+        print(f"Kanonische Namen: {len(mapping)} Varianten aus {entity_file}")
+    client = WikidataClient() if client is None else client
+    with client:
+        df = link_frame(build_frame(data, mapping), client)
+        print(client.report())
+    df.to_excel(output_file, index=False)
+    print(f"Verknüpft gespeichert in: {output_file}")
+    return df
+
+
+def run_coordinates(graph_file: str = GRAPH_FILE, output_file: str | None = None,
+                    client: WikidataClient | None = None) -> pd.DataFrame:
+    df = pd.read_excel(graph_file)
+    client = WikidataClient() if client is None else client
+    with client:
+        df = add_coordinates(df, client)
+        print(client.report())
+    output_file = graph_file if output_file is None else output_file
+    df.to_excel(output_file, index=False)
+    print(f"Koordinaten gespeichert in: {output_file}")
+    return df
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Wikidata-Abgleich (gepoolt, parallel, gecacht)")
+    ap.add_argument("step", choices=["link", "coordinates"])
+    ap.add_argument("--input", default=None)
+    ap.add_argument("--output", default=None)
+    ap.add_argument("--api", default=WIKIDATA_API)
+    ap.add_argument("--sparql", default=SPARQL_ENDPOINT)
+    ap.add_argument("--cache", default=CACHE_PATH)
+    ap.add_argument("--entities", default=dedup.ENTITY_FILE, help="kanonische Namen (pipeline.dedup)")
+    ap.add_argument("--ttl-days", type=float, default=CACHE_TTL / 86400)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--rate", type=float, default=10.0, help="max. Anfragen pro Sekunde")
+    ap.add_argument("--batch-size", type=int, default=200, help="QIDs pro SPARQL-VALUES-Block")
+    args = ap.parse_args(argv)
+    client = WikidataClient(args.api, args.sparql, cache_path=args.cache, ttl=args.ttl_days * 86400,
+                            workers=args.workers, rate=args.rate, batch_size=args.batch_size)
+    if args.step == "link":
+        run_link(args.input or TRIPLE_FILE, args.output or LINKED_FILE, client, args.entities)
+    else:
+        run_coordinates(args.input or GRAPH_FILE, args.output, client)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""Gesamte Pipeline als Abhängigkeitsgraph: nur neu bauen, was sich geändert hat.
+
+Die Stufen aus ``script.ipynb`` sind hier mit ihren Ein- und Ausgaben
+deklariert (``STAGES``)::
+
+    ocr → clean → tei → ner ┄ saetze → re ┄ dedup → link ┄ speicher → vis
+
+An den Stellen ┄ liegt eine von Hand kuratierte Fassung dazwischen
+(``5.3_TEI_bereinigt``, ``triple_bereinigt.json``,
+``graphen_bereinigt.xlsx``). Sie ist Eingabe der folgenden Stufe und wird
+nie überschrieben; baut die Stufe davor neu, gibt der Lauf einen Hinweis aus.
+
+Wie bei make läuft eine Stufe nur, wenn sich eine ihrer Eingaben (oder ihr
+Modul unter ``pipeline/``) geändert hat oder eine Ausgabe fehlt. Verglichen
+werden SHA-256-Hashes statt Zeitstempeln; eine Datei wird nur neu gehasht,
+wenn sich Größe oder Änderungszeit geändert haben. Nach jedem erfolgreichen
+Schritt werden die Hashes der Eingaben in ``STATE_PATH`` festgehalten, so
+gelten auch Stufen, die ihre Eingabe an Ort und Stelle ändern (Bereinigung,
+NER), danach als aktuell.
+
+Die Stufen bis NER laufen je Personenordner: eine korrigierte Seite baut nur
+Bereinigung, TEI und NER dieser Person neu. TEI verteilt die Personen auf
+einen Prozesspool, OCR und NER bekommen alle betroffenen Personen auf einmal
+und verteilen die Arbeit selbst (Prozesspool bzw. ``nlp.pipe``). Jeder
+Schritt wird sofort gespeichert; nach einem Abbruch oder Fehler setzt der
+nächste Lauf bei den fehlenden Schritten an (die Stufen selbst haben dazu
+ihre Caches und Checkpoints). Nachfolger einer fehlgeschlagenen Person oder
+Stufe werden übersprungen.
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pipeline.make                   # alles Veraltete neu bauen
+    python -m pipeline.make -n                # nur anzeigen, was laufen würde
+    python -m pipeline.make tei               # bis einschließlich tei
+    python -m pipeline.make --personen 1823_Bonatz_Johanna
+    python -m pipeline.make --erzwingen ner   # Stufe unabhängig vom Stand neu bauen
+    python -m pipeline.make --als-aktuell     # frischer Checkout: Stand festhalten, nichts ausführen
+
+Nach einem frischen Checkout fehlt ``STATE_PATH`` (nicht im Repository), und
+jede Einheit gilt als neu. Die Stufen würden dann auf bereits bereinigten und
+korrigierten Dateien erneut laufen; ``--als-aktuell`` hält stattdessen die
+eingecheckten Dateien als gebaut fest. OCR überschreibt vorhandene
+TXT-Dateien ohnehin nur mit ``--erzwingen ocr``.
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable
+
+from pipeline.cache import Cache, file_hash
+
+# Stand der Stufen und Datei-Hashes
+STATE_PATH = "data/pipeline_state.sqlite"
+
+# Pfade (Standardpfade der Stufen-Module)
+JPG_DIR = "data/5.2_OCR-Erkennung/jpg"
+TXT_DIR = "data/5.2_OCR-Erkennung/txt"
+TEI_DIR = "data/5.3_TEI-Modellierung"
+TEI_CURATED = "data/5.3_TEI-Modellierung/5.3_TEI_bereinigt"
+SENTENCE_FILE = "data/5.4.2_RE/sätze.jsonl"
+TRIPLE_FILE = "data/5.4.2_RE/triple.json"
+TRIPLE_CURATED = "data/5.4.2_RE/triple_bereinigt.json"
+ENTITY_FILE = "data/5.4.2_RE/entitaeten.json"
+LINKED_FILE = "data/5.4.2_RE/graphen.xlsx"
+GRAPH_CURATED = "data/5.4.3_EL/graphen_bereinigt.xlsx"
+STORE_DIR = "data/5.4.3_EL/graphen"
+
+# Einheit der Stufen, die über alle Personen laufen
+ALL = "*"
+
+
+def _files(folder: str, ext: str) -> list:
+    if not os.path.isdir(folder):
+        return []
+    return [os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.lower().endswith(ext)]
+
+
+def _subdirs(folder: str) -> list:
+    if not os.path.isdir(folder):
+        return []
+    return [f for f in sorted(os.listdir(folder)) if os.path.isdir(os.path.join(folder, f))]
+
+
+def _txt_for_jpg(person: str) -> list:
+    return [os.path.join(TXT_DIR, person, os.path.splitext(os.path.basename(p))[0] + ".txt")
+            for p in _files(os.path.join(JPG_DIR, person), ".jpg")]
+
+
+def _tei_file(person: str) -> str:
+    return os.path.join(TEI_DIR, person + ".xml")
+
+
+def _tei_persons() -> list:
+    return [os.path.splitext(os.path.basename(p))[0] for p in _files(TEI_DIR, ".xml")]
+
+
+# ---------- Ausführung der Stufen (Module erst hier importieren: Tesseract, spaCy, Ollama) ----------
+
+def _run_ocr(persons, workers, force):
+    from pipeline import ocr
+    # Ohne force bleiben vorhandene (evtl. handkorrigierte) TXT-Dateien stehen
+    ocr.run(folders=persons, workers=workers, force=force)
+
+
+def _run_clean(persons, workers, force):
+    from pipeline import cleaning
+    cleaning.run(folders=persons)
+
+
+def _run_tei(person, workers, force):
+    from pipeline import tei
+    tei.run(check=True, folders=[person])
+
+
+def _run_ner(persons, workers, force):
+    from pipeline import ner
+    ner.run(files=[_tei_file(p) for p in persons])
+
+
+def _run_sentences(_, workers, force):
+    from pipeline import sentences
+    sentences.run(workers=workers)
+
+
+def _run_relations(_, workers, force):
+    from pipeline import relations
+    relations.run()
+
+
+def _run_dedup(_, workers, force):
+    from pipeline import dedup
+    dedup.run()
+
+
+def _run_link(_, workers, force):
+    from pipeline import linking
+    linking.run_link()
+
+
+def _run_store(_, workers, force):
+    from pipeline import linking, triplestore
+    # Koordinaten in die kuratierte Datei, dann in den Triple-Speicher
+    linking.run_coordinates()
+    triplestore.import_xlsx()
+
+
+def _run_vis(_, workers, force):
+    from pipeline import graph, routen
+    graph.update_layout()
+    routen.update_routes()
+
+
+@dataclass(frozen=True)
+class Stage:
+    """Eine Stufe mit Ein- und Ausgaben je Einheit (Personenordner oder ``ALL``).
+
+    ``action`` bekommt die Liste der veralteten Einheiten, bei ``parallel``
+    dagegen je Aufruf eine Einheit (im Prozesspool).
+    """
+    name: str
+    modules: tuple                       # Code der Stufe (Änderung → neu bauen)
+    inputs: Callable                     # Einheit → Pfade
+    outputs: Callable                    # Einheit → Pfade
+    action: Callable                     # (Einheiten bzw. Einheit, workers, erzwungen)
+    deps: tuple = ()
+    units: Callable | None = None        # Personenordner; None = eine Einheit für alles
+    parallel: bool = False
+    curated: str | None = None           # kuratierte Fassung der Ausgabe (wird nicht überschrieben)
+
+
+STAGES = [
+    Stage("ocr", ("ocr", "preprocessing"),
+          inputs=lambda p: _files(os.path.join(JPG_DIR, p), ".jpg"),
+          outputs=_txt_for_jpg,
+          action=_run_ocr, units=lambda: _subdirs(JPG_DIR)),
+    Stage("clean", ("cleaning",),
+          inputs=lambda p: _files(os.path.join(TXT_DIR, p), ".txt"),
+          outputs=lambda p: _files(os.path.join(TXT_DIR, p), ".txt"),
+          action=_run_clean, deps=("ocr",), units=lambda: _subdirs(TXT_DIR)),
+    Stage("tei", ("tei",),
+          inputs=lambda p: _files(os.path.join(TXT_DIR, p), ".txt"),
+          outputs=lambda p: [_tei_file(p)],
+          action=_run_tei, deps=("clean",), units=lambda: _subdirs(TXT_DIR), parallel=True),
+    Stage("ner", ("ner",),
+          inputs=lambda p: [_tei_file(p)],
+          outputs=lambda p: [_tei_file(p)],
+          action=_run_ner, deps=("tei",), units=_tei_persons, curated=TEI_CURATED),
+    Stage("saetze", ("sentences",),
+          inputs=lambda _: _files(TEI_CURATED, ".xml"),
+          outputs=lambda _: [SENTENCE_FILE],
+          action=_run_sentences),
+    Stage("re", ("relations",),
+          inputs=lambda _: [SENTENCE_FILE],
+          outputs=lambda _: [TRIPLE_FILE],
+          action=_run_relations, deps=("saetze",), curated=TRIPLE_CURATED),
+    Stage("dedup", ("dedup", "search"),
+          inputs=lambda _: [TRIPLE_CURATED],
+          outputs=lambda _: [ENTITY_FILE],
+          action=_run_dedup),
+    Stage("link", ("linking",),
+          inputs=lambda _: [TRIPLE_CURATED, ENTITY_FILE],
+          outputs=lambda _: [LINKED_FILE],
+          action=_run_link, deps=("dedup",), curated=GRAPH_CURATED),
+    Stage("speicher", ("triplestore", "zeit"),
+          inputs=lambda _: [GRAPH_CURATED],
+          outputs=lambda _: [os.path.join(STORE_DIR, f) for f in
+                             ("manifest.json", "triples.parquet", "sentences.parquet")],
+          action=_run_store),
+    Stage("vis", ("graph", "routen", "geo"),
+          inputs=lambda _: [os.path.join(STORE_DIR, "manifest.json")],
+          outputs=lambda _: [os.path.join(STORE_DIR, f) for f in ("layout.parquet", "routen.parquet")],
+          action=_run_vis, deps=("speicher",)),
+]
+STAGE_NAMES = [s.name for s in STAGES]
+
+
+def select(targets=None) -> list:
+    """Stufen für ``targets`` samt aller Vorstufen, in Ausführungsreihenfolge."""
+    by_name = {s.name: s for s in STAGES}
+    wanted, todo = set(), list(targets or STAGE_NAMES)
+    while todo:
+        name = todo.pop()
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(by_name[name].deps)
+    return [s for s in STAGES if s.name in wanted]
+
+
+def _missing(stage: Stage, unit: str) -> list:
+    """Fehlende Ausgaben; ist die kuratierte Fassung vorhanden, zählt eine fehlende
+    ungeprüfte Ausgabe nicht (``triple.json`` und ``graphen.xlsx`` sind nicht eingecheckt)."""
+    if stage.curated and os.path.exists(stage.curated):
+        return []
+    return [p for p in stage.outputs(unit) if not os.path.exists(p)]
+
+
+class State:
+    """Datei-Hashes (mit Größe und Änderungszeit) und der Stand jeder erledigten Einheit."""
+
+    def __init__(self, path: str = STATE_PATH):
+        self.cache = Cache(path)
+
+    def hash(self, path: str):
+        """SHA-256 der Datei oder ``None``, wenn sie fehlt."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = "datei:" + path
+        entry = self.cache.get(key)
+        if entry is not None and entry[:2] == [st.st_size, st.st_mtime_ns]:
+            return entry[2]
+        h = file_hash(path)
+        self.cache.put(key, [st.st_size, st.st_mtime_ns, h])
+        return h
+
+    def fingerprint(self, stage: Stage, unit: str) -> dict:
+        paths = list(stage.inputs(unit)) + [os.path.join("pipeline", m + ".py") for m in stage.modules]
+        return {p: self.hash(p) for p in sorted(set(paths))}
+
+    def stale(self, stage: Stage, unit: str):
+        """Grund für einen Neubau oder ``None``, wenn die Einheit aktuell ist."""
+        done = self.cache.get(f"stufe:{stage.name}:{unit}")
+        if done is None:
+            return "neu"
+        missing = _missing(stage, unit)
+        if missing:
+            return f"Ausgabe fehlt: {missing[0]}"
+        now = self.fingerprint(stage, unit)
+        changed = sorted(p for p in now.keys() | done.keys() if now.get(p) != done.get(p))
+        if changed:
+            more = f" (+{len(changed) - 1})" if len(changed) > 1 else ""
+            return f"geändert: {changed[0]}{more}"
+        return None
+
+    def record(self, stage: Stage, unit: str) -> None:
+        self.cache.put(f"stufe:{stage.name}:{unit}", self.fingerprint(stage, unit))
+
+    def close(self) -> None:
+        self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _hit(stage: Stage, unit: str, marked: dict) -> bool:
+    """Ist eine Vorstufe dieser Einheit in ``marked`` (Stufe → Einheiten)?"""
+    for dep in stage.deps:
+        units = marked.get(dep, set())
+        if unit in units or ALL in units or (unit == ALL and units):
+            return True
+    return False
+
+
+def _execute(stage: Stage, units: list, workers=None, force: bool = False) -> set:
+    """Stufe für ``units`` ausführen; gibt die fehlgeschlagenen Einheiten zurück."""
+    if not stage.parallel:
+        try:
+            stage.action(units, workers, force)
+        except Exception as e:
+            print(f"Fehler in {stage.name}: {e}")
+            return set(units)
+        return set()
+
+    failed = set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(stage.action, unit, workers, force): unit for unit in units}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Fehler in {stage.name} ({futures[future]}): {e}")
+                failed.add(futures[future])
+    return failed
+
+
+def build(targets=None, persons=None, force=(), dry_run: bool = False, workers=None,
+          state_path: str = STATE_PATH, mark_current: bool = False) -> dict:
+    """Veraltete Stufen bauen; gibt je Stufe (gebaut, aktuell, fehlgeschlagen) zurück.
+
+    ``persons`` beschränkt die Personen-Stufen auf diese Ordner, ``force``
+    baut die genannten Stufen vollständig neu. Mit ``dry_run`` wird nur
+    ausgegeben, was laufen würde (Nachfolger geplanter Einheiten gelten dabei
+    als veraltet). ``mark_current`` führt keine Stufe aus, sondern hält die
+    vorhandenen Ein- und Ausgaben als gebaut fest (z. B. nach einem frischen
+    Checkout, in dem ``STATE_PATH`` fehlt); Einheiten mit fehlender Ausgabe
+    gelten als fehlgeschlagen, außer die kuratierte Fassung der Stufe ist
+    vorhanden.
+    """
+    failed, planned, result = {}, {}, {}
+    with State(state_path) as state:
+        for stage in select(targets):
+            units = stage.units() if stage.units else [ALL]
+            if persons and stage.units:
+                units = [u for u in units if u in persons]
+
+            todo, blocked = [], []
+            for unit in units:
+                if _hit(stage, unit, failed):
+                    blocked.append(unit)
+                    continue
+                reason = "erzwungen" if stage.name in force else state.stale(stage, unit)
+                if reason is None and _hit(stage, unit, planned):
+                    reason = "Vorstufe neu"
+                if reason is not None:
+                    todo.append(unit)
+                    print(f"{stage.name:<9} {unit}: {reason}")
+            for unit in blocked:
+                print(f"{stage.name:<9} {unit}: übersprungen (Vorstufe fehlgeschlagen)")
+
+            if mark_current and not dry_run:
+                bad = set()
+                for unit in todo:
+                    missing = _missing(stage, unit)
+                    if missing:
+                        print(f"{stage.name:<9} {unit}: nicht markiert, Ausgabe fehlt: {missing[0]}")
+                        bad.add(unit)
+                    else:
+                        state.record(stage, unit)
+                failed[stage.name] = bad | set(blocked)
+                result[stage.name] = (len(todo) - len(bad), len(units) - len(todo) - len(blocked),
+                                      len(bad) + len(blocked))
+                continue
+
+            if dry_run or not todo:
+                planned[stage.name] = set(todo)
+                failed[stage.name] = set(blocked)
+                result[stage.name] = (len(todo), len(units) - len(todo) - len(blocked), len(blocked))
+                continue
+
+            bad = _execute(stage, todo, workers, stage.name in force)
+            for unit in todo:
+                if unit in bad:
+                    continue
+                missing = [p for p in stage.outputs(unit) if not os.path.exists(p)]
+                if missing:
+                    print(f"{stage.name:<9} {unit}: Ausgabe fehlt nach dem Lauf: {missing[0]}")
+                    bad.add(unit)
+                else:
+                    # Sofort festhalten: ein späterer Abbruch verliert diesen Schritt nicht
+                    state.record(stage, unit)
+            failed[stage.name] = bad | set(blocked)
+            built = len(todo) - len(bad)
+            result[stage.name] = (built, len(units) - len(todo) - len(blocked), len(bad) + len(blocked))
+            if stage.curated and built:
+                print(f"Hinweis: {stage.name} hat neu erzeugt; die kuratierte Fassung {stage.curated} "
+                      f"wird nicht überschrieben – Änderungen dort übernehmen und erneut starten.")
+
+    heading = "Geplant" if dry_run else "Als aktuell markiert" if mark_current else "Ergebnis"
+    print(heading + ": " + ", ".join(
+        f"{name} {built}/{built + current + bad}" + (f" ({bad} Fehler)" if bad else "")
+        for name, (built, current, bad) in result.items()))
+    return result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Pipeline inkrementell bauen (Abhängigkeitsgraph, Inhalts-Hashes)")
+    ap.add_argument("ziele", nargs="*", metavar="STUFE",
+                    help=f"bis zu diesen Stufen bauen (Standard: alle; {', '.join(STAGE_NAMES)})")
+    ap.add_argument("-n", "--trocken", action="store_true", help="nur anzeigen, was laufen würde")
+    ap.add_argument("--personen", nargs="+", help="nur diese Personenordner")
+    ap.add_argument("--erzwingen", nargs="+", default=(), choices=STAGE_NAMES, metavar="STUFE",
+                    help="diese Stufen unabhängig vom Stand neu bauen")
+    ap.add_argument("--als-aktuell", action="store_true",
+                    help="nichts ausführen, vorhandene Dateien als gebaut festhalten (nach frischem Checkout)")
+    ap.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    ap.add_argument("--state", default=STATE_PATH)
+    args = ap.parse_args(argv)
+    unknown = [z for z in args.ziele if z not in STAGE_NAMES]
+    if unknown:
+        ap.error(f"unbekannte Stufe: {', '.join(unknown)} (möglich: {', '.join(STAGE_NAMES)})")
+    result = build(args.ziele or None, args.personen, set(args.erzwingen), args.trocken, args.workers, args.state,
+                   args.als_aktuell)
+    if any(bad for _, _, bad in result.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""5.3 XML/TEI-Modellierung (Teil 2): NER-Annotation der TEI-Absätze im Stapel.
+
+Statt ``ner_model(sentence)`` einzeln pro Satz aufzurufen, werden die Sätze
+aller Dokumente als ein Strom durch ``nlp.pipe`` geschickt (einstellbare
+``batch_size`` und ``n_process``). Die Entitäten werden anschließend als
+``persName``/``placeName``/``date`` in ``<s>``-Elemente zurückgeschrieben.
+
+Die Dokumente werden nur so weit im Voraus eingelesen, wie ``nlp.pipe``
+Sätze anfordert; jede Datei wird geschrieben, sobald ihr letzter Satz
+annotiert ist.
+
+Ein Annotationsindex (``INDEX_PATH``) speichert pro Absatz einen
+Fingerabdruck aus den normalisierten Sätzen und der Modellversion
+(``meta.json`` von ``model-best``) samt den Entitäten. Ein erneuter Lauf
+schickt nur neue oder geänderte Absätze durch das Modell; nach einem neuen
+Training ändert sich die Modellversion und alle Absätze werden neu annotiert.
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pipeline.ner --batch-size 512 --n-process 4
+"""
+import argparse
+import os
+import re
+from collections import deque
+
+import spacy
+from lxml import etree as ET
+
+from pipeline.cache import Cache, hash_key
+
+# spaCy-Modell
+MODEL_PATH = "data/5.4.1_NER/output/model-best"
+
+# XML-Dateien
+INPUT_DIR = "data/5.3_TEI-Modellierung"
+
+# Annotationsindex: Absatz-Fingerabdruck + Modellversion → Entitäten je Satz
+INDEX_PATH = "data/5.3_TEI-Modellierung/ner_index.sqlite"
+
+# Namespace-Map für TEI
+ns = {"tei": "http://www.tei-c.org/ns/1.0"}
+
+# Entität-Typen zu Tags zuordnen
+tag_map = {"PER": "persName", "LOC": "placeName", "DATE": "date"}
+
+
+def find_files(input_dir: str = INPUT_DIR) -> list:
+    """Alle XML-Dateien im Verzeichnis (rekursiv)."""
+    paths = []
+    for root_dir, _, files in os.walk(input_dir):
+        for file_name in sorted(files):
+            if file_name.endswith(".xml"):
+                paths.append(os.path.join(root_dir, file_name))
+    return sorted(paths)
+
+
+def split_sentences(p_elem) -> list:
+    """Text aus dem Absatz holen, bereinigen und in Sätze aufteilen (am Punkt + Leerzeichen)."""
+    full_text = "".join(p_elem.itertext())
+    cleaned_text = re.sub(r"(?<=\d)\.(?=\s|$)", "", full_text).strip()
+    return [s.strip() for s in cleaned_text.split(". ") if s.strip()]
+
+
+def doc_spans(doc) -> list:
+    """Relevante Entitäten eines spaCy-Docs als (Label, Start, Ende)."""
+    return [(ent.label_, ent.start_char, ent.end_char) for ent in doc.ents if ent.label_ in tag_map]
+
+
+def fill_paragraph(p_elem, sentences: list, spans: list) -> None:
+    """Absatz leeren und Sätze samt Entitäten als <s>-Elemente neu aufbauen."""
+    p_elem.clear()
+
+    for sentence, ents in zip(sentences, spans):
+        if not ents:
+            p_elem.text = (p_elem.text or "") + sentence + ". "
+            continue
+
+        # Neues <s>-Element erstellen
+        s_elem = ET.Element("s")
+        last_idx = 0
+
+        for label, start, end in ents:
+            # Text vor der Entität einfügen
+            if start > last_idx:
+                chunk = sentence[last_idx:start]
+                if len(s_elem) == 0:
+                    s_elem.text = chunk
+                else:
+                    s_elem[-1].tail = chunk
+
+            # Entität als XML-Element einfügen
+            ent_elem = ET.Element(tag_map[label])
+            ent_elem.text = sentence[start:end]
+            s_elem.append(ent_elem)
+
+            last_idx = end
+
+        # Rest vom Satz + Punkt einfügen
+        remaining = sentence[last_idx:] + ". "
+        if len(s_elem) == 0:
+            s_elem.text = remaining
+        else:
+            s_elem[-1].tail = remaining
+
+        p_elem.append(s_elem)
+
+
+def load_document(file_path: str):
+    """XML-Datei laden; gibt (Baum, nicht-leere p-Elemente) zurück."""
+    parser = ET.XMLParser(remove_blank_text=True)
+    tree = ET.parse(file_path, parser)
+    p_elems = [
+        p_elem for p_elem in tree.getroot().xpath(".//tei:text//tei:p", namespaces=ns)
+        # Leere Absätze überspringen
+        if not (p_elem.text is None and len(p_elem) == 0)
+    ]
+    return tree, p_elems
+
+
+def save_document(tree, file_path: str) -> None:
+    tree.write(file_path, encoding="utf-8", pretty_print=True, xml_declaration=True)
+
+
+def model_version(nlp) -> str:
+    """Kennung des Modells aus meta.json (ändert sich bei jedem neuen Training)."""
+    return hash_key(nlp.meta, nlp.pipe_names)[:16]
+
+
+def _output_key(p_elem) -> str:
+    return hash_key("output", "".join(p_elem.itertext()))
+
+
+def annotate(paths, nlp, batch_size: int = 256, n_process: int = 1, index: Cache | None = None) -> dict:
+    """Alle Dateien mit einem gemeinsamen ``nlp.pipe``-Strom annotieren.
+
+    Mit ``index`` werden nur Absätze durch das Modell geschickt, deren
+    Fingerabdruck (normalisierte Sätze + Modellversion) noch unbekannt ist;
+    alle anderen werden aus dem Index übernommen. Zusätzlich merkt sich der
+    Index den Text jedes annotierten Absatzes: Absätze, die bereits Ausgabe
+    des aktuellen Modells sind, bleiben unangetastet. Dateien werden nur
+    geschrieben, wenn sich ein Absatz tatsächlich geändert hat.
+
+    Gibt Zähler für Sätze (Modell), Absätze (aktuell/Index/Modell) und Dateien zurück.
+    """
+    version = model_version(nlp)
+    stats = {"sentences": 0, "paragraphs_current": 0, "paragraphs_cached": 0,
+             "paragraphs_tagged": 0, "files_written": 0}
+    # Aufgaben in Eingabereihenfolge:
+    # ("p", p-Element, Sätze, Schlüssel, Spans|None, Status) oder ("save", Baum, Pfad, Status)
+    tasks = deque()
+    spans = deque()
+    # Index-Einträge bis zum Ende des Dokuments sammeln
+    pending = []
+
+    def sentences():
+        for file_path in paths:
+            print(f"Verarbeite: {file_path}")
+            tree, p_elems = load_document(file_path)
+            state = {"changed": False}
+            for p_elem in p_elems:
+                origin = index.get(_output_key(p_elem)) if index is not None else None
+                if origin is not None and origin["version"] == version:
+                    # Absatz ist bereits die Ausgabe dieses Modells
+                    stats["paragraphs_current"] += 1
+                    continue
+                # Bereits annotierte Absätze aus ihren ursprünglichen Sätzen neu aufbauen,
+                # sonst würden Satzpunkte bei jedem Lauf erneut angehängt
+                sents = origin["sentences"] if origin is not None else split_sentences(p_elem)
+                key = hash_key(version, sents)
+                cached = index.get(key) if index is not None else None
+                tasks.append(("p", p_elem, sents, key, cached, state))
+                if cached is None:
+                    yield from sents
+            tasks.append(("save", tree, file_path, state))
+            # Ohne offene Sätze (alles aktuell oder im Index) kommt kein Doc zurück,
+            # das flush() auslöst – sonst blieben alle Bäume in ``tasks`` liegen
+            flush()
+
+    def fill(p_elem, sents, p_spans, state):
+        before = ET.tostring(p_elem)
+        fill_paragraph(p_elem, sents, p_spans)
+        if ET.tostring(p_elem) != before:
+            state["changed"] = True
+        if index is not None:
+            pending.append((_output_key(p_elem), {"sentences": sents, "version": version}))
+
+    def flush():
+        # Alle Aufgaben abarbeiten, für die genügend Docs vorliegen
+        while tasks:
+            task = tasks[0]
+            if task[0] == "save":
+                _, tree, file_path, state = task
+                if pending:
+                    # Index-Einträge des Dokuments mit einem Commit
+                    index.put_many(pending)
+                    pending.clear()
+                if state["changed"]:
+                    save_document(tree, file_path)
+                    stats["files_written"] += 1
+                    print(f"Überschrieben: {file_path}")
+            else:
+                _, p_elem, sents, key, cached, state = task
+                if cached is not None:
+                    fill(p_elem, sents, [[tuple(e) for e in ents] for ents in cached], state)
+                    stats["paragraphs_cached"] += 1
+                elif len(spans) >= len(sents):
+                    p_spans = [spans.popleft() for _ in sents]
+                    fill(p_elem, sents, p_spans, state)
+                    if index is not None:
+                        pending.append((key, p_spans))
+                    stats["paragraphs_tagged"] += 1
+                else:
+                    return
+            tasks.popleft()
+
+    # nlp.pipe liefert die Docs in Eingabereihenfolge, auch mit n_process > 1
+    for doc in nlp.pipe(sentences(), batch_size=batch_size, n_process=n_process):
+        spans.append(doc_spans(doc))
+        stats["sentences"] += 1
+        flush()
+    flush()
+    return stats
+
+
+def run(input_dir: str = INPUT_DIR, model_path: str = MODEL_PATH, batch_size: int = 256,
+        n_process: int = 1, nlp=None, index_path: str | None = INDEX_PATH, files=None) -> dict:
+    """Alle TEI-Dateien unter ``input_dir`` annotieren; ``index_path=None`` annotiert alles neu.
+
+    ``files`` annotiert nur diese Dateien (z. B. die geänderten Personen).
+    """
+    nlp = spacy.load(model_path) if nlp is None else nlp
+    index = Cache(index_path) if index_path else None
+    paths = find_files(input_dir) if files is None else sorted(files)
+    try:
+        stats = annotate(paths, nlp, batch_size=batch_size, n_process=n_process, index=index)
+    finally:
+        if index is not None:
+            index.close()
+    print(
+        f"NER: {stats['paragraphs_tagged']} Absätze ({stats['sentences']} Sätze) annotiert, "
+        f"{stats['paragraphs_cached']} aus dem Index, {stats['paragraphs_current']} aktuell, "
+        f"{stats['files_written']} Dateien geschrieben"
+    )
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(
+        description="NER-Annotation der TEI-Absätze (nur neue/geänderte Absätze oder neues Modell)"
+    )
+    ap.add_argument("--input", default=INPUT_DIR)
+    ap.add_argument("--model", default=MODEL_PATH)
+    ap.add_argument("--index", default=INDEX_PATH, help="Annotationsindex (Fingerabdruck → Entitäten)")
+    ap.add_argument("--full", action="store_true", help="Index ignorieren und alles neu annotieren")
+    ap.add_argument("--batch-size", type=int, default=256)
+    ap.add_argument("--n-process", type=int, default=1)
+    args = ap.parse_args(argv)
+    run(args.input, args.model, batch_size=args.batch_size, n_process=args.n_process,
+        index_path=None if args.full else args.index)
+
+
+if __name__ == "__main__":
+    main()
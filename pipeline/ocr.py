@@ -0,0 +1,144 @@
+"""5.2 OCR-Erkennung als parallele, fortsetzbare Pipeline-Stufe.
+
+Die Seiten werden über einen Prozesspool auf alle Kerne verteilt. Jedes
+Ergebnis landet sofort in einem persistenten Cache, dessen Schlüssel aus dem
+Bild-Hash, den Vorverarbeitungsparametern, der Sprache und der
+Tesseract-Version gebildet wird. Seiten mit vorhandener TXT-Datei werden
+übersprungen (``--erzwingen`` erkennt sie neu), ein abgebrochener Lauf setzt
+beim nächsten Start an derselben Stelle fort.
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pipeline.ocr --workers 8
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pytesseract
+
+from pipeline.cache import Cache, file_hash, hash_key
+from pipeline.preprocessing import PreprocessParams, load_page
+
+# Ordner mit den jpg-Dateien
+BASE_FOLDER = "data/5.2_OCR-Erkennung/jpg"
+
+# Ordner für die TXT-Dateien
+OUTPUT_BASE = "data/5.2_OCR-Erkennung/txt"
+
+# Seiten-Cache (Bild-Hash + Parameter → OCR-Text)
+CACHE_PATH = "data/5.2_OCR-Erkennung/ocr_cache.sqlite"
+
+LANG = "deu+frk"
+
+# Parameter der Bildvorverarbeitung (gehen in den Cache-Schlüssel ein)
+PARAMS = PreprocessParams()
+
+
+def ocr_page(img_path: str, params: PreprocessParams, lang: str = LANG) -> str:
+    """Eine Seite laden, vorverarbeiten und erkennen (läuft im Worker-Prozess)."""
+    return pytesseract.image_to_string(load_page(img_path, params), lang=lang)
+
+
+def find_pages(base_folder: str = BASE_FOLDER, output_base: str = OUTPUT_BASE, folders=None):
+    """Alle (jpg-Pfad, txt-Pfad)-Paare, ordnerweise und nach Dateiname sortiert.
+
+    ``folders`` beschränkt die Suche auf diese Personenordner.
+    """
+    pages = []
+    for folder_name in sorted(os.listdir(base_folder) if folders is None else folders):
+        folder_path = os.path.join(base_folder, folder_name)
+
+        # Nur Verzeichnisse berücksichtigen
+        if not os.path.isdir(folder_path):
+            continue
+
+        jpeg_files = sorted(f for f in os.listdir(folder_path) if f.lower().endswith(".jpg"))
+        if not jpeg_files:
+            print(f"Keine .jpg-Dateien in Ordner: {folder_name}")
+            continue
+
+        output_folder = os.path.join(output_base, folder_name)
+        for jpeg_file in jpeg_files:
+            txt_filename = os.path.splitext(jpeg_file)[0] + ".txt"
+            pages.append((os.path.join(folder_path, jpeg_file), os.path.join(output_folder, txt_filename)))
+    return pages
+
+
+def _write_text(txt_path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(txt_path), exist_ok=True)
+    with open(txt_path, "w", encoding="utf-8") as txt_file:
+        txt_file.write(text)
+
+
+def run(base_folder=BASE_FOLDER, output_base=OUTPUT_BASE, cache_path=CACHE_PATH,
+        params=None, lang=LANG, workers=None, folders=None, force=False):
+    """OCR für alle Seiten ohne TXT-Datei; gibt (neu, übersprungen, Fehler) zurück.
+
+    Vorhandene TXT-Dateien werden nicht angefasst, auch wenn der Seiten-Cache
+    (nicht im Repository) fehlt, damit spätere Bereinigungen und
+    Handkorrekturen erhalten bleiben. ``force`` erkennt alle Seiten neu
+    (bzw. nimmt sie aus dem Cache) und überschreibt die TXT-Dateien.
+    """
+    params = PARAMS if params is None else params
+    done = skipped = failed = 0
+
+    with Cache(cache_path) as cache:
+        todo = []
+        version = None
+        for img_path, txt_path in find_pages(base_folder, output_base, folders):
+            if not force and os.path.exists(txt_path):
+                skipped += 1
+                continue
+            if version is None:
+                version = str(pytesseract.get_tesseract_version())
+            key = hash_key(file_hash(img_path), params.to_dict(), lang, version)
+            text = cache.get(key)
+            if text is None:
+                todo.append((key, img_path, txt_path))
+                continue
+            _write_text(txt_path, text)
+            skipped += 1
+
+        if todo:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(ocr_page, img_path, params, lang): (key, img_path, txt_path)
+                    for key, img_path, txt_path in todo
+                }
+                for future in as_completed(futures):
+                    key, img_path, txt_path = futures[future]
+                    try:
+                        text = future.result()
+                    except Exception as e:
+                        print(f"Fehler bei {img_path}: {e}")
+                        failed += 1
+                        continue
+                    # Sofort sichern, damit ein Abbruch nichts verliert
+                    cache.put(key, text)
+                    _write_text(txt_path, text)
+                    done += 1
+                    print(f"Text gespeichert in: {txt_path}")
+
+    print(f"OCR: {done} neu erkannt, {skipped} vorhanden oder aus dem Cache, {failed} Fehler")
+    return done, skipped, failed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="OCR-Erkennung mit Seiten-Cache")
+    ap.add_argument("--input", default=BASE_FOLDER)
+    ap.add_argument("--output", default=OUTPUT_BASE)
+    ap.add_argument("--cache", default=CACHE_PATH)
+    ap.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    ap.add_argument("--threshold", type=int, default=PARAMS.threshold)
+    ap.add_argument("--alpha", type=float, default=PARAMS.alpha)
+    ap.add_argument("--scale", type=float, default=PARAMS.scale, help="Verkleinerung, z. B. 0.5")
+    ap.add_argument("--deskew", action="store_true", help="Schräglage korrigieren")
+    ap.add_argument("--erzwingen", action="store_true", help="vorhandene TXT-Dateien überschreiben")
+    args = ap.parse_args(argv)
+    params = PreprocessParams(threshold=args.threshold, alpha=args.alpha, scale=args.scale, deskew=args.deskew)
+    run(args.input, args.output, args.cache, params=params, workers=args.workers, force=args.erzwingen)
+
+
+if __name__ == "__main__":
+    main()
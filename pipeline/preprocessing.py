@@ -0,0 +1,103 @@
+"""Bildvorverarbeitung für die OCR in einem einzigen, speichersparenden Durchlauf.
+
+Die ursprüngliche Kette aus ``script.ipynb`` (``bitwise_not`` → ``cvtColor`` →
+``threshold`` → ``convertScaleAbs``) legt pro Schritt eine vollständige Kopie
+der Seite an. Hier wird die Seite direkt als Graustufenbild dekodiert und alle
+Schritte werden zu einer 256-Einträge-Lookup-Tabelle zusammengefasst, die
+``cv2.LUT`` in-place auf das Graustufenbild anwendet:
+
+    invertieren:  v = 255 - g
+    binarisieren: b = 255 if v > threshold else 0
+    Kontrast:     out = saturate(alpha * b + beta)
+
+Pro Seite bleibt damit genau ein 8-Bit-Einkanal-Array im Speicher.
+"""
+from dataclasses import asdict, dataclass
+
+import cv2
+import numpy as np
+
+# JPEG-Dekodierung direkt in reduzierter Auflösung (spart das Vollbild)
+_REDUCED_FLAGS = {
+    1.0: cv2.IMREAD_GRAYSCALE,
+    0.5: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    0.25: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    0.125: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+@dataclass(frozen=True)
+class PreprocessParams:
+    """Einstellbare Parameter; ``threshold`` und ``alpha`` wie im Notebook."""
+
+    threshold: int = 120
+    alpha: float = 2.0
+    beta: float = 0.0
+    scale: float = 1.0          # < 1.0 verkleinert die Seite
+    deskew: bool = False        # Schräglage schätzen und korrigieren
+    max_skew: float = 10.0      # größere Winkel gelten als Fehlschätzung
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def build_lut(params: PreprocessParams) -> np.ndarray:
+    """Lookup-Tabelle für Invertieren, Binarisieren und Kontrast."""
+    g = np.arange(256, dtype=np.float32)
+    binary = np.where(255.0 - g > params.threshold, 255.0, 0.0)
+    return np.clip(np.rint(params.alpha * binary + params.beta), 0, 255).astype(np.uint8)
+
+
+def _deskew(img: np.ndarray, params: PreprocessParams, lut: np.ndarray) -> np.ndarray:
+    # Vordergrund = Schrift; Hintergrundwert ist der LUT-Wert für Weiß
+    background = int(lut[255])
+    coords = cv2.findNonZero(cv2.compare(img, background, cv2.CMP_NE))
+    if coords is None:
+        return img
+    angle = cv2.minAreaRect(coords)[-1]
+    if angle > 45:
+        angle -= 90
+    if abs(angle) < 0.1 or abs(angle) > params.max_skew:
+        return img
+    h, w = img.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(img, matrix, (w, h), flags=cv2.INTER_NEAREST,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=background)
+
+
+def preprocess_array(img: np.ndarray, params: PreprocessParams = PreprocessParams(),
+                     lut: np.ndarray | None = None) -> np.ndarray:
+    """Bereits dekodierte Seite vorverarbeiten; Graustufenbilder werden in-place überschrieben."""
+    lut = build_lut(params) if lut is None else lut
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if params.scale != 1.0:
+        gray = cv2.resize(gray, None, fx=params.scale, fy=params.scale, interpolation=cv2.INTER_AREA)
+    cv2.LUT(gray, lut, dst=gray)
+    if params.deskew:
+        gray = _deskew(gray, params, lut)
+    return gray
+
+
+def load_page(path: str, params: PreprocessParams = PreprocessParams(),
+              lut: np.ndarray | None = None) -> np.ndarray:
+    """Seite als Graustufen dekodieren (ggf. verkleinert) und vorverarbeiten."""
+    flag = _REDUCED_FLAGS.get(params.scale)
+    img = cv2.imread(path, flag if flag is not None else cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise ValueError(f"Bild konnte nicht gelesen werden: {path}")
+    if flag is not None:
+        # Verkleinerung ist bereits beim Dekodieren passiert
+        params = PreprocessParams(**{**params.to_dict(), "scale": 1.0})
+    return preprocess_array(img, params, lut)
+
+
+def iter_pages(paths, params: PreprocessParams = PreprocessParams()):
+    """Seiten eines Stapels nacheinander liefern; die LUT wird nur einmal gebaut."""
+    lut = build_lut(params)
+    for path in paths:
+        yield path, load_page(path, params, lut)
+
+
+def preprocess_batch(paths, params: PreprocessParams = PreprocessParams()) -> list:
+    """Alle Seiten eines Stapels vorverarbeiten (Liste in Eingabereihenfolge)."""
+    return [img for _, img in iter_pages(paths, params)]
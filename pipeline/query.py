@@ -0,0 +1,399 @@
+"""Abfragen über die verknüpften Triples ohne DataFrame-Masken.
+
+Bisher hieß jede Mehrschritt-Frage („alle Personen mit Geburtsort X, die in
+Y gestorben sind“) eine Folge von booleschen Masken und ``merge`` über die
+ganze Tabelle, mit einer Kopie je Schritt. ``TripleIndex`` hält die Triples
+stattdessen als ganze Zahlen:
+
+- jeder Name (Subjekt, Prädikat, Objekt, Typ) bekommt eine Nummer
+- drei sortierte Permutationen SPO, POS und OSP; jedes Muster mit festen
+  Stellen ist damit ein Bereich (``searchsorted``) in einer davon
+- ``a`` verbindet Subjekte und Objekte mit ihrem Typ (``person``,
+  ``location`` …)
+
+Basic Graph Patterns werden als Index-Joins ausgewertet: die Muster werden
+nach Selektivität geordnet, und für alle bisherigen Bindungen auf einmal wird
+der passende Bereich im Index gesucht (vektorisiertes Nested-Loop-Join über
+die sortierten Schlüssel).
+
+Darüber liegt eine kleine SPARQL-Teilmenge::
+
+    SELECT [DISTINCT] ?a ?b | *
+    WHERE { ?p a person . ?p "Geburtsort" ?g . ?p "Sterbeort" ?s }
+    [ORDER BY ?a ...] [LIMIT n]
+
+Namen mit Leerzeichen stehen in Anführungszeichen; ``PREFIX``-Zeilen werden
+überlesen und ``<...>`` steht für den Namen dazwischen.
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pipeline.query "SELECT ?p ?o WHERE { ?p Geburtsort ?o }"
+    python -m pipeline.query --bench [--scale 50]   # Vergleich mit pandas-Masken
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline import triplestore
+
+TYPE = "a"
+
+# Reihenfolge der Stellen (0 = Subjekt, 1 = Prädikat, 2 = Objekt) je Permutation
+ORDERS = {"spo": (0, 1, 2), "pos": (1, 2, 0), "osp": (2, 0, 1)}
+
+# Feste Stellen → Permutation, deren Präfix sie bilden
+_PERMUTATION = {
+    (): "spo", (0,): "spo", (1,): "pos", (2,): "osp",
+    (0, 1): "spo", (1, 2): "pos", (0, 2): "osp", (0, 1, 2): "spo",
+}
+
+
+def is_var(term) -> bool:
+    return isinstance(term, str) and term.startswith("?")
+
+
+class TripleIndex:
+    """Triples als Nummern mit sortierten SPO-, POS- und OSP-Permutationen."""
+
+    def __init__(self, s, p, o):
+        s, p, o = (np.asarray(x, dtype=object) for x in (s, p, o))
+        terms, codes = np.unique(np.concatenate([s, p, o]), return_inverse=True)
+        self.terms = terms
+        self.ids = {t: i for i, t in enumerate(terms)}
+        n = len(s)
+        spo = np.unique(codes.reshape(3, n).T.astype(np.int64), axis=0)  # doppelte Triples einmal
+        self.size = len(spo)
+        self._n = np.int64(max(len(terms), 1))
+        # Ab etwa 2,1 Mio. Namen passt (a·n + b)·n + c nicht mehr in int64
+        self._packed = int(self._n) ** 3 < 2 ** 63
+        self.perms = {}
+        for name, order in ORDERS.items():
+            cols = spo[:, order]
+            cols = cols[np.lexsort(cols.T[::-1])]
+            a, b, c = cols.T.copy()
+            # Zusammengesetzte Schlüssel der Präfixe (1, 2 und 3 Stellen)
+            ab = a * self._n + b
+            if self._packed:
+                keys, pairs = (a, ab, ab * self._n + c), None
+            else:
+                # Statt (a, b) dessen Rang unter den vorkommenden Paaren (< Anzahl Triples)
+                pairs, rank = np.unique(ab, return_inverse=True)
+                keys = (a, ab, rank.astype(np.int64) * self._n + c)
+            self.perms[name] = (cols.T.copy(), keys, pairs)
+
+    def __len__(self):
+        return self.size
+
+    def term_id(self, term) -> int:
+        """Nummer eines Namens (``-1``, wenn er nicht vorkommt)."""
+        return self.ids.get(term, -1)
+
+    def decode(self, ids) -> np.ndarray:
+        return self.terms[np.asarray(ids, dtype=np.int64)]
+
+    def _ranges(self, bound: dict, rows: int):
+        """Bereiche in der passenden Permutation für ``rows`` Bindungen.
+
+        ``bound`` ordnet Stellen (0/1/2) ein Array (Länge ``rows``) oder
+        eine Zahl zu. Gibt (Permutation, lo, hi) zurück.
+        """
+        positions = tuple(sorted(bound))
+        name = _PERMUTATION[positions]
+        cols, keys, pairs = self.perms[name]
+        if not positions:
+            return name, np.zeros(rows, dtype=np.int64), np.full(rows, self.size, dtype=np.int64)
+        order = ORDERS[name]
+        values = [np.broadcast_to(np.asarray(bound[pos], dtype=np.int64), (rows,)) for pos in order[:len(positions)]]
+        key = values[0]
+        for v in values[1:2]:
+            key = key * self._n + v
+        if len(values) == 3:
+            if pairs is not None:
+                # Rang des Paares; unbekannte Paare → -1 (leerer Bereich)
+                r = np.minimum(np.searchsorted(pairs, key), max(len(pairs) - 1, 0))
+                found = pairs[r] == key if len(pairs) else np.zeros(rows, dtype=bool)
+                key = np.where(found, r, -1)
+            key = np.where(key < 0, -1, key * self._n + values[2])
+        sorted_keys = keys[len(positions) - 1]
+        return name, np.searchsorted(sorted_keys, key, "left"), np.searchsorted(sorted_keys, key, "right")
+
+    def count(self, s=None, p=None, o=None) -> int:
+        """Anzahl der Triples zu einem Muster (``None`` = beliebig)."""
+        bound = {i: self.term_id(t) for i, t in enumerate((s, p, o)) if t is not None}
+        if any(v < 0 for v in bound.values()):
+            return 0
+        _, lo, hi = self._ranges(bound, 1)
+        return int(hi[0] - lo[0])
+
+    def triples(self, s=None, p=None, o=None) -> pd.DataFrame:
+        """Passende Triples als Namen (Spalten ``s``, ``p``, ``o``)."""
+        out = self.bgp([tuple(t if t is not None else f"?{v}" for t, v in zip((s, p, o), "spo"))])
+        for v, t in zip("spo", (s, p, o)):
+            if t is not None:
+                out[v] = t
+        return out[["s", "p", "o"]]
+
+    # ---------- Basic Graph Patterns ----------
+
+    def _estimate(self, pattern, bound_vars) -> tuple:
+        fixed = [t for t in pattern if not is_var(t)]
+        joined = sum(1 for t in pattern if is_var(t) and t in bound_vars)
+        size = self.count(*(None if is_var(t) else t for t in pattern))
+        # Erst Muster mit vielen festen/gebundenen Stellen, dann die kleinsten
+        return -(len(fixed) + joined), size
+
+    def bgp_ids(self, patterns) -> dict:
+        """Bindungen eines BGP als Spalten mit Nummern (Variable → Array)."""
+        patterns = [tuple(p) for p in patterns]
+        for p in patterns:
+            for t in p:
+                if not is_var(t) and t not in self.ids:
+                    return {v: np.empty(0, dtype=np.int64) for q in patterns for v in q if is_var(v)}
+        bindings, rows = {}, 1
+        todo = list(patterns)
+        while todo:
+            pattern = min(todo, key=lambda p: self._estimate(p, bindings))
+            todo.remove(pattern)
+            bound = {}
+            for pos, t in enumerate(pattern):
+                if not is_var(t):
+                    bound[pos] = self.ids[t]
+                elif t in bindings:
+                    bound[pos] = bindings[t]
+            name, lo, hi = self._ranges(bound, rows)
+            counts = hi - lo
+            total = int(counts.sum())
+            # Zeile der bisherigen Bindung und Position im Index je Treffer
+            row = np.repeat(np.arange(rows), counts)
+            starts = np.cumsum(counts) - counts
+            idx = np.repeat(lo, counts) + (np.arange(total) - np.repeat(starts, counts))
+            cols = self.perms[name][0]
+            hit = {pos: cols[ORDERS[name].index(pos)][idx] for pos in range(3)}
+
+            bindings = {v: col[row] for v, col in bindings.items()}
+            keep = np.ones(total, dtype=bool)
+            for pos, t in enumerate(pattern):
+                if not is_var(t) or pos in bound:
+                    continue
+                if t in bindings:
+                    # Dieselbe Variable zweimal im Muster (z. B. ?x p ?x)
+                    keep &= bindings[t] == hit[pos]
+                else:
+                    bindings[t] = hit[pos]
+            if not keep.all():
+                bindings = {v: col[keep] for v, col in bindings.items()}
+            rows = int(keep.sum())
+        return bindings
+
+    def bgp(self, patterns) -> pd.DataFrame:
+        """Bindungen eines BGP als Namen; Spalten heißen wie die Variablen ohne ``?``."""
+        return pd.DataFrame({v[1:]: self.decode(ids) for v, ids in self.bgp_ids(patterns).items()})
+
+    def select(self, variables, patterns, distinct: bool = False, order_by=(), limit=None) -> pd.DataFrame:
+        """Projektion eines BGP (``variables`` leer oder ``None`` = alle Variablen).
+
+        Wie in SPARQL wird vor der Projektion sortiert; ``order_by`` darf also
+        auch Variablen nennen, die nicht ausgegeben werden.
+        """
+        ids = self.bgp_ids(patterns)
+        names = [v for v in (variables or ids)]
+        unknown = [v for v in dict.fromkeys(names + list(order_by)) if v not in ids]
+        if unknown:
+            raise ValueError(f"Variable nicht im WHERE-Teil: {', '.join(unknown)}")
+        table = np.stack([ids[v] for v in names], axis=1) if names else np.empty((0, 0), dtype=np.int64)
+        if order_by and len(table):
+            # Nach Namen, nicht nach Nummern sortieren (stabil: Gleichstände behalten die Join-Reihenfolge)
+            keys = pd.DataFrame({i: self.decode(ids[v]) for i, v in enumerate(order_by)})
+            table = table[keys.sort_values(list(keys.columns), kind="stable").index.to_numpy()]
+        if distinct and len(table):
+            if order_by:
+                # Erstes Vorkommen jeder Zeile behalten, damit die Sortierung bleibt
+                _, first = np.unique(table, axis=0, return_index=True)
+                table = table[np.sort(first)]
+            else:
+                table = np.unique(table, axis=0)
+        if limit is not None:
+            table = table[:limit]
+        return pd.DataFrame({v[1:]: self.decode(table[:, i]) for i, v in enumerate(names)})
+
+    def query(self, text: str) -> pd.DataFrame:
+        """SPARQL-SELECT (Teilmenge, siehe Modulbeschreibung)."""
+        return self.select(**parse(text))
+
+
+# ---------- SPARQL-Teilmenge ----------
+
+_TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"(?:@[\w-]+)?|<([^>]*)>|(\{|\}|\.(?=\s|\}|$))|([^\s{}]+)')
+_QUERY = re.compile(
+    r"^\s*SELECT\s+(?P<distinct>DISTINCT\s+)?(?P<vars>\*|(?:\?\w+\s*)+)\s*"
+    r"WHERE\s*\{(?P<where>.*)\}\s*"
+    r"(?:ORDER\s+BY\s+(?P<order>(?:\?\w+\s*)+))?"
+    r"(?:LIMIT\s+(?P<limit>\d+))?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def _terms(where: str) -> list:
+    out = []
+    for quoted, iri, punct, bare in _TOKEN.findall(where):
+        if punct:
+            out.append(punct)
+        elif iri:
+            out.append(iri)
+        elif bare:
+            out.append(bare)
+        else:
+            out.append(("lit", quoted.replace('\\"', '"').replace("\\\\", "\\")))
+    return out
+
+
+def parse(text: str) -> dict:
+    """SELECT-Abfrage → Argumente für ``TripleIndex.select``."""
+    text = re.sub(r"^\s*PREFIX\s+\S*\s*<[^>]*>\s*", "", text, flags=re.IGNORECASE | re.MULTILINE)
+    text = re.sub(r"#[^\n\"]*$", "", text, flags=re.MULTILINE)
+    m = _QUERY.match(text)
+    if not m:
+        raise ValueError("Nur SELECT [DISTINCT] … WHERE { … } [ORDER BY …] [LIMIT n] wird unterstützt")
+    patterns, current = [], []
+    for tok in _terms(m.group("where")) + ["."]:
+        if tok == ".":
+            if current:
+                if len(current) != 3:
+                    raise ValueError(f"Triple-Muster braucht drei Terme: {current}")
+                patterns.append(tuple(current))
+            current = []
+        elif tok in ("{", "}"):
+            raise ValueError("Verschachtelte Gruppen werden nicht unterstützt")
+        else:
+            # Zitierte Namen sind immer Konstanten, ``a`` nur in Prädikatstellung
+            current.append(tok[1] if isinstance(tok, tuple) else tok)
+    if not patterns:
+        raise ValueError("Leerer WHERE-Teil")
+    variables = None if m.group("vars").strip() == "*" else m.group("vars").split()
+    return {
+        "variables": variables,
+        "patterns": patterns,
+        "distinct": bool(m.group("distinct")),
+        "order_by": tuple(m.group("order").split()) if m.group("order") else (),
+        "limit": int(m.group("limit")) if m.group("limit") else None,
+    }
+
+
+# ---------- Aufbau aus dem Triple-Speicher ----------
+
+def _text(col: pd.Series) -> np.ndarray:
+    return col.astype(object).where(col.notna(), None).to_numpy()
+
+
+def from_frame(df: pd.DataFrame, s_col: str = "subjekt", p_col: str = "prädikat", o_col: str = "objekt",
+               s_type_col: str = "subjekt_type", o_type_col: str = "objekt_type") -> TripleIndex:
+    """Index über die Triple-Tabelle; Zeilen ohne Subjekt, Prädikat oder Objekt fehlen.
+
+    Die Typspalten ergeben zusätzliche Triples ``(Name, a, Typ)``.
+    """
+    s, p, o = _text(df[s_col]), _text(df[p_col]), _text(df[o_col])
+    parts = [(s, p, o)]
+    for name_col, type_col in ((s_col, s_type_col), (o_col, o_type_col)):
+        if type_col in df.columns:
+            names, types = _text(df[name_col]), _text(df[type_col])
+            parts.append((names, np.full(len(names), TYPE, dtype=object), types))
+    s, p, o = (np.concatenate(x) for x in zip(*parts))
+    ok = np.array([x is not None and y is not None and z is not None for x, y, z in zip(s, p, o)], dtype=bool)
+    return TripleIndex(s[ok], p[ok], o[ok])
+
+
+def from_store(store_dir: str = triplestore.STORE_DIR) -> TripleIndex:
+    columns = ["subjekt", "subjekt_type", "prädikat", "objekt", "objekt_type"]
+    return from_frame(triplestore.read_triples(store_dir, columns=columns))
+
+
+# ---------- Vergleich mit pandas-Masken ----------
+
+BENCH_QUERY = """SELECT DISTINCT ?person ?geburtsort ?sterbeort ?partner WHERE {
+    ?person a person .
+    ?person Geburtsort ?geburtsort .
+    ?person Sterbeort ?sterbeort .
+    ?person "Ehepartner(in)" ?partner .
+    ?partner Wohnsitz ?ort
+}"""
+
+
+def _bench_pandas(df: pd.DataFrame) -> pd.DataFrame:
+    """Dieselbe Frage wie ``BENCH_QUERY`` mit Masken und ``merge`` je Schritt."""
+    df = df.astype({c: object for c in ["subjekt", "subjekt_type", "prädikat", "objekt"]})
+    persons = df.loc[df["subjekt_type"] == "person", ["subjekt"]].rename(columns={"subjekt": "person"})
+    persons = pd.concat([persons, df.loc[df["objekt_type"] == "person", ["objekt"]]
+                         .rename(columns={"objekt": "person"})]).drop_duplicates()
+
+    def hop(pred, left, right):
+        return df.loc[df["prädikat"] == pred, ["subjekt", "objekt"]].rename(
+            columns={"subjekt": left, "objekt": right})
+
+    out = persons.merge(hop("Geburtsort", "person", "geburtsort"), on="person")
+    out = out.merge(hop("Sterbeort", "person", "sterbeort"), on="person")
+    out = out.merge(hop("Ehepartner(in)", "person", "partner"), on="person")
+    out = out.merge(hop("Wohnsitz", "partner", "ort"), on="partner")
+    return out[["person", "geburtsort", "sterbeort", "partner"]].drop_duplicates()
+
+
+def _scaled(df: pd.DataFrame, scale: int) -> pd.DataFrame:
+    """``scale`` unabhängige Kopien mit umbenannten Knoten (gleiche Struktur)."""
+    if scale <= 1:
+        return df
+    parts = []
+    for i in range(scale):
+        part = df.astype({"subjekt": object, "objekt": object})
+        part["subjekt"] = part["subjekt"].map(lambda x: f"{x}#{i}" if isinstance(x, str) else x)
+        part["objekt"] = part["objekt"].map(lambda x: f"{x}#{i}" if isinstance(x, str) else x)
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def _timed(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return result, best
+
+
+def bench(store_dir: str = triplestore.STORE_DIR, scale: int = 1, repeat: int = 5) -> dict:
+    df = _scaled(triplestore.read_triples(
+        store_dir, columns=["subjekt", "subjekt_type", "prädikat", "objekt", "objekt_type"]), scale)
+    index, t_build = _timed(lambda: from_frame(df), 1)
+    ours, t_index = _timed(lambda: index.query(BENCH_QUERY), repeat)
+    theirs, t_pandas = _timed(lambda: _bench_pandas(df), repeat)
+
+    key = ["person", "geburtsort", "sterbeort", "partner"]
+    same = ours.astype(object).sort_values(key, ignore_index=True).equals(
+        theirs.astype(object).sort_values(key, ignore_index=True))
+    print(f"{len(df):,} Zeilen → {len(index):,} Triples, {len(index.terms):,} Namen "
+          f"(Aufbau {t_build * 1000:.1f} ms)")
+    print(f"Index-Join: {t_index * 1000:.2f} ms   pandas-Masken: {t_pandas * 1000:.2f} ms   "
+          f"Treffer: {len(ours)} ({'gleich' if same else 'VERSCHIEDEN'})")
+    return {"rows": len(df), "index_ms": t_index * 1000, "pandas_ms": t_pandas * 1000, "same": same}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="SPARQL-Teilmenge über den Triple-Speicher")
+    ap.add_argument("query", nargs="?", help="SELECT-Abfrage (oder - für stdin)")
+    ap.add_argument("--store", default=triplestore.STORE_DIR)
+    ap.add_argument("--bench", action="store_true", help="Index-Join gegen pandas-Masken messen")
+    ap.add_argument("--scale", type=int, default=1, help="Kopien der Daten für --bench")
+    args = ap.parse_args(argv)
+    if args.bench:
+        bench(args.store, args.scale)
+        return
+    if not args.query:
+        ap.error("Abfrage fehlt")
+    text = open(0, encoding="utf-8").read() if args.query == "-" else args.query
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(from_store(args.store).query(text))
+
+
+if __name__ == "__main__":
+    main()
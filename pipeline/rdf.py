@@ -0,0 +1,380 @@
+"""Export des verknüpften Graphen als RDF (Turtle oder N-Triples, optional gzip).
+
+Die Dateien in ``test/journeys*.ttl`` entstanden außerhalb der Pipeline mit
+einem rdflib-Graphen im Speicher. Hier wird die Tabelle stattdessen in
+Blöcken aus dem Triple-Speicher gelesen (``triplestore.iter_triples``) und
+jeder Block sofort geschrieben; der Speicherbedarf bleibt unabhängig von der
+Größe der Tabelle.
+
+Je Zeile (``q_subjekt``, ``p_wert``, ``q_objekt``) entstehen im Stil von
+Wikidata::
+
+    wd:Q1 wdt:P19 wd:Q2 .                       # direkte Aussage
+    wd:Q1 p:P19 _:s… .                          # Aussage-Knoten
+    _:s… ps:P19 wd:Q2 ;
+        pq:P585 "1777"^^xsd:gYear ;             # zeit mit q_zeit als Qualifikator
+        prov:wasDerivedFrom _:r… .
+    _:r… pr:P854 <https://…> .                  # ref als Quelle
+
+Objekte ohne QID (Daten, Anzahlen) werden Literale. Die Knotennamen der
+Aussagen sind ein Hash über den Zeileninhalt und damit über Läufe stabil.
+
+Inkrementeller Export: nach jedem Export werden die Hashes aller Zeilen
+sortiert als Wasserzeichen gespeichert (8 Byte je Zeile, beim nächsten Lauf
+per Memory-Map gelesen). Auch dabei bleiben die Hashes auf der Platte: jeder
+Block legt seine sortierten Hashes als Lauf in einem temporären Ordner ab,
+am Ende werden die Läufe blockweise zusammengeführt. ``--inkrementell`` schreibt nur Zeilen, deren Hash
+dort fehlt, also die seit dem letzten Export hinzugekommenen.
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pipeline.rdf                          # graph.ttl.gz
+    python -m pipeline.rdf --format nt              # graph.nt.gz
+    python -m pipeline.rdf --inkrementell           # graph-<version>.delta.ttl.gz
+"""
+import argparse
+import gzip
+import os
+import re
+import shutil
+import tempfile
+import zlib
+from collections import OrderedDict
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from pipeline import triplestore
+
+# Pfade
+EXPORT_DIR = "data/5.4.3_EL/export"
+WATERMARK = "watermark.npy"
+
+PREFIXES = {
+    "wd": "http://www.wikidata.org/entity/",
+    "wdt": "http://www.wikidata.org/prop/direct/",
+    "p": "http://www.wikidata.org/prop/",
+    "ps": "http://www.wikidata.org/prop/statement/",
+    "pq": "http://www.wikidata.org/prop/qualifier/",
+    "pr": "http://www.wikidata.org/prop/reference/",
+    "prov": "http://www.w3.org/ns/prov#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "xsd": "http://www.w3.org/2001/XMLSchema#",
+}
+
+# Spalten, die in eine Aussage eingehen (auch Grundlage des Zeilen-Hashs)
+COLUMNS = ["subjekt", "q_subjekt", "p_wert", "objekt", "objekt_type", "q_objekt", "zeit", "q_zeit", "ref"]
+
+POINT_IN_TIME = "P585"
+REFERENCE_URL = "P854"
+
+_QID = re.compile(r"^Q\d+$")
+_PID = re.compile(r"^P\d+$")
+_LOCAL = re.compile(r"^[A-Za-z0-9_]+$")
+_DATE = re.compile(r"^(\d{1,2})[-.](\d{1,2})[-.](\d{3,4})$")
+_ISO = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$")
+_MONTH = re.compile(r"^(\d{1,2})[-.](\d{3,4})$")
+_YEAR = re.compile(r"^\d{3,4}$")
+
+
+# ---------- Terme ----------
+# ("iri", IRI) | ("bnode", Name) | ("lit", Text, Datentyp-IRI oder None, Sprache oder None)
+
+def iri(prefix: str, local: str) -> tuple:
+    return ("iri", PREFIXES[prefix] + local)
+
+
+def literal(text, datatype: str = None, lang: str = None) -> tuple:
+    return ("lit", str(text), PREFIXES["xsd"] + datatype if datatype else None, lang)
+
+
+def time_literal(text: str) -> tuple:
+    """Datum als xsd-Literal (Tag, Monat oder Jahr); sonst als Text."""
+    s = str(text).strip()
+    m = _DATE.match(s)
+    if m:
+        day, month, year = (int(x) for x in m.groups())
+        if 1 <= month <= 12 and 1 <= day <= 31:
+            return literal(f"{year:04d}-{month:02d}-{day:02d}", "date")
+    m = _ISO.match(s)
+    if m:
+        return literal(s, "date")
+    m = _MONTH.match(s)
+    if m and 1 <= int(m.group(1)) <= 12:
+        return literal(f"{int(m.group(2)):04d}-{int(m.group(1)):02d}", "gYearMonth")
+    if _YEAR.match(s):
+        return literal(f"{int(s):04d}", "gYear")
+    return literal(s)
+
+
+def _escape(text: str) -> str:
+    return (text.replace("\\", "\\\\").replace('"', '\\"')
+                .replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t"))
+
+
+def _iri_text(value: str) -> str:
+    return quote(value, safe=":/?#[]@!$&'()*+,;=%-._~")
+
+
+def nt_term(term: tuple) -> str:
+    kind = term[0]
+    if kind == "iri":
+        return f"<{_iri_text(term[1])}>"
+    if kind == "bnode":
+        return f"_:{term[1]}"
+    text = f'"{_escape(term[1])}"'
+    if term[3]:
+        return f"{text}@{term[3]}"
+    return f"{text}^^<{term[2]}>" if term[2] else text
+
+
+def ttl_term(term: tuple) -> str:
+    kind = term[0]
+    if kind == "iri":
+        for prefix, ns in PREFIXES.items():
+            if term[1].startswith(ns) and _LOCAL.match(term[1][len(ns):]):
+                return f"{prefix}:{term[1][len(ns):]}"
+    if kind == "lit" and term[2] and not term[3]:
+        return f'"{_escape(term[1])}"^^{ttl_term(("iri", term[2]))}'
+    return nt_term(term)
+
+
+def ttl_header() -> str:
+    return "".join(f"@prefix {p}: <{ns}> .\n" for p, ns in PREFIXES.items()) + "\n"
+
+
+def to_ntriples(triples) -> str:
+    return "".join(f"{nt_term(s)} {nt_term(p)} {nt_term(o)} .\n" for s, p, o in triples)
+
+
+def to_turtle(triples) -> str:
+    """Turtle; aufeinanderfolgende Triples mit gleichem Subjekt werden mit ``;`` verbunden."""
+    out, last = [], None
+    for s, p, o in triples:
+        if s == last:
+            out.append(f" ;\n    {ttl_term(p)} {ttl_term(o)}")
+        else:
+            if last is not None:
+                out.append(" .\n")
+            out.append(f"{ttl_term(s)} {ttl_term(p)} {ttl_term(o)}")
+            last = s
+    if last is not None:
+        out.append(" .\n")
+    return "".join(out)
+
+
+# ---------- Zeilen → Triples ----------
+
+class _Recent:
+    """Zuletzt gesehene Schlüssel (begrenzt), um wiederholte Label-/Quellen-Triples zu sparen."""
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self.keys = OrderedDict()
+
+    def add(self, key) -> bool:
+        """``True``, wenn ``key`` neu ist."""
+        if key in self.keys:
+            self.keys.move_to_end(key)
+            return False
+        self.keys[key] = None
+        if len(self.keys) > self.maxsize:
+            self.keys.popitem(last=False)
+        return True
+
+
+def _text(col: pd.Series) -> pd.Series:
+    return col.astype(object).where(col.notna(), "").astype(str).str.strip()
+
+
+def row_hashes(batch: pd.DataFrame) -> np.ndarray:
+    """Stabiler 64-bit-Hash je Zeile über ``COLUMNS`` (Text, fehlend = leer)."""
+    frame = pd.DataFrame({c: _text(batch[c]) if c in batch.columns else "" for c in COLUMNS})
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+
+def _object(q: str, label: str, kind: str) -> tuple:
+    if _QID.match(q):
+        return iri("wd", q)
+    value = q or label
+    if kind == "datum":
+        return time_literal(value)
+    if value.isdigit():
+        return literal(value, "integer")
+    return literal(value, lang="de")
+
+
+def _qualifiers(zeit: str, q_zeit: str) -> list:
+    """(Eigenschaft, Wert) für ``zeit``; „1832 bis 1839“ mit „P580 bis P582“ wird zu zwei Werten."""
+    if not zeit:
+        return []
+    props = [p.strip() for p in q_zeit.split(" bis ")] if q_zeit else [POINT_IN_TIME]
+    values = [v.strip() for v in zeit.split(" bis ")]
+    if len(props) != len(values):
+        props, values = [props[0] if _PID.match(props[0]) else POINT_IN_TIME], [zeit]
+    return [(p if _PID.match(p) else POINT_IN_TIME, time_literal(v)) for p, v in zip(props, values) if v]
+
+
+def statements(batch: pd.DataFrame, hashes: np.ndarray, labels: bool = False, seen: _Recent = None):
+    """Triples für die Zeilen eines Blocks; gibt (Triples, übersprungene Zeilen) zurück."""
+    seen = seen or _Recent()
+    cols = {c: _text(batch[c]).tolist() if c in batch.columns else [""] * len(batch) for c in COLUMNS}
+    triples, skipped = [], 0
+    for i, h in enumerate(hashes):
+        qs, pid = cols["q_subjekt"][i], cols["p_wert"][i]
+        if not _QID.match(qs) or not _PID.match(pid):
+            skipped += 1
+            continue
+        subj = iri("wd", qs)
+        obj = _object(cols["q_objekt"][i], cols["objekt"][i], cols["objekt_type"][i].lower())
+        node = ("bnode", f"s{int(h):016x}")
+        triples.append((subj, iri("wdt", pid), obj))
+        triples.append((subj, iri("p", pid), node))
+        triples.append((node, iri("ps", pid), obj))
+        for prop, value in _qualifiers(cols["zeit"][i], cols["q_zeit"][i]):
+            triples.append((node, iri("pq", prop), value))
+        ref = cols["ref"][i]
+        if ref:
+            ref_node = ("bnode", f"r{zlib.crc32(ref.encode('utf-8')):08x}")
+            triples.append((node, ("iri", PREFIXES["prov"] + "wasDerivedFrom"), ref_node))
+            if seen.add(("ref", ref)):
+                triples.append((ref_node, iri("pr", REFERENCE_URL), ("iri", ref)))
+        if labels:
+            for q, name in ((qs, cols["subjekt"][i]), (cols["q_objekt"][i], cols["objekt"][i])):
+                if _QID.match(q) and name and seen.add(("label", q)):
+                    triples.append((iri("wd", q), iri("rdfs", "label"), literal(name, lang="de")))
+    return triples, skipped
+
+
+# ---------- Export ----------
+
+def read_watermark(path: str):
+    """Sortierte Zeilen-Hashes des letzten Exports (Memory-Map) oder ``None``."""
+    return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+
+def _known(watermark, hashes: np.ndarray) -> np.ndarray:
+    if watermark is None or not len(watermark):
+        return np.zeros(len(hashes), dtype=bool)
+    pos = np.searchsorted(watermark, hashes)
+    return np.asarray(watermark[np.minimum(pos, len(watermark) - 1)] == hashes) & (pos < len(watermark))
+
+
+def _spill(run_dir: str, hashes: np.ndarray) -> str:
+    """Sortierte, eindeutige Hashes eines Blocks als Lauf speichern."""
+    path = os.path.join(run_dir, f"{len(os.listdir(run_dir)):06d}.npy")
+    np.save(path, np.unique(hashes))
+    return path
+
+
+def merge_runs(paths, output: str, chunk: int = 1 << 16) -> int:
+    """Sortierte Läufe zu einem sortierten, eindeutigen ``.npy`` zusammenführen.
+
+    Je Lauf liegt höchstens ``chunk`` Werte im Speicher; gibt die Anzahl zurück.
+    """
+    runs = [np.load(p, mmap_mode="r") for p in paths]
+    pos = [0] * len(runs)
+    raw = output + ".raw"
+    count, last = 0, None
+    with open(raw, "wb") as f:
+        while True:
+            heads = [r[i:i + chunk] for r, i in zip(runs, pos) if i < len(r)]
+            if not heads:
+                break
+            # Alles bis zum kleinsten Pufferende ist vollständig bekannt
+            bound = min(h[-1] for h in heads)
+            parts = []
+            for k, r in enumerate(runs):
+                if pos[k] >= len(r):
+                    continue
+                head = r[pos[k]:pos[k] + chunk]
+                n = int(np.searchsorted(head, bound, "right"))
+                parts.append(head[:n])
+                pos[k] += n
+            merged = np.unique(np.concatenate(parts))
+            if last is not None and len(merged) and merged[0] == last:
+                merged = merged[1:]
+            if len(merged):
+                f.write(merged.astype("<u8").tobytes())
+                count += len(merged)
+                last = merged[-1]
+    if not count:
+        np.save(output, np.empty(0, dtype="<u8"))
+        os.remove(raw)
+        return 0
+    out = np.lib.format.open_memmap(output, mode="w+", dtype="<u8", shape=(count,))
+    src = np.memmap(raw, dtype="<u8", mode="r", shape=(count,))
+    for i in range(0, count, chunk):
+        out[i:i + chunk] = src[i:i + chunk]
+    out.flush()
+    del out, src
+    os.remove(raw)
+    return count
+
+
+def _open(path: str, compress: bool):
+    return gzip.open(path, "wt", encoding="utf-8") if compress else open(path, "w", encoding="utf-8")
+
+
+def export(output: str = None, fmt: str = "ttl", incremental: bool = False, labels: bool = False,
+           store_dir: str = triplestore.STORE_DIR, export_dir: str = EXPORT_DIR,
+           batch_size: int = 50_000) -> dict:
+    """Graph blockweise schreiben und danach das Wasserzeichen erneuern."""
+    os.makedirs(export_dir, exist_ok=True)
+    version = triplestore.data_version(store_dir)
+    if output is None:
+        name = f"graph-{version}.delta" if incremental else "graph"
+        output = os.path.join(export_dir, f"{name}.{fmt}.gz")
+    wm_path = os.path.join(export_dir, WATERMARK)
+    watermark = read_watermark(wm_path) if incremental else None
+    serialize = to_turtle if fmt == "ttl" else to_ntriples
+
+    stats = {"zeilen": 0, "neu": 0, "triples": 0, "übersprungen": 0}
+    runs, seen = [], _Recent()
+    run_dir = tempfile.mkdtemp(prefix="watermark-", dir=export_dir)
+    tmp = output + ".tmp"
+    try:
+        with _open(tmp, output.endswith(".gz")) as f:
+            if fmt == "ttl":
+                f.write(ttl_header())
+            for batch in triplestore.iter_triples(store_dir, columns=COLUMNS, batch_size=batch_size):
+                hashes = row_hashes(batch)
+                runs.append(_spill(run_dir, hashes))
+                new = ~_known(watermark, hashes)
+                triples, skipped = statements(batch[new], hashes[new], labels, seen)
+                f.write(serialize(triples))
+                stats["zeilen"] += len(batch)
+                stats["neu"] += int(new.sum())
+                stats["triples"] += len(triples)
+                stats["übersprungen"] += skipped
+        os.replace(tmp, output)
+
+        # Wasserzeichen erst nach erfolgreichem Export (nur die Hashes, 8 Byte je Zeile)
+        del watermark
+        merge_runs(runs, wm_path + ".tmp.npy")
+        os.replace(wm_path + ".tmp.npy", wm_path)
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    print(f"{stats['neu']} von {stats['zeilen']} Zeilen → {stats['triples']} Triples "
+          f"(ohne QID/PID übersprungen: {stats['übersprungen']})")
+    print(f"Gespeichert in: {output} (Version {version})")
+    return {**stats, "output": output, "version": version}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Graph als RDF exportieren (Turtle/N-Triples, blockweise)")
+    ap.add_argument("--output", default=None, help="Zieldatei (.gz = komprimiert)")
+    ap.add_argument("--format", choices=["ttl", "nt"], default="ttl")
+    ap.add_argument("--inkrementell", action="store_true", help="nur Zeilen seit dem letzten Export")
+    ap.add_argument("--labels", action="store_true", help="rdfs:label für Subjekte und Objekte")
+    ap.add_argument("--store", default=triplestore.STORE_DIR)
+    ap.add_argument("--export-dir", default=EXPORT_DIR)
+    ap.add_argument("--batch-size", type=int, default=50_000)
+    args = ap.parse_args(argv)
+    export(args.output, args.format, args.inkrementell, args.labels, args.store, args.export_dir, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
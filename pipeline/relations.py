@@ -0,0 +1,483 @@
+"""5.4.2 Relationsextraktion mit dem lokalen Ollama-Modell.
+
+Statt ``chain.run(...)`` Satz für Satz aufzurufen, hält der Runner eine
+einstellbare Anzahl von Anfragen gleichzeitig offen (``concurrency``). Eine
+begrenzte Warteschlange sorgt für Gegendruck, jede Anfrage hat ein eigenes
+Timeout und wird bei Fehlern mit wachsender Wartezeit wiederholt.
+
+Jedes Ergebnis wird sofort an einen JSONL-Checkpoint angehängt. Ein
+Neustart überspringt alle Sätze, die dort mit demselben Prompt schon stehen;
+erst am Ende wird ``triple.json`` in Eingabereihenfolge daraus
+zusammengesetzt (die Nachbearbeitung läuft dabei immer neu auf den
+Rohantworten).
+
+Die Rohantworten landen zusätzlich in einem persistenten Cache
+(``CACHE_PATH``), dessen Schlüssel aus dem gerenderten Prompt, dem
+Modellnamen und den Sampling-Einstellungen besteht. Nur Sätze, deren Prompt
+sich geändert hat, gehen erneut an das Modell; bei ``temperature=0.7`` macht
+das die Wiederholungsläufe außerdem reproduzierbar. Ändern sich
+Systemprompt, Humanprompt oder die Typenlisten, wird der Cache geleert.
+
+Mit ``structured=True`` (``--structured``) erzwingt Ollama über ``format``
+ein JSON-Schema (``Triple`` mit ``prädikat`` aus ``relation_types``). Jede
+Antwort wird mit pydantic geprüft; nur die ungültigen Einträge werden dem
+Modell mit der Fehlermeldung erneut vorgelegt, höchstens ``repairs`` Mal.
+Durchsatz und Parse-Fehlerquote stehen in der Abschlussmeldung.
+
+Für die Parallelität auf Serverseite muss Ollama mit
+``OLLAMA_NUM_PARALLEL`` >= ``concurrency`` laufen.
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pipeline.relations --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from pydantic import BaseModel, ValidationError, field_validator
+
+from pipeline.cache import Cache, hash_key
+from pipeline.sentences import read_records
+
+OLLAMA_URL = "http://localhost:11434"
+MODEL = "llama3"
+TEMPERATURE = 0.7
+
+INPUT_FILE = "data/5.4.2_RE/sätze.jsonl"
+CHECKPOINT_FILE = "data/5.4.2_RE/triple.jsonl"
+OUTPUT_FILE = "data/5.4.2_RE/triple.json"
+
+# Antwort-Cache: Prompt + Modell + Sampling → Rohantwort
+CACHE_PATH = "data/5.4.2_RE/re_cache.sqlite"
+CACHE_MAX_ENTRIES = 50_000
+
+# Entity- und Relationstypen
+entity_types = ['person', 'location', 'organization', 'date']
+
+relation_types = [
+    # Biografische Basisdaten
+    "geboren_in", "geboren_am",
+    "gestorben_in", "gestorben_am",
+    "begraben_in",
+
+    # Wohn- und Wirkorte
+    "wohnhaft_in", "lebte_in", "wirkte_in", "aufenthalt_in",
+
+    # Bildung und Beruf
+    "ausgebildet_in", "studierte_an",
+    "lehre_als", "lehre_bei",
+    "tätig_als", "tätig_bei",
+    "war", "beschäftigt_bei", "mitglied_von",
+    "war_eingeschult", "unterrichtet_in",
+
+    # Familie
+    "verheiratet_mit", "kind_von", "eltern_von", "geschwister_von",
+
+    # Religion & Kirche
+    "getauft_am", "beigetreten_am", "konfirmiert_am", "hat_heiliges_abendmahl",
+
+    # Interessen & Themen
+    "interessiert_sich_für", "beschäftigt_sich_mit", "forscht_zu", "schreibt_über",
+
+    # Reisen & Aufenthalte
+    "gereist_nach", "besucht", "angekommen_in", "abgereist_aus",
+    "aufgehalten_in", "zurückgekehrt_nach", "verließ", "war_in", "war_am", "gefahren_nach"]
+
+# Systemprompt
+SYSTEM_PROMPT = """
+Du arbeitest mit biographischen, historischen und religiösen Texten der Herrnhuter Brüdergemeine.
+Deine Aufgabe ist es, Relationen zwischen Personen, Orten, Organisationen und Daten zu extrahieren.
+
+Gib ausschließlich eine JSON-Liste mit Objekten zurück. Jedes Objekt enthält:
+- "subjekt", "subjekt_type", "prädikat", "objekt", "objekt_type", "zeit".
+
+Die erlaubten Entitätstypen sind: {entity_types}
+Die mögliche Beziehungstypen sind: {relation_types}
+
+KEINE Erklärungen oder zusätzlichen Texte!
+"""
+
+# Humanprompt
+HUMAN_PROMPT = """
+Hier ist ein Satz aus einem historischen Lebenslauf:
+"{text}"
+
+Folgende Entitäten sind im Satz enthalten:
+personen: {personen}
+orte: {orte}
+date: {date}
+organisationen: {organisationen}
+
+Nutze nur die angegebenen Entitäten. Finde sinnvolle Relationen zwischen diesen Entitäten, z. B. wann und wo jemand geboren oder gestorben ist, wo jemand lebte oder tätig war.
+
+Wenn sinnvoll, gib zusätzlich im Feld "zeit" das relevante Datum an.
+
+{format_instructions}
+"""
+
+FORMAT_INSTRUCTIONS = (
+    'Antworte nur mit einer JSON-Liste, z. B. [{"subjekt": "...", "subjekt_type": "person", '
+    '"prädikat": "geboren_in", "objekt": "...", "objekt_type": "location", "zeit": "..."}].'
+)
+
+# Rückfrage zu ungültigen Einträgen (Strukturmodus)
+REPAIR_PROMPT = """
+Diese Einträge deiner Antwort sind ungültig:
+{fehler}
+
+Die möglichen Beziehungstypen sind: {relation_types}
+Gib nur die korrigierten Einträge als JSON-Liste zurück. Lässt sich ein Eintrag nicht korrigieren, lass ihn weg.
+"""
+
+INVALID_JSON_PROMPT = """
+Deine Antwort war keine gültige JSON-Liste.
+Gib ausschließlich eine JSON-Liste mit Objekten zurück, jedes mit "subjekt", "subjekt_type", "prädikat", "objekt", "objekt_type", "zeit".
+"""
+
+
+class Triple(BaseModel):
+    """Eine extrahierte Relation (Felder wie ``ExtractedInfo`` im Notebook)."""
+    subjekt: str
+    subjekt_type: str
+    prädikat: str
+    objekt: str
+    objekt_type: str
+    zeit: str | None = None
+
+    @field_validator("prädikat")
+    @classmethod
+    def _known_relation(cls, value: str) -> str:
+        if value not in relation_types:
+            raise ValueError(f"unbekannter Beziehungstyp: {value}")
+        return value
+
+
+def response_schema() -> dict:
+    """JSON-Schema für Ollamas ``format``: Liste von Triples, ``prädikat`` als Aufzählung."""
+    item = Triple.model_json_schema()
+    item.pop("description", None)
+    item["properties"]["prädikat"]["enum"] = list(relation_types)
+    return {"type": "array", "items": item}
+
+
+def render_messages(entry: dict, format_instructions: str = FORMAT_INSTRUCTIONS) -> list:
+    """System- und Humanprompt für einen Satz-Datensatz (wie die LangChain-Kette im Notebook)."""
+    system = SYSTEM_PROMPT.format(entity_types=entity_types, relation_types=relation_types)
+    human = HUMAN_PROMPT.format(
+        text=entry["text"],
+        personen=", ".join(entry.get("personen", [])),
+        orte=", ".join(entry.get("orte", [])),
+        date=", ".join(entry.get("date", [])),
+        organisationen=", ".join(entry.get("organisationen", [])),
+        format_instructions=format_instructions,
+    )
+    return [{"role": "system", "content": system}, {"role": "user", "content": human}]
+
+
+def prompt_version() -> str:
+    """Kennung der Prompt-Vorlagen und Typenlisten (ändert sie sich, wird der Cache geleert)."""
+    return hash_key(SYSTEM_PROMPT, HUMAN_PROMPT, entity_types, relation_types)[:16]
+
+
+def request_key(messages: list, client, mode=None) -> str:
+    """Cache-Schlüssel einer Anfrage: gerenderter Prompt, Modell und Sampling-Einstellungen.
+
+    ``mode`` unterscheidet abweichende Ausgabemodi (Schema, Reparaturbudget).
+    """
+    if mode is None:
+        return hash_key(messages, client.model, client.options)
+    return hash_key(messages, client.model, client.options, mode)
+
+
+def parse_relations(result: str) -> list:
+    try:
+        relations = json.loads(result)
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return relations if isinstance(relations, list) else []
+
+
+def validate_relations(result: str):
+    """Antwort gegen ``Triple`` prüfen.
+
+    Gibt (gültige Triples, [(Eintrag, Fehlermeldung)]) zurück oder ``None``,
+    wenn die Antwort gar keine JSON-Liste ist.
+    """
+    try:
+        data = json.loads(result)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if isinstance(data, dict):
+        # {"relationen": [...]} oder ein einzelnes Triple
+        data = next((v for v in data.values() if isinstance(v, list)), [data])
+    if not isinstance(data, list):
+        return None
+    valid, invalid = [], []
+    for item in data:
+        try:
+            valid.append(Triple.model_validate(item).model_dump())
+        except ValidationError as e:
+            invalid.append((item, "; ".join(err["msg"] for err in e.errors())))
+    return valid, invalid
+
+
+def extract_structured(client, messages: list, timeout: float, repairs: int = 2):
+    """Antwort mit JSON-Schema erzeugen und nur ungültige Einträge nachfragen.
+
+    Gibt (JSON-Liste der gültigen Triples, Zähler) zurück; Einträge, die nach
+    ``repairs`` Rückfragen noch ungültig sind, werden verworfen.
+    """
+    schema = response_schema()
+    info = {"generations": 0, "failed_generations": 0, "invalid_items": 0}
+    history = list(messages)
+    valid = []
+    for _ in range(repairs + 1):
+        raw = client.chat(history, timeout, format=schema)
+        info["generations"] += 1
+        checked = validate_relations(raw)
+        if checked is None:
+            info["failed_generations"] += 1
+            feedback = INVALID_JSON_PROMPT
+        else:
+            ok, bad = checked
+            valid.extend(t for t in ok if t not in valid)
+            if not bad:
+                break
+            info["failed_generations"] += 1
+            info["invalid_items"] += len(bad)
+            feedback = REPAIR_PROMPT.format(
+                fehler="\n".join(f"- {json.dumps(item, ensure_ascii=False)}: {err}" for item, err in bad),
+                relation_types=relation_types,
+            )
+        history += [{"role": "assistant", "content": raw}, {"role": "user", "content": feedback}]
+    return json.dumps(valid, ensure_ascii=False), info
+
+
+def _free_info(raw: str) -> dict:
+    checked = validate_relations(raw)
+    invalid = len(checked[1]) if checked is not None else 0
+    return {"generations": 1, "failed_generations": int(checked is None or invalid > 0), "invalid_items": invalid}
+
+
+def transform(entry: dict, relations: list) -> dict:
+    return {
+        "text": entry.get("text", ""),
+        "ref": entry.get("ref", ""),
+        "datei": entry.get("datei", ""),
+        "autor": entry.get("autor", ""),
+        "graph": relations,
+    }
+
+
+def entry_ids(entries) -> list:
+    """Stabile IDs je Datensatz (Inhalt + laufende Nummer bei Duplikaten)."""
+    seen = {}
+    ids = []
+    for entry in entries:
+        base = hash_key(entry)[:16]
+        seen[base] = seen.get(base, 0) + 1
+        ids.append(f"{base}-{seen[base]}")
+    return ids
+
+
+class OllamaClient:
+    """Minimaler Client für ``/api/chat`` (blockierende Aufrufe laufen in Threads)."""
+
+    def __init__(self, base_url: str = OLLAMA_URL, model: str = MODEL, options: dict | None = None):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.options = {"temperature": TEMPERATURE} if options is None else options
+
+    def chat(self, messages: list, timeout: float, **extra) -> str:
+        payload = {"model": self.model, "messages": messages, "stream": False, "options": self.options, **extra}
+        req = urllib.request.Request(
+            f"{self.base_url}/api/chat",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))["message"]["content"]
+
+
+def load_checkpoint(path: str) -> dict:
+    """Checkpoint-Zeilen (id → {id, key, raw}); bei mehreren gilt die letzte, eine defekte wird ignoriert."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[row["id"]] = row
+    return done
+
+
+async def _extract(entries, ids, client, checkpoint_path, concurrency, retries, timeout,
+                   format_instructions, done, cache_path, cache_size, structured, repairs):
+    stats = {"done": 0, "checkpoint": 0, "cached": 0, "failed": 0, "retries": 0,
+             "generations": 0, "failed_generations": 0, "invalid_items": 0}
+    mode = {"format": response_schema(), "repairs": repairs} if structured else None
+    # Timeout gilt je Generierung, das Reparaturbudget verlängert die Frist
+    deadline = timeout * (repairs + 1 if structured else 1) + 5
+
+    def call(messages):
+        if structured:
+            return extract_structured(client, messages, timeout, repairs)
+        raw = client.chat(messages, timeout)
+        return raw, _free_info(raw)
+    # Begrenzte Warteschlange = Gegendruck: höchstens 2 × concurrency Sätze vorbereitet
+    queue = asyncio.Queue(maxsize=2 * concurrency)
+    threads = ThreadPoolExecutor(max_workers=concurrency)
+    loop = asyncio.get_running_loop()
+    # SQLite-Verbindung im Thread der Event-Loop öffnen
+    cache = Cache(cache_path, max_entries=cache_size, version=prompt_version()) if cache_path else None
+    if cache is not None and cache.invalidated:
+        print("RE: Prompt oder Typenlisten geändert – Antwort-Cache geleert")
+
+    def record(out, entry_id, key, raw):
+        # Sofort anhängen und auf die Platte bringen
+        row = {"id": entry_id, "key": key, "raw": raw}
+        out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        out.flush()
+        done[entry_id] = row
+
+    async def producer(out):
+        for entry_id, entry in zip(ids, entries):
+            messages = render_messages(entry, format_instructions)
+            key = request_key(messages, client, mode)
+            row = done.get(entry_id)
+            if row is not None and row.get("key") == key:
+                stats["checkpoint"] += 1
+                continue
+            raw = cache.get(key) if cache is not None else None
+            if raw is not None:
+                record(out, entry_id, key, raw)
+                stats["cached"] += 1
+                continue
+            await queue.put((entry_id, entry, messages, key))
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def worker(out):
+        while (item := await queue.get()) is not None:
+            entry_id, entry, messages, key = item
+            for attempt in range(retries + 1):
+                try:
+                    result, info = await asyncio.wait_for(
+                        loop.run_in_executor(threads, call, messages), deadline
+                    )
+                    break
+                except (urllib.error.URLError, TimeoutError, asyncio.TimeoutError, OSError, KeyError, ValueError) as e:
+                    if attempt == retries:
+                        print(f"Fehlgeschlagen nach {retries + 1} Versuchen: {entry.get('datei')} – {e}")
+                        stats["failed"] += 1
+                        result = None
+                        break
+                    stats["retries"] += 1
+                    await asyncio.sleep(min(2 ** attempt, 30))
+            if result is None:
+                continue
+            if cache is not None:
+                cache.put(key, result)
+            record(out, entry_id, key, result)
+            stats["done"] += 1
+            for name, value in info.items():
+                stats[name] += value
+
+    os.makedirs(os.path.dirname(checkpoint_path) or ".", exist_ok=True)
+    torn = False
+    if os.path.exists(checkpoint_path) and os.path.getsize(checkpoint_path) > 0:
+        with open(checkpoint_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b"\n"
+    try:
+        with open(checkpoint_path, "a", encoding="utf-8") as out:
+            if torn:
+                # Nach einem Abbruch mitten in einer Zeile in einer neuen Zeile weiterschreiben
+                out.write("\n")
+            await asyncio.gather(producer(out), *(worker(out) for _ in range(concurrency)))
+    finally:
+        threads.shutdown()
+        if cache is not None:
+            print(cache.report())
+            cache.close()
+    return stats
+
+
+def _run_sync(coro):
+    """asyncio.run, auch innerhalb von Jupyter (dort läuft bereits eine Event-Loop)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        return ex.submit(asyncio.run, coro).result()
+
+
+def run(input_file: str = INPUT_FILE, output_file: str = OUTPUT_FILE, checkpoint_path: str = CHECKPOINT_FILE,
+        client: OllamaClient | None = None, concurrency: int = 4, retries: int = 3, timeout: float = 120.0,
+        format_instructions: str = FORMAT_INSTRUCTIONS, cache_path: str | None = CACHE_PATH,
+        cache_size: int | None = CACHE_MAX_ENTRIES, structured: bool = False, repairs: int = 2) -> list:
+    """Relationen für alle Sätze extrahieren und ``triple.json`` schreiben; gibt die Ergebnisse zurück.
+
+    ``cache_path=None`` schickt alle Sätze ohne Checkpoint-Treffer erneut an das Modell.
+    ``structured=True`` nutzt das JSON-Schema mit höchstens ``repairs`` Rückfragen je Satz.
+    """
+    client = OllamaClient() if client is None else client
+    entries = list(read_records(input_file))
+    ids = entry_ids(entries)
+    done = load_checkpoint(checkpoint_path)
+
+    start = time.time()
+    stats = _run_sync(_extract(entries, ids, client, checkpoint_path, concurrency, retries, timeout,
+                               format_instructions, done, cache_path, cache_size, structured, repairs))
+    elapsed = time.time() - start
+    rate = stats["done"] / elapsed if elapsed else 0.0
+    print(f"RE: {len(entries)} Sätze – {stats['done']} vom Modell ({rate:.2f} Sätze/s), "
+          f"{stats['cached']} aus dem Cache, {stats['checkpoint']} aus dem Checkpoint, "
+          f"{stats['retries']} Wiederholungen, {stats['failed']} fehlgeschlagen")
+    if stats["generations"]:
+        gen_rate = stats["generations"] / elapsed if elapsed else 0.0
+        fail_rate = stats["failed_generations"] / stats["generations"]
+        print(f"RE: {stats['generations']} Generierungen ({gen_rate:.2f}/s), "
+              f"Parse-Fehlerquote {fail_rate:.1%}, {stats['invalid_items']} ungültige Einträge")
+
+    # Ergebnisse in Eingabereihenfolge; fehlgeschlagene Sätze fehlen bis zum nächsten Lauf
+    results = [transform(entry, parse_relations(done[i]["raw"])) for i, entry in zip(ids, entries) if i in done]
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Relationsextraktion mit Ollama (parallel, fortsetzbar)")
+    ap.add_argument("--input", default=INPUT_FILE)
+    ap.add_argument("--output", default=OUTPUT_FILE)
+    ap.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    ap.add_argument("--url", default=OLLAMA_URL)
+    ap.add_argument("--model", default=MODEL)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--retries", type=int, default=3)
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--cache", default=CACHE_PATH, help="Antwort-Cache (Prompt + Modell + Sampling)")
+    ap.add_argument("--cache-size", type=int, default=CACHE_MAX_ENTRIES, help="max. Einträge im Cache (LRU)")
+    ap.add_argument("--no-cache", action="store_true", help="Cache weder lesen noch schreiben")
+    ap.add_argument("--structured", action="store_true", help="JSON-Schema-Ausgabe mit pydantic-Prüfung")
+    ap.add_argument("--repairs", type=int, default=2, help="max. Rückfragen zu ungültigen Einträgen je Satz")
+    args = ap.parse_args(argv)
+    run(args.input, args.output, args.checkpoint, OllamaClient(args.url, args.model),
+        concurrency=args.concurrency, retries=args.retries, timeout=args.timeout,
+        cache_path=None if args.no_cache else args.cache, cache_size=args.cache_size,
+        structured=args.structured, repairs=args.repairs)
+
+
+if __name__ == "__main__":
+    main()
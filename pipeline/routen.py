@@ -0,0 +1,217 @@
+"""Reiserouten je Person (bzw. je Weg) aus den verknüpften Ortszeilen.
+
+Für jedes Subjekt werden die Ortszeilen (``objekt_type == "location"`` mit
+Koordinaten) nach der Zeitangabe geordnet (``zeit_von``, siehe
+``pipeline.zeit``). Stationen ohne Datum übernehmen die Zeit der
+vorangehenden datierten Station in Textreihenfolge (``reihenfolge``);
+Geburtsort und Startpunkt ohne Datum stehen am Anfang, Sterbeort und
+Endpunkt am Ende. Aufeinanderfolgende Stationen am selben Ort werden
+zusammengefasst.
+
+Jede Route wird als kodierte Polyline gespeichert (Differenzen zur
+vorigen Koordinate, Verfahren wie bei Google Encoded Polylines, 5
+Nachkommastellen) und mit Begrenzungsrahmen und Zeitraum als
+``routen.parquet`` im Triple-Speicher abgelegt, einmal je Datenversion.
+Die Karte (``geo.RouteLayer``) zeichnet nur die Routen, deren Rahmen im
+sichtbaren Ausschnitt liegt::
+
+    python -m pipeline.routen                        # Routen aktualisieren
+    python -m pipeline.routen --person "Agnes Lemmerz"
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pipeline import geo, triplestore, zeit
+
+# Gespeicherte Routen neben den Triple-Tabellen
+ROUTE_FILE = "routen.parquet"
+
+# Subjekte mit Route: Personen und die Wege (Reisen) aus der Kuratierung
+ROUTE_TYPES = ("person", "weg")
+
+# Stationen ohne Datum mit fester Lage in der Route
+START_PREDICATES = {"Geburtsort", "geografischer Startpunkt"}
+END_PREDICATES = {"Sterbeort", "geografischer Endpunkt"}
+
+# Nachkommastellen der kodierten Koordinaten (~1 m)
+PRECISION = 5
+
+COLUMNS = ["subjekt", "prädikat", "objekt", "objekt_type", "subjekt_type",
+           "zeit", "reihenfolge", "lat", "lon"] + triplestore.DERIVED_COLUMNS
+
+
+def _text_order(col: pd.Series) -> np.ndarray:
+    """``reihenfolge`` („10-002“, „20008“) als Zahl; fehlend → ans Ende."""
+    digits = col.astype(object).where(col.notna(), "").astype(str).str.replace(r"\D", "", regex=True)
+    return pd.to_numeric(digits, errors="coerce").fillna(np.inf).to_numpy(dtype=float)
+
+
+def stops(df: pd.DataFrame) -> pd.DataFrame:
+    """Geordnete Stationen aller Routen (eine Zeile je Station, Spalte ``station``)."""
+    locs = geo.locations(df)
+    locs = locs[locs["subjekt_type"].astype(str).isin(ROUTE_TYPES) & locs["subjekt"].notna()]
+    missing = pd.Series(np.nan, index=locs.index)
+    s = pd.DataFrame({
+        "subjekt": locs["subjekt"].astype(str),
+        "subjekt_type": locs["subjekt_type"].astype(str),
+        "prädikat": locs["__cat"],
+        "objekt": locs["objekt"].astype(object).fillna("").astype(str),
+        "zeit": locs.get("zeit", missing).astype(object),
+        "lat": locs["lat"], "lon": locs["lon"],
+        "von": pd.to_numeric(locs.get("zeit_von", missing), errors="coerce").astype(float),
+        "bis": pd.to_numeric(locs.get("zeit_bis", missing), errors="coerce").astype(float),
+        "text": _text_order(locs.get("reihenfolge", missing)),
+        "row": np.arange(len(locs)),
+    })
+
+    # Undatierte Stationen: Zeit der vorigen datierten Station im Text (sonst der nächsten)
+    s = s.sort_values(["subjekt", "text", "row"], kind="stable")
+    key = s.groupby("subjekt", sort=False)["von"].ffill()
+    key = key.fillna(s.assign(key=key).groupby("subjekt", sort=False)["key"].bfill())
+    start, end = s["prädikat"].isin(START_PREDICATES), s["prädikat"].isin(END_PREDICATES)
+    undated = s["von"].isna()
+    key = key.mask(undated & start, -np.inf).mask(undated & end, np.inf)
+    s["pin"] = np.where(start, 0, np.where(end, 2, 1))
+    s["key"] = key.fillna(0.0)
+
+    s = s.sort_values(["subjekt", "key", "pin", "text", "row"], kind="stable")
+    # Gleicher Ort direkt nacheinander → eine Station
+    same = ((s["subjekt"] == s["subjekt"].shift()) & (s["lat"] == s["lat"].shift())
+            & (s["lon"] == s["lon"].shift()))
+    s = s[~same].reset_index(drop=True)
+    s["station"] = s.groupby("subjekt", sort=False).cumcount()
+    return s.drop(columns=["key", "pin", "text", "row"])
+
+
+def encode(lat, lon, precision: int = PRECISION) -> str:
+    """Koordinaten → kodierte Polyline (Differenzen, Zickzack, 5-Bit-Gruppen)."""
+    factor = 10 ** precision
+    points = np.column_stack([np.round(np.asarray(lat, dtype=float) * factor),
+                              np.round(np.asarray(lon, dtype=float) * factor)]).astype(np.int64)
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    zigzag = (deltas << 1) ^ (deltas >> 63)
+    out = []
+    for v in zigzag.tolist():
+        while v >= 0x20:
+            out.append(chr((0x20 | (v & 0x1F)) + 63))
+            v >>= 5
+        out.append(chr(v + 63))
+    return "".join(out)
+
+
+def decode(text: str, precision: int = PRECISION) -> list:
+    """Kodierte Polyline → Liste von (lat, lon)."""
+    values, v, shift = [], 0, 0
+    for c in text:
+        b = ord(c) - 63
+        v |= (b & 0x1F) << shift
+        shift += 5
+        if b < 0x20:
+            values.append(~(v >> 1) if v & 1 else v >> 1)
+            v, shift = 0, 0
+    coords = np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return [tuple(c) for c in coords.tolist()]
+
+
+def _label(objekt: pd.Series, zeit_text: pd.Series) -> pd.Series:
+    z = zeit_text.astype(object).where(zeit_text.notna(), "").astype(str).str.strip()
+    return objekt.where(z.isin(["", "nan", "None"]), objekt + " (" + z + ")")
+
+
+def build_routes(df: pd.DataFrame) -> pd.DataFrame:
+    """Eine Zeile je Route mit mindestens zwei Stationen.
+
+    Spalten: ``subjekt``, ``subjekt_type``, ``polyline``, ``stationen``
+    (Beschriftungen in Reihenfolge), ``anzahl``, ``von``/``bis`` (Tage, ohne
+    Datum ``<NA>``) und der Rahmen ``sued``/``west``/``nord``/``ost``.
+    """
+    s = stops(df)
+    s = s[s.groupby("subjekt", sort=False)["station"].transform("size") >= 2]
+    s = s.assign(label=_label(s["objekt"], s["zeit"]))
+    g = s.groupby("subjekt", sort=False)
+    routes = g.agg(subjekt_type=("subjekt_type", "first"), anzahl=("station", "size"),
+                   von=("von", "min"), bis=("bis", "max"),
+                   sued=("lat", "min"), west=("lon", "min"), nord=("lat", "max"), ost=("lon", "max"))
+    routes["stationen"] = g["label"].agg(list)
+    routes["polyline"] = [encode(part["lat"], part["lon"]) for _, part in g]
+    routes["von"] = routes["von"].astype("Int32")
+    routes["bis"] = routes["bis"].astype("Int32")
+    routes = routes.reset_index()
+    return routes[["subjekt", "subjekt_type", "polyline", "stationen", "anzahl", "von", "bis",
+                   "sued", "west", "nord", "ost"]]
+
+
+def in_window(routes: pd.DataFrame, start: int, end: int, undated: bool = False) -> pd.DataFrame:
+    """Routen, deren Zeitraum ``[start, end]`` berührt (mit ``undated`` auch die ohne Datum)."""
+    von, bis = routes["von"].astype("Float64"), routes["bis"].astype("Float64")
+    hit = ((von <= end) & (bis >= start)).fillna(False)
+    if undated:
+        hit |= von.isna()
+    return routes[hit.to_numpy(dtype=bool)]
+
+
+# ---------- Gespeicherte Routen ----------
+
+def read_routes(store_dir: str = triplestore.STORE_DIR):
+    """(Datenversion, Routen) der gespeicherten Routen oder (None, None)."""
+    path = os.path.join(store_dir, ROUTE_FILE)
+    if not os.path.exists(path):
+        return None, None
+    table = pq.read_table(path)
+    version = (table.schema.metadata or {}).get(b"version", b"").decode() or None
+    return version, table.to_pandas()
+
+
+def write_routes(routes: pd.DataFrame, version: str, store_dir: str = triplestore.STORE_DIR) -> str:
+    path = os.path.join(store_dir, ROUTE_FILE)
+    table = pa.Table.from_pandas(routes, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"version": version.encode()})
+    pq.write_table(table, path + ".tmp", compression="zstd")
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def update_routes(store_dir: str = triplestore.STORE_DIR, fresh: bool = False) -> pd.DataFrame:
+    """Routen zur aktuellen Datenversion liefern; bei Bedarf berechnen und speichern."""
+    version = triplestore.data_version(store_dir)
+    old_version, old = read_routes(store_dir)
+    if old is not None and old_version == version and not fresh:
+        return old
+
+    columns = [c for c in triplestore.load_manifest(store_dir)["columns"] if c in COLUMNS]
+    routes = build_routes(triplestore.read_triples(store_dir, columns=columns))
+    print(f"Routen berechnet: {len(routes)} Routen, {int(routes['anzahl'].sum())} Stationen (Version {version})")
+    try:
+        write_routes(routes, version, store_dir)
+    except OSError as e:
+        # z. B. schreibgeschützter Speicher in der Cloud: Routen nur im Speicher halten
+        print(f"Routen nicht gespeichert: {e}")
+    return routes
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Reiserouten je Person aus den Ortszeilen")
+    ap.add_argument("--store", default=triplestore.STORE_DIR)
+    ap.add_argument("--neu", action="store_true", help="Routen neu berechnen")
+    ap.add_argument("--person", help="Stationen einer Route ausgeben")
+    args = ap.parse_args(argv)
+    routes = update_routes(args.store, fresh=args.neu)
+    if args.person:
+        hit = routes[routes["subjekt"] == args.person]
+        if hit.empty:
+            print(f"Keine Route für {args.person!r}")
+            return
+        route = hit.iloc[0]
+        for label, (lat, lon) in zip(route["stationen"], decode(route["polyline"])):
+            print(f"{lat:9.5f} {lon:10.5f}  {label}")
+        if not pd.isna(route["von"]):
+            print(f"Zeitraum: {zeit.to_date(route['von'])} – {zeit.to_date(route['bis'])}")
+
+
+if __name__ == "__main__":
+    main()
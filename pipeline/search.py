@@ -0,0 +1,155 @@
+"""Suchindex für die Knoten-Suche der Visualisierung (``seite_2.py``).
+
+Statt bei jeder Eingabe ``str.contains`` (als regulärer Ausdruck) über alle
+Subjekt- und Objektzeilen laufen zu lassen, werden die Knotennamen einmal je
+Datenversion in einen Trigramm-Index (Teilwortsuche) aufgenommen; ein- und
+zweistellige Eingaben durchsuchen die Namen linear. Optional kommen die
+Satztexte hinzu; ein Treffer im Satz liefert die Knoten der Triples dieses
+Satzes.
+
+Die Teilwortsuche läuft auf einer leichten Vereinheitlichung
+(``light_fold``: Kleinbuchstaben, langes ſ, ohne Diakritika), damit jede
+angefangene Eingabe („Schmid“, „Bac“) ihren Namen findet. Zusätzlich gibt es
+einen zweiten Index mit ``fold`` – Umlaute (ä/ae → a), ß/ss/tz, ph/f, th/t,
+c/k, y/i, dt/t und doppelte Buchstaben –, dessen Treffer hinzukommen, sodass
+z. B. „Bonaß“ auch „Bonatz“ und „Adolph“ auch „Adolf“ findet. Weitere
+Schreibweisen aus ``pipeline.dedup`` können als Aliasse mitgegeben werden;
+sie finden den kanonischen Knoten.
+"""
+import re
+import unicodedata
+
+import numpy as np
+
+# Reihenfolge wichtig: erst Buchstabenfolgen, dann doppelte Buchstaben
+FOLD_RULES = [
+    (re.compile(r"ae"), "a"),
+    (re.compile(r"oe"), "o"),
+    (re.compile(r"ue"), "u"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"th"), "t"),
+    (re.compile(r"dt"), "t"),
+    (re.compile(r"tz"), "s"),
+    (re.compile(r"ck"), "k"),
+    (re.compile(r"c(?!h)"), "k"),
+    (re.compile(r"y"), "i"),
+    (re.compile(r"([a-z])\1+"), r"\1"),
+    (re.compile(r"[^a-z0-9]+"), " "),
+]
+
+
+def light_fold(text: str) -> str:
+    """Nur Kleinbuchstaben, langes ſ → s und ohne Diakritika (Teilwörter bleiben Teilwörter)."""
+    s = str(text).lower().replace("ſ", "s")
+    return "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c)).strip()
+
+
+def fold(text: str) -> str:
+    """Schreibweise vereinheitlichen (Kleinbuchstaben, ohne Diakritika und OCR-Varianten)."""
+    s = light_fold(text).replace("ß", "ss")
+    for pattern, repl in FOLD_RULES:
+        s = pattern.sub(repl, s)
+    return s.strip()
+
+
+def _grams(s: str, n: int) -> set:
+    return {s[i:i + n] for i in range(len(s) - n + 1)}
+
+
+class NgramIndex:
+    """Teilwortsuche über Dokumente (Knotennamen oder Sätze).
+
+    ``search`` liefert die sortierten Nummern der Dokumente, deren mit
+    ``normalize`` vereinheitlichter Text die ebenso vereinheitlichte Anfrage
+    enthält.
+    """
+
+    def __init__(self, docs, n: int = 3, normalize=light_fold):
+        self.n = n
+        self.normalize = normalize
+        self.folded = [normalize(d) for d in docs]
+        postings = {}
+        for i, text in enumerate(self.folded):
+            for gram in _grams(text, n):
+                postings.setdefault(gram, []).append(i)
+        self.postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.folded)
+
+    def search(self, query: str) -> np.ndarray:
+        q = self.normalize(query)
+        if not q:
+            return np.arange(len(self), dtype=np.int32)
+        if len(q) < self.n:
+            # Zu kurz für Trigramme: linear, aber auch mitten im Wort („ut“ → Herrnhut)
+            return np.array([i for i, text in enumerate(self.folded) if q in text], dtype=np.int32)
+        lists = []
+        for gram in _grams(q, self.n):
+            ids = self.postings.get(gram)
+            if ids is None:
+                return np.empty(0, dtype=np.int32)
+            lists.append(ids)
+        lists.sort(key=len)
+        hits = lists[0]
+        for ids in lists[1:]:
+            if not len(hits):
+                break
+            hits = np.intersect1d(hits, ids, assume_unique=True)
+        # Trigramme sind nur notwendig, nicht hinreichend: Teilwort prüfen
+        return np.array([i for i in hits if q in self.folded[i]], dtype=np.int32)
+
+
+class NodeSearch:
+    """Knoten-Suche über Namen und optional über die Satztexte.
+
+    ``labels`` sind die Knotennamen; ``texts`` die Sätze und ``text_nodes``
+    je Satz die Nummern der Knoten (in ``labels``) aus seinen Triples.
+    ``aliases`` ordnet weitere Schreibweisen einem Knotennamen zu. Namen und
+    Sätze liegen je zweimal vor: leicht (``light_fold``) für die Teilwortsuche
+    und mit ``fold`` für Schreibvarianten; die Treffer werden vereinigt.
+    """
+
+    def __init__(self, labels, texts=None, text_nodes=None, aliases=None):
+        self.labels = np.asarray(labels, dtype=object)
+        index = {label: i for i, label in enumerate(self.labels)}
+        extra = sorted((a, index[c]) for a, c in (aliases or {}).items() if c in index and a not in index)
+        # Dokument im Namensindex → Knotennummer (Aliasse hinter den Namen)
+        self.name_nodes = np.concatenate([np.arange(len(self.labels), dtype=np.int32),
+                                          np.array([i for _, i in extra], dtype=np.int32)])
+        names = list(self.labels) + [a for a, _ in extra]
+        self.names = (NgramIndex(names), NgramIndex(names, normalize=fold))
+        self.texts = (NgramIndex(texts), NgramIndex(texts, normalize=fold)) if texts is not None else None
+        self.text_nodes = text_nodes
+
+    @staticmethod
+    def _search(indexes, query: str) -> np.ndarray:
+        light, folded = indexes
+        return np.union1d(light.search(query), folded.search(query))
+
+    def find(self, query: str, in_text: bool = False) -> list:
+        """Namen der passenden Knoten (bei ``in_text`` auch über den Satztext)."""
+        ids = np.unique(self.name_nodes[self._search(self.names, query)])
+        if in_text and self.texts is not None:
+            sentences = self._search(self.texts, query)
+            if len(sentences):
+                ids = np.union1d(ids, np.concatenate([self.text_nodes[i] for i in sentences]))
+        return self.labels[ids].tolist()
+
+
+def build(df, s_col: str = "subjekt", o_col: str = "objekt", text_col: str = "text",
+          aliases: dict = None) -> NodeSearch:
+    """Index aus der Triple-Tabelle; mit Spalte ``text_col`` auch über die Sätze."""
+    pairs = df[[s_col, o_col]].astype(object)
+    labels = sorted(set(pairs[s_col].dropna().astype(str)) | set(pairs[o_col].dropna().astype(str)))
+    if text_col not in df.columns:
+        return NodeSearch(labels, aliases=aliases)
+
+    index = {label: i for i, label in enumerate(labels)}
+    rows = df[[text_col, s_col, o_col]].astype(object).dropna(subset=[text_col])
+    texts, text_nodes = [], []
+    for text, group in rows.groupby(text_col, sort=False):
+        nodes = {index[str(n)] for n in group[s_col].dropna()} | {index[str(n)] for n in group[o_col].dropna()}
+        texts.append(str(text))
+        text_nodes.append(np.array(sorted(nodes), dtype=np.int32))
+    return NodeSearch(labels, texts, text_nodes, aliases)
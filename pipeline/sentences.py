@@ -0,0 +1,166 @@
+"""5.4.2 Sätzenextraktion: TEI → Satz-Datensätze für die Relationsextraktion.
+
+Jede Datei wird mit ``iterparse`` genau einmal durchlaufen; die Entitäten
+(``persName``, ``orgName``, ``placeName``, ``date``) werden im selben
+Durchgang den offenen ``<head>``/``<s>``-Elementen zugeordnet. Bereits
+verarbeitete Teilbäume werden sofort freigegeben. Die Dateien werden auf
+einen Prozesspool verteilt, die Datensätze als JSON Lines geschrieben.
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pipeline.sentences
+"""
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from lxml import etree as ET
+
+# Pfade
+INPUT_DIR = "data/5.3_TEI-Modellierung/5.3_TEI_bereinigt"
+OUTPUT_FILE = "data/5.4.2_RE/sätze.jsonl"
+
+TEI = "{http://www.tei-c.org/ns/1.0}"
+
+# Entitäts-Tags → Feld im Datensatz
+ENTITY_FIELDS = {
+    TEI + "persName": "personen",
+    TEI + "orgName": "organisationen",
+    TEI + "placeName": "orte",
+    TEI + "date": "date",
+}
+
+SENTENCE_TAGS = {TEI + "head", TEI + "s"}
+
+
+# Entfernung von Leerzeichen, Tabs, Zeilenumbrüche usw.
+def clean_text(text):
+    if not text:
+        return ''
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def extract_file(file_path: str) -> list:
+    """Alle Satz-Datensätze einer Datei (erst <head>, dann <s>, wie bisher)."""
+    filename = os.path.basename(file_path)
+    heads, sents = [], []
+    autor = ref = None
+    in_header = in_text = 0
+    # Offene <head>/<s>-Elemente mit ihren Entitätsmengen
+    open_sentences = []
+
+    for event, elem in ET.iterparse(file_path, events=("start", "end"), remove_blank_text=True):
+        tag = elem.tag
+        if event == "start":
+            if tag == TEI + "teiHeader":
+                in_header += 1
+            elif tag == TEI + "text":
+                in_text += 1
+            elif in_text and tag in SENTENCE_TAGS:
+                open_sentences.append((elem, {field: set() for field in ENTITY_FIELDS.values()}))
+            continue
+
+        if tag == TEI + "teiHeader":
+            in_header -= 1
+        elif tag == TEI + "text":
+            in_text -= 1
+        elif in_header and tag == TEI + "author" and autor is None:
+            # Metadaten: erster Autor und erste Referenz im teiHeader
+            autor = clean_text(elem.text)
+        elif in_header and tag == TEI + "ref" and ref is None:
+            ref = clean_text(elem.text)
+        elif tag in ENTITY_FIELDS and open_sentences and elem.text:
+            for _, entities in open_sentences:
+                entities[ENTITY_FIELDS[tag]].add(clean_text(elem.text))
+        elif open_sentences and elem is open_sentences[-1][0]:
+            _, entities = open_sentences.pop()
+            record = {
+                "text": clean_text("".join(elem.itertext())),
+                "personen": sorted(entities["personen"]),
+                "orte": sorted(entities["orte"]),
+                "organisationen": sorted(entities["organisationen"]),
+                "date": sorted(entities["date"]),
+                "datei": filename,
+                "autor": None,
+                "ref": None,
+            }
+            (heads if tag == TEI + "head" else sents).append(record)
+
+        # Verarbeitete Teilbäume freigeben (nicht innerhalb offener Sätze)
+        if not open_sentences and elem.getparent() is not None:
+            elem.clear(keep_tail=True)
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    records = heads + sents
+    for record in records:
+        record["autor"] = autor or ""
+        record["ref"] = ref or ""
+    return records
+
+
+def _extract_safe(file_path: str):
+    try:
+        return extract_file(file_path), None
+    except ET.XMLSyntaxError as e:
+        return [], f"Fehler beim Parsen von {os.path.basename(file_path)}: {e}"
+    except Exception as e:
+        return [], f"Anderer Fehler bei {os.path.basename(file_path)}: {e}"
+
+
+def find_files(input_dir: str = INPUT_DIR) -> list:
+    return sorted(os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.endswith(".xml"))
+
+
+def iter_records(paths, workers=None):
+    """Datensätze aller Dateien in Dateireihenfolge; die Dateien laufen parallel."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for records, error in pool.map(_extract_safe, paths):
+            if error:
+                print(error)
+            yield from records
+
+
+def write_jsonl(records, output_file: str) -> int:
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    count = 0
+    tmp = output_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(tmp, output_file)
+    return count
+
+
+def read_records(path: str):
+    """Datensätze aus JSON Lines (oder einer alten JSON-Liste wie sätze.json) lesen."""
+    with open(path, "r", encoding="utf-8") as f:
+        if not path.endswith(".jsonl"):
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def run(input_dir: str = INPUT_DIR, output_file: str = OUTPUT_FILE, workers=None) -> int:
+    count = write_jsonl(iter_records(find_files(input_dir), workers), output_file)
+    print(f"{count} Sätze gespeichert in: {output_file}")
+    return count
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Sätze und Entitäten aus TEI extrahieren (JSON Lines)")
+    ap.add_argument("--input", default=INPUT_DIR)
+    ap.add_argument("--output", default=OUTPUT_FILE)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args(argv)
+    run(args.input, args.output, args.workers)
+
+
+if __name__ == "__main__":
+    main()
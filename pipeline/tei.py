@@ -0,0 +1,190 @@
+"""5.3 XML/TEI-Modellierung (Teil 1): TEI-Grundstruktur als Datenstrom schreiben.
+
+Bisher wurde pro Personenordner ein vollständiger ElementTree aufgebaut,
+serialisiert und mit ``minidom`` erneut geparst, nur um ihn einzurücken.
+Hier wird der (konstante) ``teiHeader`` einmal vorformatiert und danach
+jede Seite direkt beim Lesen als ``<pb/>`` + ``<p>``-Elemente in die Datei
+geschrieben. Im Speicher liegt immer nur die aktuelle Seite.
+
+Die Ausgabe entspricht der Formatierung der Dateien in
+``data/5.3_TEI-Modellierung`` und kann gegen ``schema.rng`` geprüft werden.
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pipeline.tei --validate
+"""
+import argparse
+import os
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+
+# Ordner mit txt-Dateien
+BASE_FOLDER = "data/5.2_OCR-Erkennung/txt"
+
+# Ausgabeordner der XML-Dateien
+OUTPUT_FOLDER = "data/5.3_TEI-Modellierung"
+
+SCHEMA = "data/5.3_TEI-Modellierung/schema.rng"
+
+TEI_NS = "http://www.tei-c.org/ns/1.0"
+
+INDENT = "  "
+
+
+def build_header() -> ET.Element:
+    """teiHeader-Struktur (für alle Lebensläufe gleich)."""
+    headerTEI_el = ET.Element("teiHeader")
+    fileDesc_el = ET.SubElement(headerTEI_el, "fileDesc")
+    titleStmt_el = ET.SubElement(fileDesc_el, "titleStmt")
+
+    titleStmt_el.append(ET.Comment("Titel muss definiert werden. Nach der Korrektur wird der Kommentar gelöscht"))
+    ET.SubElement(titleStmt_el, "title")
+
+    titleStmt_el.append(ET.Comment("Autor muss definiert werden. Nach der Korrektur wird der Kommentar gelöscht"))
+    ET.SubElement(titleStmt_el, "author")
+
+    # respStmt
+    respStmt_el = ET.SubElement(titleStmt_el, "respStmt")
+    ET.SubElement(respStmt_el, "resp").text = "XML-Modelling compiled by"
+    ET.SubElement(respStmt_el, "name").text = "Svetlana Yakutina"
+
+    # publicationStmt
+    publicationStmt_el = ET.SubElement(fileDesc_el, "publicationStmt")
+    publisher_el = ET.SubElement(publicationStmt_el, "publisher")
+    ET.SubElement(publisher_el, "orgName").text = "Verlag der Unitäts-Buchhandlung"
+    ET.SubElement(publicationStmt_el, "pubPlace").text = "Gnadau (Germany)"
+
+    availability_el = ET.SubElement(publicationStmt_el, "availability")
+    p_header_el = ET.SubElement(availability_el, "p")
+    ET.SubElement(p_header_el, "orgName").text = "Memorial University of Newfoundland"
+
+    publicationStmt_el.append(ET.Comment("Date muss definiert werden. Nach der Korrektur wird der Kommentar gelöscht"))
+    ET.SubElement(publicationStmt_el, "date")
+
+    publicationStmt_el.append(ET.Comment("Ref muss definiert werden. Nach der Korrektur wird der Kommentar gelöscht"))
+    ET.SubElement(publicationStmt_el, "ref")
+
+    # sourceDesc Struktur
+    sourceDesc_el = ET.SubElement(fileDesc_el, "sourceDesc")
+    ET.SubElement(sourceDesc_el, "bibl", type="j").text = "Nachrichten aus der Brüder-Gemeine"
+
+    # biblFull Struktur
+    biblFull_el = ET.SubElement(sourceDesc_el, "biblFull")
+    titleStmt_el_ = ET.SubElement(biblFull_el, "titleStmt")
+    ET.SubElement(titleStmt_el_, "title").text = "Nachrichten aus der Brüder-Gemeine"
+    ET.SubElement(titleStmt_el_, "author").text = "Unbekannt"
+
+    editionStmt_el = ET.SubElement(biblFull_el, "editionStmt")
+    ET.SubElement(editionStmt_el, "edition").text = "Digitale Ausgabe der Zeitschrift"
+
+    publicationStmt_el_ = ET.SubElement(biblFull_el, "publicationStmt")
+    ET.SubElement(publicationStmt_el_, "publisher").text = "Verlag der Unitäts-Buchhandlung"
+
+    seriesStmt_el = ET.SubElement(biblFull_el, "seriesStmt")
+    ET.SubElement(seriesStmt_el, "title", level="j", type="main").text = "Nachrichten aus der Brüder-Gemeine"
+    ET.SubElement(seriesStmt_el, "biblScope", unit="volume").text = "1856-1894"
+    seriesStmt_el.append(ET.Comment("Erscheinungsjahr muss definiert werden"))
+    seriesStmt_el.append(ET.Comment("Seiten müssen definiert werden"))
+    ET.SubElement(seriesStmt_el, "biblScope", unit="issue")
+    ET.SubElement(seriesStmt_el, "biblScope", unit="page")
+
+    notesStmt_el = ET.SubElement(biblFull_el, "notesStmt")
+    ET.SubElement(notesStmt_el, "note", type="fileFormat").text = "application/pdf"
+
+    # msDesc Struktur
+    msDesc_el = ET.SubElement(sourceDesc_el, "msDesc")
+    msIdentifier_el = ET.SubElement(msDesc_el, "msIdentifier")
+    ET.SubElement(msIdentifier_el, "repository").text = "Memorial University of Newfoundland"
+    idno_el = ET.SubElement(msIdentifier_el, "idno")
+    ET.SubElement(idno_el, "idno", type="URLCatalogue").text = "https://dai.mun.ca/digital/nachrichten/"
+
+    return headerTEI_el
+
+
+def _header_xml() -> str:
+    header = build_header()
+    ET.indent(header, space=INDENT, level=1)
+    # Leere Elemente wie lxml ohne Leerzeichen schreiben (<title/> statt <title />)
+    return INDENT + ET.tostring(header, encoding="unicode").replace(" />", "/>") + "\n"
+
+
+HEADER_XML = _header_xml()
+
+
+def iter_pages(folder_path: str):
+    """(Seitenname, Absätze) je TXT-Datei; es wird immer nur eine Seite gelesen."""
+    txt_files = sorted(f for f in os.listdir(folder_path) if f.lower().endswith(".txt"))
+    for txt_file in txt_files:
+        with open(os.path.join(folder_path, txt_file), "r", encoding="utf-8") as f:
+            raw_text = f.read()
+        # alle Absätze werden anhand von doppelten Zeilenumbruch in p-Tag gepackt
+        paragraphs = [para.strip() for para in raw_text.split("\n\n")]
+        yield os.path.splitext(txt_file)[0], [para for para in paragraphs if para]
+
+
+def write_document(out, pages) -> None:
+    """TEI-Dokument aus (Seitenname, Absätze)-Paaren in den Textstrom ``out`` schreiben."""
+    out.write("<?xml version='1.0' encoding='UTF-8'?>\n")
+    out.write(f'<TEI xmlns="{TEI_NS}" version="4.8.1">\n')
+    out.write(HEADER_XML)
+    out.write(f"{INDENT}<text>\n{INDENT * 2}<body>\n{INDENT * 3}<div>\n")
+    ind = INDENT * 4
+    for file_base, paragraphs in pages:
+        # vor jeder neuen Seite wird ein geschlossenes pb-Tag eingefügt (n = Dateiname ohne .txt)
+        out.write(f"{ind}<pb n={quoteattr(file_base)}/>\n")
+        for para in paragraphs:
+            out.write(f"{ind}<p>{escape(para)}</p>\n")
+    out.write(f"{INDENT * 3}</div>\n{INDENT * 2}</body>\n{INDENT}</text>\n</TEI>\n")
+
+
+def validate(xml_path: str, schema_path: str = SCHEMA) -> list:
+    """Datei gegen schema.rng prüfen; gibt die Fehlermeldungen zurück (leer = gültig)."""
+    from lxml import etree
+
+    relaxng = etree.RelaxNG(etree.parse(schema_path))
+    if relaxng.validate(etree.parse(xml_path)):
+        return []
+    return [str(e) for e in relaxng.error_log]
+
+
+def run(base_folder: str = BASE_FOLDER, output_folder: str = OUTPUT_FOLDER, check: bool = False,
+        folders=None):
+    """Pro Personenordner eine TEI-Datei schreiben; gibt die erzeugten Pfade zurück.
+
+    ``folders`` beschränkt den Lauf auf diese Personenordner.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    written = []
+    for folder_name in sorted(os.listdir(base_folder) if folders is None else folders):
+        folder_path = os.path.join(base_folder, folder_name)
+        if not os.path.isdir(folder_path):
+            continue
+        if not any(f.lower().endswith(".txt") for f in os.listdir(folder_path)):
+            print(f"Keine .txt-Dateien in Ordner: {folder_name}")
+            continue
+
+        output_path = os.path.join(output_folder, f"{folder_name}.xml")
+        tmp = output_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as out:
+            write_document(out, iter_pages(folder_path))
+        os.replace(tmp, output_path)
+        written.append(output_path)
+        print(f"XML-Datei erstellt: {output_path}")
+
+        if check:
+            for err in validate(output_path):
+                print(f"  Schemafehler: {err}")
+    return written
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="TEI-Grundstruktur aus OCR-Texten erzeugen")
+    ap.add_argument("--input", default=BASE_FOLDER)
+    ap.add_argument("--output", default=OUTPUT_FOLDER)
+    ap.add_argument("--validate", action="store_true", help="Ausgabe gegen schema.rng prüfen")
+    args = ap.parse_args(argv)
+    run(args.input, args.output, check=args.validate)
+
+
+if __name__ == "__main__":
+    main()
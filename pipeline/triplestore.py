@@ -0,0 +1,236 @@
+"""Spaltenbasierter Triple-Speicher (Parquet/Arrow) statt ``graphen_bereinigt.xlsx``.
+
+Die Tabelle wird in zwei Teile zerlegt:
+
+- ``triples``: eine Zeile pro Triple mit ``satz_id``; Subjekt, Prädikat,
+  Objekt, Typen und IDs als Kategorien (Dictionary-Encoding), ``lat``/``lon``
+  als float64
+- ``sentences``: die Satz-Metadaten (``text``, ``ref``, ``datei``, ``autor``)
+  nur einmal pro Satz
+
+Aus der Freitext-Spalte ``zeit`` werden beim Schreiben die Tagesbereiche
+``zeit_von``/``zeit_bis`` abgeleitet (``pipeline.zeit``); sie gehören nicht in
+die xlsx-Datei.
+
+Beide Tabellen liegen als Parquet (Austauschformat) und zusätzlich als
+unkomprimierte Arrow-IPC-Datei vor, die die Apps per Memory-Map lesen. Das
+Manifest enthält die Spaltenreihenfolge der Excel-Datei und eine
+Datenversion (Hash über den Inhalt), an die die Apps ihre Caches binden.
+
+Für die Kuratierung von Hand gibt es Import und Export als xlsx::
+
+    python -m pipeline.triplestore import   # graphen_bereinigt.xlsx → Speicher
+    python -m pipeline.triplestore export   # Speicher → graphen_bereinigt.xlsx
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from pipeline import zeit
+
+# Pfade
+XLSX = "data/5.4.3_EL/graphen_bereinigt.xlsx"
+STORE_DIR = "data/5.4.3_EL/graphen"
+
+# Satz-Metadaten (Seitentabelle)
+SENTENCE_COLUMNS = ["text", "ref", "datei", "autor"]
+
+# Dictionary-codierte Spalten
+CATEGORY_COLUMNS = ["subjekt", "subjekt_type", "q_subjekt", "prädikat", "p_wert",
+                    "objekt", "objekt_type", "q_objekt"]
+
+FLOAT_COLUMNS = ["lat", "lon"]
+
+# Aus ``zeit`` abgeleitet (Tagesnummern, nullable int32)
+DERIVED_COLUMNS = ["zeit_von", "zeit_bis"]
+
+MANIFEST = "manifest.json"
+
+
+def _as_text(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Einheitliche Spaltentypen: Kategorien, float64-Koordinaten, sonst Text.
+
+    Mit Spalte ``zeit`` kommen die abgeleiteten Tagesbereiche hinzu.
+    """
+    df = df.drop(columns=[c for c in DERIVED_COLUMNS if c in df.columns])
+    for col in SENTENCE_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    for col in df.columns:
+        if col in FLOAT_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        elif col in CATEGORY_COLUMNS:
+            df[col] = df[col].map(_as_text, na_action="ignore").astype("category")
+        elif not pd.api.types.is_numeric_dtype(df[col]):
+            # Gemischte Zellen (z. B. Jahreszahl als int neben Text) als Text speichern
+            df[col] = df[col].astype(object).map(_as_text)
+    if "zeit" in df.columns:
+        df["zeit_von"], df["zeit_bis"] = zeit.parse_column(df["zeit"])
+    return df
+
+
+def split(df: pd.DataFrame):
+    """DataFrame → (triples, sentences); ``satz_id`` verweist auf die Satzzeile."""
+    df = normalize(df)
+    satz_id = df.groupby(SENTENCE_COLUMNS, dropna=False, sort=False).ngroup().astype("int32")
+    sentences = df.drop_duplicates(SENTENCE_COLUMNS)[SENTENCE_COLUMNS].reset_index(drop=True)
+    triples = df.drop(columns=SENTENCE_COLUMNS)
+    triples.insert(0, "satz_id", satz_id.to_numpy())
+    return triples.reset_index(drop=True), sentences
+
+
+def _content_hash(*frames) -> str:
+    h = hashlib.sha256()
+    for frame in frames:
+        h.update(json.dumps(list(map(str, frame.columns)), ensure_ascii=False).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(frame.astype(object), index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def write_store(df: pd.DataFrame, store_dir: str = STORE_DIR) -> str:
+    """Tabelle als Parquet + Arrow-IPC speichern; gibt die Datenversion zurück."""
+    triples, sentences = split(df)
+    columns = [str(c) for c in df.columns if c not in DERIVED_COLUMNS]
+    columns += [c for c in DERIVED_COLUMNS if c in triples.columns]
+    version = _content_hash(triples, sentences)
+    os.makedirs(store_dir, exist_ok=True)
+
+    for name, frame in (("triples", triples), ("sentences", sentences)):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        path = os.path.join(store_dir, name)
+        pq.write_table(table, path + ".parquet.tmp", compression="zstd")
+        # Unkomprimiert, damit die Apps ohne Dekodieren per Memory-Map lesen können
+        feather.write_feather(table, path + ".arrow.tmp", compression="uncompressed")
+        os.replace(path + ".parquet.tmp", path + ".parquet")
+        os.replace(path + ".arrow.tmp", path + ".arrow")
+
+    manifest = {"version": version, "columns": columns,
+                "triples": len(triples), "sentences": len(sentences)}
+    tmp = os.path.join(store_dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    # Manifest zuletzt: die Version wechselt erst, wenn alle Tabellen geschrieben sind
+    os.replace(tmp, os.path.join(store_dir, MANIFEST))
+    return version
+
+
+def load_manifest(store_dir: str = STORE_DIR) -> dict:
+    with open(os.path.join(store_dir, MANIFEST), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def data_version(store_dir: str = STORE_DIR) -> str:
+    """Datenversion des Speichers (ändert sich mit jedem geänderten Inhalt)."""
+    return load_manifest(store_dir)["version"]
+
+
+def exists(store_dir: str = STORE_DIR) -> bool:
+    return os.path.exists(os.path.join(store_dir, MANIFEST))
+
+
+def _read_table(store_dir: str, name: str, columns=None, memory_map: bool = True) -> pa.Table:
+    path = os.path.join(store_dir, name)
+    if memory_map and os.path.exists(path + ".arrow"):
+        table = pa.ipc.open_file(pa.memory_map(path + ".arrow", "r")).read_all()
+        return table.select(columns) if columns is not None else table
+    return pq.read_table(path + ".parquet", columns=columns, memory_map=memory_map)
+
+
+def read_triples(store_dir: str = STORE_DIR, columns=None, memory_map: bool = True) -> pd.DataFrame:
+    """Tabelle wie ``graphen_bereinigt.xlsx`` lesen (Satz-Metadaten wieder angefügt).
+
+    ``columns`` beschränkt das Lesen auf die benötigten Spalten; Satz-Metadaten
+    werden nur verknüpft, wenn sie angefordert sind.
+    """
+    order = load_manifest(store_dir)["columns"]
+    wanted = order if columns is None else [c for c in order if c in columns]
+    meta = [c for c in wanted if c in SENTENCE_COLUMNS]
+    own = [c for c in wanted if c not in SENTENCE_COLUMNS]
+
+    triples = _read_table(store_dir, "triples", own + (["satz_id"] if meta else []), memory_map)
+    if meta:
+        sentences = _read_table(store_dir, "sentences", meta, memory_map)
+        # Satz-Metadaten per Index-Zugriff (take) statt Join anfügen
+        picked = sentences.take(triples.column("satz_id"))
+        triples = triples.drop_columns(["satz_id"])
+        for col in meta:
+            triples = triples.append_column(col, picked.column(col))
+    return triples.select(wanted).to_pandas()
+
+
+def iter_triples(store_dir: str = STORE_DIR, columns=None, batch_size: int = 50_000):
+    """Tabelle in Stücken von ``batch_size`` Zeilen lesen (DataFrames wie ``read_triples``).
+
+    Die Triples werden blockweise aus Parquet gelesen, Satz-Metadaten per
+    ``take`` aus der per Memory-Map geöffneten Satztabelle angefügt; der
+    Speicherbedarf hängt so nicht von der Größe der Tabelle ab.
+    """
+    order = load_manifest(store_dir)["columns"]
+    wanted = order if columns is None else [c for c in order if c in columns]
+    meta = [c for c in wanted if c in SENTENCE_COLUMNS]
+    own = [c for c in wanted if c not in SENTENCE_COLUMNS]
+    sentences = _read_table(store_dir, "sentences", meta) if meta else None
+
+    source = pq.ParquetFile(os.path.join(store_dir, "triples.parquet"))
+    for batch in source.iter_batches(batch_size=batch_size, columns=own + (["satz_id"] if meta else [])):
+        table = pa.Table.from_batches([batch])
+        if meta:
+            picked = sentences.take(table.column("satz_id"))
+            table = table.drop_columns(["satz_id"])
+            for col in meta:
+                table = table.append_column(col, picked.column(col))
+        yield table.select(wanted).to_pandas()
+
+
+def import_xlsx(xlsx: str = XLSX, store_dir: str = STORE_DIR) -> pd.DataFrame:
+    """Von Hand kuratierte Excel-Datei in den Speicher übernehmen."""
+    df = pd.read_excel(xlsx)
+    version = write_store(df, store_dir)
+    print(f"Importiert: {xlsx} → {store_dir} (Version {version}, {len(df)} Triples)")
+    return read_triples(store_dir)
+
+
+def export_xlsx(store_dir: str = STORE_DIR, xlsx: str = XLSX) -> str:
+    """Speicher als Excel-Datei zum Kuratieren ausgeben."""
+    df = read_triples(store_dir)
+    df = df.drop(columns=[c for c in DERIVED_COLUMNS if c in df.columns])
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+    tmp = xlsx + ".tmp.xlsx"
+    df.to_excel(tmp, index=False)
+    os.replace(tmp, xlsx)
+    print(f"Exportiert: {store_dir} → {xlsx}")
+    return xlsx
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Triple-Speicher (Parquet/Arrow) ↔ xlsx")
+    ap.add_argument("step", choices=["import", "export", "info"])
+    ap.add_argument("--xlsx", default=XLSX)
+    ap.add_argument("--store", default=STORE_DIR)
+    args = ap.parse_args(argv)
+    if args.step == "import":
+        import_xlsx(args.xlsx, args.store)
+    elif args.step == "export":
+        export_xlsx(args.store, args.xlsx)
+    else:
+        print(json.dumps(load_manifest(args.store), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
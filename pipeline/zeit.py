@@ -0,0 +1,287 @@
+"""Zeitangaben (``zeit``) als Tagesbereiche und Intervall-Index für Zeitfenster.
+
+Die Spalte ``zeit`` ist freier Text aus der Relationsextraktion und der
+Kuratierung: „18-04-1777“, „4 Januar 1893“, „11ten März 1781“, „Ende Juli
+1834“, „Juli-August 1859“, „von 1792 bis 1795“, dazu OCR-Fehler wie „Anguſt“,
+„Jini“ oder „18O7“. ``parse`` macht daraus einen Bereich ganzer Tage
+``(von, bis)`` (Tagesnummern wie ``date.toordinal``): ein Tag, ein Monat,
+ein Jahr oder ein Abschnitt davon (Anfang/Mitte/Ende, Jahreszeiten). Angaben
+ohne erkennbares Jahr ergeben ``None``.
+
+Der Triple-Speicher legt die Bereiche bei jedem Schreiben als ``zeit_von`` /
+``zeit_bis`` ab (``triplestore.normalize``). ``ZeitIndex`` beantwortet darauf
+Überlappungsanfragen ohne Durchlauf über die ganze Tabelle: die Intervalle
+sind nach Längenklassen (Zweierpotenzen) gruppiert und je Klasse nach Beginn
+sortiert, sodass je Klasse nur ein Bereich per ``searchsorted`` geprüft wird.
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pipeline.zeit "Ende Juli 1834" "13ten und 17 Auguſt 1827"
+"""
+import argparse
+import calendar
+import re
+from datetime import date
+from difflib import get_close_matches
+
+import numpy as np
+import pandas as pd
+
+# Plausible Jahre der Quellen; alles außerhalb gilt als Lesefehler
+YEAR_MIN = 1500
+YEAR_MAX = 2000
+
+MONTHS = {
+    "januar": 1, "februar": 2, "märz": 3, "april": 4, "mai": 5, "juni": 6,
+    "juli": 7, "august": 8, "september": 9, "oktober": 10, "november": 11, "dezember": 12,
+    # ältere und fremde Schreibweisen
+    "jänner": 1, "marz": 3, "maerz": 3, "may": 5, "juny": 6, "july": 7,
+    "october": 10, "december": 12,
+}
+# Dreibuchstabige Abkürzungen (auch „Ang.“ für „Aug.“); längere wie „Sept“ oder
+# „Octobr“ werden als Anfang eines Monatsnamens erkannt
+_MONTH_PREFIX = {
+    "jan": 1, "feb": 2, "mär": 3, "mar": 3, "mae": 3, "apr": 4, "mai": 5, "may": 5,
+    "jun": 6, "jul": 7, "aug": 8, "ang": 8, "sep": 9, "okt": 10, "oct": 10,
+    "nov": 11, "dez": 12, "dec": 12,
+}
+
+# Abschnitte: (Monatsteil in Tagen, Jahresteil in Monaten)
+PARTS = {
+    "anfang": ((1, 10), (1, 4)), "anfangs": ((1, 10), (1, 4)),
+    "mitte": ((11, 20), (5, 8)),
+    "ende": ((21, 31), (9, 12)),
+}
+SEASONS = {"frühjahr": (3, 5), "fruhjahr": (3, 5), "frühling": (3, 5), "sommer": (6, 8), "herbst": (9, 11)}
+
+# OCR: Buchstaben, die in Zahlen für Ziffern gelesen werden
+OCR_DIGITS = str.maketrans({"o": "0", "O": "0", "l": "1", "I": "1", "i": "1", "|": "1",
+                            "S": "5", "B": "8", "Z": "2", "z": "2", "g": "9"})
+
+_TOKEN = re.compile(r"\d+|[^\W\d_]+")
+# Rein numerische Formen: Tag.Monat.Jahr, Jahr-Monat(-Tag), Monat-Jahr
+_DMY = re.compile(r"^(\d{1,2})[.\-/]\s*(\d{1,2})[.\-/]?\s*(\d{4})$")
+_YMD = re.compile(r"^(\d{4})-(\d{1,2})(?:-(\d{1,2}))?$")
+_MY = re.compile(r"^(\d{1,2})[.\-/](\d{4})$")
+_RANGE = re.compile(r"\s+(?:bis|und)\s+|\s*[-–]\s*")
+
+
+def day(year: int, month: int = 1, d: int = 1) -> int:
+    return date(year, month, d).toordinal()
+
+
+def to_date(n) -> date:
+    return date.fromordinal(int(n))
+
+
+def _last_day(year: int, month: int) -> int:
+    return calendar.monthrange(year, month)[1]
+
+
+# Vergleich mit verstümmelten Formen nur gegen längere Namen („Mainz“ ist nicht „Mai“)
+_MONTH_NAMES = [name for name in MONTHS if len(name) >= 4]
+
+
+def _month(token: str):
+    """Monat eines Wortes; andere Wörter mit gleichem Anfang („Martini“, „Augen“) ergeben ``None``."""
+    if token in MONTHS:
+        return MONTHS[token]
+    if token in _MONTH_PREFIX:
+        return _MONTH_PREFIX[token]
+    if len(token) >= 3:
+        prefixed = {m for name, m in MONTHS.items() if name.startswith(token)}
+        if len(prefixed) == 1:
+            return prefixed.pop()
+    if len(token) >= 4:
+        match = get_close_matches(token, _MONTH_NAMES, n=1, cutoff=0.75)
+        if match:
+            return MONTHS[match[0]]
+    return None
+
+
+def _clean(text: str) -> str:
+    s = str(text).replace("ſ", "s").replace("(", " ").replace(")", " ")
+    # OCR-Ziffern nur in Wörtern, die überwiegend aus Ziffern bestehen („18O7“, „l808“)
+    s = re.sub(r"[\dOoIil|SBZzg]{3,4}",
+               lambda m: m.group(0).translate(OCR_DIGITS)
+               if sum(c.isdigit() for c in m.group(0)) >= 2 else m.group(0), s)
+    s = s.lower()
+    # Ordinalzahlen („14ten“, „21sten“, „20 sten“) → Zahl
+    s = re.sub(r"\b(\d{1,2})\s*(?:s?ten|ter|te)\b", r"\1", s)
+    return s
+
+
+class _Parts:
+    """Erkannte Bestandteile einer einzelnen Angabe (ohne Bereich)."""
+
+    def __init__(self, year=None, month=None, d=None):
+        self.year, self.month, self.day = year, month, d
+        self.part = self.season = None
+        self.christmas = False
+        self.small = []
+
+    @classmethod
+    def read(cls, text: str):
+        """Bestandteile oder ``None``, wenn die Angabe nach einem Bereich aussieht."""
+        s = text.strip(" .,;:")
+        for pattern, order in ((_DMY, "dmy"), (_YMD, "ymd"), (_MY, "my")):
+            m = pattern.match(s)
+            if m:
+                values = dict(zip(order, (int(x) if x else None for x in m.groups())))
+                return cls(values["y"], values["m"], values.get("d"))
+
+        p = cls()
+        years = []
+        for tok in _TOKEN.findall(s):
+            if tok.isdigit():
+                if len(tok) == 4:
+                    years.append(int(tok))
+                elif len(tok) <= 2:
+                    p.small.append(int(tok))
+            elif tok in PARTS:
+                p.part = tok
+            elif tok in SEASONS:
+                p.season = tok
+            elif tok.startswith("weihnacht"):
+                p.christmas = True
+            else:
+                month = _month(tok)
+                if month is not None:
+                    if p.month is not None and p.month != month:
+                        return None  # zwei Monate
+                    p.month = month
+        if len(years) > 1:
+            return None  # zwei Jahre
+        p.year = years[0] if years else None
+        if p.month is not None and len(p.small) > 1:
+            return None  # zwei Tage („13 und 17 August“)
+        if p.month is None and len(p.small) > 1:
+            return None  # mehrere Zahlen ohne Monat („24-07-1842 bis 29-07-1842“)
+        if p.month is not None and p.small:
+            p.day = p.small[0]
+        return p
+
+    def inherit(self, other: "_Parts"):
+        """Fehlendes Jahr (und beim Tag auch den Monat) vom anderen Ende eines Bereichs übernehmen."""
+        if self.year is None:
+            self.year = other.year
+        if self.month is None and self.small and other.month is not None and not (self.part or self.season):
+            self.month, self.day = other.month, self.small[0]
+
+    def span(self):
+        y = self.year
+        if y is None or not YEAR_MIN <= y <= YEAR_MAX:
+            return None
+        if self.month is not None and not 1 <= self.month <= 12:
+            return None
+        if self.christmas:
+            return day(y, 12, 24), day(y, 12, 26)
+        if self.month is None:
+            if self.season:
+                a, b = SEASONS[self.season]
+                return day(y, a), day(y, b, _last_day(y, b))
+            if self.part:
+                a, b = PARTS[self.part][1]
+                return day(y, a), day(y, b, _last_day(y, b))
+            return day(y), day(y, 12, 31)
+        last = _last_day(y, self.month)
+        if self.day is not None and 1 <= self.day <= last:
+            return (day(y, self.month, self.day),) * 2
+        if self.part:
+            a, b = PARTS[self.part][0]
+            return day(y, self.month, a), day(y, self.month, min(b, last))
+        return day(y, self.month), day(y, self.month, last)
+
+
+def parse(text):
+    """Freitext-Datum → ``(von, bis)`` als Tagesnummern oder ``None``."""
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return None
+    s = _clean(text)
+    s = re.sub(r"^\s*(?:am|den|ca\.?|um|von|seit|ab|bis)\s+", "", s.strip())
+    single = _Parts.read(s)
+    if single is not None and single.span() is not None:
+        return single.span()
+    # Bereich: „1798-1799“, „Juli-August 1859“, „von 1792 bis 1795“, „13ten und 17 August 1827“
+    for m in _RANGE.finditer(s):
+        left, right = _Parts.read(s[:m.start()]), _Parts.read(s[m.end():])
+        if left is None or right is None:
+            continue
+        left.inherit(right)
+        right.inherit(left)
+        a, b = left.span(), right.span()
+        if a is not None and b is not None and a[0] <= b[1]:
+            return a[0], b[1]
+    return None
+
+
+def parse_column(col: pd.Series):
+    """Spalte ``zeit`` → (``zeit_von``, ``zeit_bis``) als nullable Int32 (jeder Wert einmal)."""
+    values = col.astype(object).where(col.notna(), None)
+    spans = {v: parse(v) for v in pd.unique(values.dropna())}
+    von = values.map(lambda v: spans[v][0] if v is not None and spans[v] else None)
+    bis = values.map(lambda v: spans[v][1] if v is not None and spans[v] else None)
+    return von.astype("Int32"), bis.astype("Int32")
+
+
+class ZeitIndex:
+    """Überlappungsanfragen über Tagesbereiche (eine Zeile je Triple).
+
+    Zeilen ohne Datum haben ``NaN`` in ``von``/``bis``; ``dated`` markiert
+    die übrigen.
+    """
+
+    def __init__(self, von, bis):
+        von = pd.to_numeric(pd.Series(von), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        bis = pd.to_numeric(pd.Series(bis), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        self.n = len(von)
+        self.dated = ~np.isnan(von) & ~np.isnan(bis)
+        rows = np.flatnonzero(self.dated)
+        v, b = von[rows].astype(np.int64), bis[rows].astype(np.int64)
+        v, b = np.minimum(v, b), np.maximum(v, b)
+        length = b - v
+        klass = np.ceil(np.log2(length + 1)).astype(np.int64)
+        self.buckets = []
+        for k in np.unique(klass):
+            sel = np.flatnonzero(klass == k)
+            order = sel[np.argsort(v[sel], kind="stable")]
+            self.buckets.append((v[order], b[order], rows[order], int(length[order].max())))
+        self.lo = int(v.min()) if len(v) else None
+        self.hi = int(b.max()) if len(b) else None
+
+    def __len__(self):
+        return self.n
+
+    def span(self):
+        """(erster, letzter) Tag aller Bereiche oder ``None``."""
+        return None if self.lo is None else (self.lo, self.hi)
+
+    def overlapping(self, start: int, end: int) -> np.ndarray:
+        """Sortierte Zeilennummern, deren Bereich ``[start, end]`` überlappt."""
+        parts = []
+        for starts, ends, rows, max_len in self.buckets:
+            i = np.searchsorted(starts, start - max_len, "left")
+            j = np.searchsorted(starts, end, "right")
+            parts.append(rows[i:j][ends[i:j] >= start])
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def mask(self, start: int, end: int, undated: bool = False) -> np.ndarray:
+        """Boolesche Maske über alle Zeilen (mit ``undated`` auch die ohne Datum)."""
+        m = np.zeros(self.n, dtype=bool)
+        m[self.overlapping(start, end)] = True
+        if undated:
+            m |= ~self.dated
+        return m
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Zeitangaben als Tagesbereiche anzeigen")
+    ap.add_argument("text", nargs="+")
+    args = ap.parse_args(argv)
+    for text in args.text:
+        span = parse(text)
+        print(f"{text!r}: " + (f"{to_date(span[0])} – {to_date(span[1])}" if span else "—"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Lokaler Ersatz für den Ollama-Server (``/api/chat``) für Probeläufe ohne Modell.
+
+Antwortet deterministisch: für jede im Humanprompt genannte Person und jeden
+Ort eine ``war_in``-Relation als JSON-Liste. Verzögerung und Fehlerquote sind
+einstellbar, damit sich Parallelität, Timeouts und Wiederholungen des
+Runners (``pipeline.relations``) ohne GPU ausprobieren lassen.
+
+Mit ``bad_rate`` ist ein Teil der ersten Antworten unbrauchbar (Fließtext vor
+dem JSON, abgeschnittenes JSON oder ein unbekannter Beziehungstyp); Rückfragen
+werden korrekt beantwortet.
+
+``test_relations.py`` startet den Stub mit ``serve()`` im Hintergrund.
+
+Aufruf aus der Repository-Wurzel::
+
+    python test/ollama_stub.py --port 11435 --delay 0.2 --fail-rate 0.1
+    python -m pipeline.relations --url http://localhost:11435
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _entities(prompt: str, field: str) -> list:
+    m = re.search(rf"^{field}: (.*)$", prompt, re.MULTILINE)
+    return [e for e in m.group(1).split(", ") if e] if m else []
+
+
+def answer(messages: list, bad: int = 0) -> str:
+    """Deterministische Modellantwort; ``bad`` 1–3 wählt eine fehlerhafte Variante."""
+    # Bei Rückfragen gilt weiterhin der ursprüngliche Humanprompt
+    prompt = next((m["content"] for m in messages if m["role"] == "user"), "")
+    dates = _entities(prompt, "date")
+    relations = [
+        {"subjekt": person, "subjekt_type": "person", "prädikat": "war_in",
+         "objekt": ort, "objekt_type": "location", "zeit": dates[0] if dates else None}
+        for person in _entities(prompt, "personen")
+        for ort in _entities(prompt, "orte")
+    ]
+    if bad == 3:
+        relations.append({"subjekt": "er", "subjekt_type": "person", "prädikat": "wohnte_bei",
+                          "objekt": "ihm", "objekt_type": "person", "zeit": None})
+    text = json.dumps(relations, ensure_ascii=False)
+    if bad == 1:
+        return "Hier sind die Relationen:\n" + text
+    if bad == 2:
+        return text[: len(text) // 2]
+    return text
+
+
+def make_handler(delay: float = 0.0, fail_rate: float = 0.0, seed: int = 0, bad_rate: float = 0.0):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    stats = {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/api/chat":
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            with lock:
+                stats["requests"] += 1
+                stats["in_flight"] += 1
+                stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+                fail = rng.random() < fail_rate
+                first = len(body.get("messages", [])) <= 2
+                bad = rng.randint(1, 3) if first and rng.random() < bad_rate else 0
+            try:
+                time.sleep(delay)
+                if fail:
+                    self.send_error(503, "stub: simulierter Fehler")
+                    return
+                data = json.dumps({
+                    "model": body.get("model"),
+                    "message": {"role": "assistant", "content": answer(body.get("messages", []), bad)},
+                    "done": True,
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # Client hat wegen Timeout aufgegeben
+                pass
+            finally:
+                with lock:
+                    stats["in_flight"] -= 1
+
+        def log_message(self, format, *args):
+            pass
+
+    Handler.stats = stats
+    return Handler
+
+
+@contextmanager
+def serve(port: int = 0, delay: float = 0.0, fail_rate: float = 0.0, seed: int = 0, bad_rate: float = 0.0):
+    """Stub im Hintergrund starten; liefert (URL, Zähler) und beendet ihn danach."""
+    handler = make_handler(delay, fail_rate, seed, bad_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", handler.stats
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Ollama-Stub für Probeläufe der Relationsextraktion")
+    ap.add_argument("--port", type=int, default=11435)
+    ap.add_argument("--delay", type=float, default=0.0, help="Antwortzeit je Anfrage in Sekunden")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="Anteil simulierter 503-Fehler")
+    ap.add_argument("--bad-rate", type=float, default=0.0, help="Anteil unbrauchbarer erster Antworten")
+    args = ap.parse_args(argv)
+    handler = make_handler(args.delay, args.fail_rate, bad_rate=args.bad_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    print(f"Ollama-Stub läuft auf http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Regeltabelle der OCR-Bereinigung (``pipeline.cleaning``)."""
+import random
+
+import pytest
+
+from pipeline.cleaning import DEFAULT_RULES, RuleSet, clean_text
+
+
+@pytest.mark.parametrize("raw, clean", [
+    ("fi-\nc", "sich"),
+    ("i-\nc)", "ich"),
+    ("Wort-\nende", "Wortende"),
+    ("auc) nac) Jh", "auch nach Ich"),
+    ("den 4. Mai", "den 4  Mai"),
+    ("zurü> und durc<zumachen", "zurück und durchzumachen"),
+    ("„Ja“, sagte er!", " Ja   sagte er "),
+    ("Zeile\nbleibt", "Zeile\nbleibt"),
+])
+def test_clean_text(raw, clean):
+    assert clean_text(raw) == clean
+
+
+def test_none_is_empty():
+    assert clean_text(None) == ""
+
+
+def test_longest_literal_wins():
+    rules = RuleSet([("ab", "1", False), ("abc", "2", False)], join=[])
+    assert rules.clean("abcab") == "21"
+
+
+def test_version_follows_rules():
+    assert RuleSet().version == DEFAULT_RULES.version
+    assert RuleSet([("x", "y", False)]).version != DEFAULT_RULES.version
+    assert RuleSet(join=[]).version != DEFAULT_RULES.version
+
+
+def test_stream_matches_clean():
+    """Blockweise Bereinigung liefert dasselbe wie der ganze Text, bei jeder Blockgröße."""
+    rng = random.Random(1)
+    alphabet = "fic)i-\n<>ß?ur.3 ,!aJhIJ"
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        size = rng.randint(1, 7)
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert "".join(DEFAULT_RULES.clean_stream(chunks)) == DEFAULT_RULES.clean(text)
@@ -0,0 +1,32 @@
+"""Zusammenführen von Schreibvarianten (``pipeline.dedup``)."""
+from collections import Counter
+
+from pipeline.dedup import cluster, corpus_words
+
+
+def _labels(counts, data=None):
+    words = corpus_words(data) if data is not None else None
+    clusters, _ = cluster(Counter(counts), words=words)
+    return {tuple(c["varianten"]): c["label"] for c in clusters}
+
+
+def test_most_frequent_spelling():
+    out = _labels({("location", "Zeiſt"): 3, ("location", "Zeist"): 1})
+    assert out == {("Zeist", "Zeiſt"): "Zeist"}
+
+
+def test_tie_prefers_common_words():
+    """Bei Gleichstand nicht die längere OCR-Form („Ansſtalt“), sondern die mit geläufigen Wörtern."""
+    data = [{"text": "in der Unitäts-Anſtalt zu Nisky"}, {"text": "die Anſtalt"},
+            {"text": "im Miſſionsdienſt"}, {"text": "zum Miſſionedienſt"}, {"text": "den Missionsdienst"}]
+    out = _labels({("organisation", "Unitäts-Ansſtalt in Nisky"): 1, ("organisation", "Unitäts-Anſtalt in Nisky"): 1,
+                   ("tätigkeit", "zum Missionsdienſt"): 1, ("tätigkeit", "zum Miſſionedienſt"): 1}, data)
+    assert out[("Unitäts-Ansſtalt in Nisky", "Unitäts-Anſtalt in Nisky")] == "Unitäts-Anstalt in Nisky"
+    assert out[("zum Missionsdienſt", "zum Miſſionedienſt")] == "zum Missionsdienst"
+
+
+def test_separate_names():
+    out = _labels({("person", "Geſchw. Tietze"): 1, ("person", "Geſchw. Tießen"): 1,
+                   ("location", "Niesky"): 2, ("location", "Nisky"): 3})
+    assert out[("Niesky", "Nisky")] == "Nisky"
+    assert ("Geſchw. Tietze",) in out and ("Geſchw. Tießen",) in out
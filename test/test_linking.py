@@ -0,0 +1,52 @@
+"""Wikidata-Client (``pipeline.linking``) gegen den Wikidata-Stub.
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pytest test/test_linking.py
+"""
+import pandas as pd
+
+from wikidata_stub import COORDINATES, serve
+from pipeline import linking
+
+
+def test_coordinates_batched_and_cached(tmp_path):
+    """Koordinaten kommen in VALUES-Blöcken; der zweite Lauf beantwortet alles aus dem Cache."""
+    qids = list(COORDINATES) + ["Q1", "Q84", "kein", None]
+    cache_path = str(tmp_path / "wikidata_cache.sqlite")
+
+    with serve() as (api_url, sparql_url, stats):
+        with linking.WikidataClient(api_url, sparql_url, cache_path=cache_path, rate=None,
+                                    batch_size=3) as client:
+            found = client.coordinates(qids)
+        # 9 verschiedene Q-IDs in Blöcken zu 3, ungültige Werte werden nicht abgefragt
+        assert stats["sparql"] == 3
+        assert found == {**{q: c for q, c in COORDINATES.items()}, "Q1": (None, None)}
+
+        with linking.WikidataClient(api_url, sparql_url, cache_path=cache_path, rate=None,
+                                    batch_size=3) as client:
+            assert client.coordinates(qids) == found
+            assert client.requests == 0
+        assert stats["sparql"] == 3
+
+
+def test_add_coordinates_clears_rows_without_qid(tmp_path):
+    """Ortszeilen ohne gültige QID verlieren alte Koordinaten, ohne Antwort bleiben sie stehen."""
+    df = pd.DataFrame({
+        "objekt_type": ["location", "location", "location", "person"],
+        "q_objekt": ["Q84", "", "kein", ""],
+        "lat": [1.0, 2.0, 3.0, 4.0],
+        "lon": [1.0, 2.0, 3.0, 4.0],
+    })
+    with serve() as (api_url, sparql_url, _):
+        with linking.WikidataClient(api_url, sparql_url, cache_path=None, rate=None) as client:
+            out = linking.add_coordinates(df.copy(), client)
+    assert out.loc[0, ["lat", "lon"]].tolist() == list(COORDINATES["Q84"])
+    assert out.loc[[1, 2], ["lat", "lon"]].isna().all().all()
+    assert out.loc[3, "lat"] == 4.0
+
+    # Ohne erreichbaren Dienst bleibt die bisherige Koordinate der QID-Zeile stehen
+    with linking.WikidataClient(api_url, sparql_url, cache_path=None, rate=None, timeout=1) as client:
+        out = linking.add_coordinates(df.copy(), client)
+    assert out.loc[0, "lat"] == 1.0
+    assert out.loc[[1, 2], "lat"].isna().all()
@@ -0,0 +1,31 @@
+"""Inkrementeller Pipeline-Lauf (``pipeline.make``)."""
+import os
+
+import pytest
+
+from pipeline import make
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def checkout(tmp_path, monkeypatch):
+    """Repository wie nach einem frischen Checkout: ohne Stand und ohne die ungeprüften Ausgaben."""
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setattr(make, "TRIPLE_FILE", str(tmp_path / "triple.json"))
+    monkeypatch.setattr(make, "LINKED_FILE", str(tmp_path / "graphen.xlsx"))
+    return str(tmp_path / "state.sqlite")
+
+
+def test_mark_current_then_nothing_planned(checkout):
+    """``--als-aktuell`` markiert alles (auch re/link ohne ungeprüfte Ausgabe), danach ist nichts geplant."""
+    make.main(["--als-aktuell", "--state", checkout])
+    result = make.build(dry_run=True, state_path=checkout)
+    assert set(result) == set(make.STAGE_NAMES)
+    assert {name: built for name, (built, _, _) in result.items()} == dict.fromkeys(make.STAGE_NAMES, 0)
+    assert all(bad == 0 for _, _, bad in result.values())
+
+
+def test_fresh_state_plans_everything(checkout):
+    result = make.build(["re"], dry_run=True, state_path=checkout)
+    assert result["re"] == (1, 0, 0)
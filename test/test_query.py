@@ -0,0 +1,82 @@
+"""SPARQL-Teilmenge und Index-Joins (``pipeline.query``)."""
+import pandas as pd
+import pytest
+
+from pipeline.query import TripleIndex, parse
+
+TRIPLES = [
+    ("Anna", "Geburtsort", "Zeist"),
+    ("Anna", "Sterbeort", "Herrnhut"),
+    ("Anna", "Ehepartner(in)", "Bernhard"),
+    ("Bernhard", "Geburtsort", "Barby"),
+    ("Bernhard", "Wohnsitz", "Herrnhut"),
+    ("Carl", "Geburtsort", "Altona"),
+    ("Carl", "Sterbeort", "Herrnhut"),
+    ("Anna", "a", "person"),
+    ("Bernhard", "a", "person"),
+    ("Carl", "a", "person"),
+    ("Herrnhut", "a", "location"),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return TripleIndex(*zip(*TRIPLES))
+
+
+def test_parse():
+    q = parse("""PREFIX ex: <http://example.org/>
+        SELECT DISTINCT ?p ?g WHERE { ?p a person . ?p "Ehepartner(in)" ?g . ?g <Wohnsitz> ?o }
+        ORDER BY ?o ?p LIMIT 5""")
+    assert q == {
+        "variables": ["?p", "?g"],
+        "patterns": [("?p", "a", "person"), ("?p", "Ehepartner(in)", "?g"), ("?g", "Wohnsitz", "?o")],
+        "distinct": True,
+        "order_by": ("?o", "?p"),
+        "limit": 5,
+    }
+    assert parse("SELECT * WHERE { ?s ?p ?o }")["variables"] is None
+
+
+@pytest.mark.parametrize("text", [
+    "SELECT ?p",
+    "SELECT ?p WHERE { }",
+    "SELECT ?p WHERE { ?p Geburtsort }",
+    "SELECT ?p WHERE { { ?p a person } }",
+])
+def test_parse_errors(text):
+    with pytest.raises(ValueError):
+        parse(text)
+
+
+def test_bgp_join(index):
+    """Mehrere Muster über gemeinsame Variablen, wie ein ``merge`` über die Tabelle."""
+    out = index.query("SELECT ?p ?g ?s WHERE { ?p a person . ?p Geburtsort ?g . ?p Sterbeort ?s }")
+    expected = pd.DataFrame({"p": ["Anna", "Carl"], "g": ["Zeist", "Altona"], "s": ["Herrnhut", "Herrnhut"]})
+    pd.testing.assert_frame_equal(out.sort_values("p", ignore_index=True).astype(object), expected.astype(object))
+
+    out = index.query("SELECT ?p ?w WHERE { ?p Ehepartner(in) ?x . ?x Wohnsitz ?w }")
+    assert out.values.tolist() == [["Anna", "Herrnhut"]]
+    assert index.query("SELECT ?p WHERE { ?p Geburtsort Nirgendwo }").empty
+    assert index.count(p="Geburtsort") == 3
+    assert index.count(s="Anna", p="Sterbeort", o="Herrnhut") == 1
+
+
+def test_order_by_unprojected(index):
+    """Sortiert wird vor der Projektion, auch nach nicht ausgegebenen Variablen."""
+    out = index.query("SELECT ?p WHERE { ?p Geburtsort ?o } ORDER BY ?o LIMIT 2")
+    assert out["p"].tolist() == ["Carl", "Bernhard"]
+
+
+def test_distinct_keeps_order(index):
+    out = index.query("SELECT DISTINCT ?o WHERE { ?p ?x ?o . ?p a person } ORDER BY ?o LIMIT 3")
+    assert out["o"].tolist() == ["Altona", "Barby", "Bernhard"]
+    assert len(index.query("SELECT DISTINCT ?o WHERE { ?p Sterbeort ?o }")) == 1
+    assert len(index.query("SELECT ?o WHERE { ?p Sterbeort ?o }")) == 2
+
+
+def test_unknown_variable(index):
+    with pytest.raises(ValueError):
+        index.query("SELECT ?x WHERE { ?p Geburtsort ?o }")
+    with pytest.raises(ValueError):
+        index.query("SELECT ?p WHERE { ?p Geburtsort ?o } ORDER BY ?x")
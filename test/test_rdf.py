@@ -0,0 +1,33 @@
+"""Zusammenführen sortierter Läufe beim RDF-Export (``pipeline.rdf``)."""
+import numpy as np
+
+from pipeline.rdf import merge_runs
+
+
+def _runs(tmp_path, runs):
+    paths = []
+    for i, run in enumerate(runs):
+        path = str(tmp_path / f"lauf_{i}.npy")
+        np.save(path, np.asarray(run, dtype="<u8"))
+        paths.append(path)
+    return paths
+
+
+def test_merge_runs(tmp_path):
+    """Sortiert und eindeutig, auch mit Puffern kleiner als die Läufe."""
+    rng = np.random.default_rng(0)
+    runs = [np.unique(rng.integers(0, 1000, size)) for size in (500, 300, 1, 700)]
+    output = str(tmp_path / "alle.npy")
+    count = merge_runs(_runs(tmp_path, runs), output, chunk=7)
+    expected = np.unique(np.concatenate(runs))
+    out = np.load(output)
+    assert count == len(expected)
+    assert out.dtype == np.dtype("<u8")
+    assert np.array_equal(out, expected)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["alle.npy"] + [f"lauf_{i}.npy" for i in range(4)]
+
+
+def test_merge_runs_empty(tmp_path):
+    output = str(tmp_path / "alle.npy")
+    assert merge_runs(_runs(tmp_path, [[], []]), output) == 0
+    assert len(np.load(output)) == 0
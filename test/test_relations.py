@@ -0,0 +1,50 @@
+"""Relationsextraktion (``pipeline.relations``) gegen den Ollama-Stub.
+
+Aufruf aus der Repository-Wurzel::
+
+    python -m pytest test/test_relations.py
+"""
+import json
+
+from ollama_stub import serve
+from pipeline import relations
+
+
+def _entries(n):
+    return [{"text": f"Satz {i}.", "personen": [f"Person {i}"], "orte": ["Herrnhut", "Niesky"],
+             "organisationen": [], "date": [f"{i}ten Mai 1800"], "datei": f"{i}.xml"} for i in range(n)]
+
+
+def _write_input(path, entries):
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def test_resume_after_interruption(tmp_path):
+    """Ein abgebrochener Lauf wird fortgesetzt; nur die fehlenden Sätze gehen an das Modell."""
+    entries = _entries(10)
+    input_file = tmp_path / "sätze.jsonl"
+    checkpoint = tmp_path / "triple.jsonl"
+    _write_input(input_file, entries)
+
+    with serve() as (url, stats):
+        client = relations.OllamaClient(url)
+        first = relations.run(str(input_file), str(tmp_path / "triple.json"), str(checkpoint),
+                              client=client, concurrency=3, cache_path=None)
+        assert stats["requests"] == 10
+
+        # Abbruch simulieren: vier Zeilen fertig, die fünfte nur halb geschrieben
+        lines = checkpoint.read_text(encoding="utf-8").splitlines(keepends=True)
+        checkpoint.write_text("".join(lines[:4]) + lines[4][:20], encoding="utf-8")
+
+        output = tmp_path / "triple_neu.json"
+        second = relations.run(str(input_file), str(output), str(checkpoint),
+                               client=client, concurrency=3, cache_path=None)
+        assert stats["requests"] == 10 + 6
+
+    assert second == first
+    assert json.loads(output.read_text(encoding="utf-8")) == first
+    assert [r["datei"] for r in second] == [e["datei"] for e in entries]
+    # Die abgebrochene Zeile wird übersprungen, alle Sätze stehen im Checkpoint
+    assert set(relations.load_checkpoint(str(checkpoint))) == set(relations.entry_ids(entries))
@@ -0,0 +1,28 @@
+"""Kodierte Polylines der Reiserouten (``pipeline.routen``)."""
+import numpy as np
+import pytest
+
+from pipeline.routen import decode, encode
+
+# Beispiel aus der Beschreibung des Formats (Google Encoded Polyline)
+EXAMPLE = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+
+
+def test_known_example():
+    lat, lon = zip(*EXAMPLE)
+    assert encode(lat, lon) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert decode("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == pytest.approx(EXAMPLE)
+
+
+def test_roundtrip():
+    """Hin und zurück bis auf die Genauigkeit (5 Nachkommastellen), auch über Vorzeichenwechsel."""
+    rng = np.random.default_rng(0)
+    lat, lon = rng.uniform(-90, 90, 200), rng.uniform(-180, 180, 200)
+    out = np.array(decode(encode(lat, lon)))
+    assert np.abs(out - np.column_stack([lat, lon])).max() <= 0.5e-5 + 1e-12
+
+
+def test_empty_and_precision():
+    assert encode([], []) == ""
+    assert decode("") == []
+    assert decode(encode([52.123456], [13.654321], precision=6), precision=6) == [(52.123456, 13.654321)]
@@ -0,0 +1,46 @@
+"""Knoten-Suche der Visualisierung (``pipeline.search``)."""
+import numpy as np
+import pytest
+
+from pipeline.search import NodeSearch
+
+NAMES = ["Schmidt", "Bach", "Sachse", "Herrnhut", "Bonatz", "Adolf Müller", "Nisky"]
+
+
+@pytest.fixture(scope="module")
+def search():
+    return NodeSearch(NAMES, aliases={"Niesky": "Nisky"})
+
+
+@pytest.mark.parametrize("name", ["Schmidt", "Bach", "Sachse", "Herrnhut"])
+def test_incremental_typing(search, name):
+    """Jede angefangene Eingabe findet den Namen."""
+    for end in range(1, len(name) + 1):
+        assert name in search.find(name[:end]), name[:end]
+
+
+@pytest.mark.parametrize("query, hit", [
+    ("ut", "Herrnhut"),
+    ("hmi", "Schmidt"),
+    ("Bonaß", "Bonatz"),
+    ("Adolph", "Adolf Müller"),
+    ("muller", "Adolf Müller"),
+    ("Schmid", "Schmidt"),
+    ("Herrnhuth", "Herrnhut"),
+    ("Nies", "Nisky"),
+])
+def test_substring_and_variants(search, query, hit):
+    assert hit in search.find(query)
+
+
+def test_no_false_hits(search):
+    assert search.find("Bachse") == []
+    assert search.find("xy") == []
+
+
+def test_in_text():
+    """Ein Treffer im Satz liefert die Knoten seiner Triples."""
+    s = NodeSearch(["A", "B", "C"], texts=["Er reiste nach Herrnhut", "Sonst nichts"],
+                   text_nodes=[np.array([0, 2], dtype=np.int32), np.array([1], dtype=np.int32)])
+    assert s.find("herrnh") == []
+    assert s.find("herrnh", in_text=True) == ["A", "C"]
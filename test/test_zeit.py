@@ -0,0 +1,45 @@
+"""Freitext-Zeitangaben als Tagesbereiche (``pipeline.zeit``)."""
+from datetime import date
+
+import numpy as np
+import pytest
+
+from pipeline.zeit import ZeitIndex, day, parse, to_date
+
+
+@pytest.mark.parametrize("text, von, bis", [
+    ("18-04-1777", date(1777, 4, 18), date(1777, 4, 18)),
+    ("4 Januar 1893", date(1893, 1, 4), date(1893, 1, 4)),
+    ("11ten März 1781", date(1781, 3, 11), date(1781, 3, 11)),
+    ("Ende Juli 1834", date(1834, 7, 21), date(1834, 7, 31)),
+    ("Juli-August 1859", date(1859, 7, 1), date(1859, 8, 31)),
+    ("von 1792 bis 1795", date(1792, 1, 1), date(1795, 12, 31)),
+    ("13ten und 17 Auguſt 1827", date(1827, 8, 13), date(1827, 8, 17)),
+    ("Anguſt 1800", date(1800, 8, 1), date(1800, 8, 31)),
+    ("Jini 1800", date(1800, 6, 1), date(1800, 6, 30)),
+    ("18O7", date(1807, 1, 1), date(1807, 12, 31)),
+    ("Sept. 1800", date(1800, 9, 1), date(1800, 9, 30)),
+    ("Aug. 1800", date(1800, 8, 1), date(1800, 8, 31)),
+    ("Sommer 1820", date(1820, 6, 1), date(1820, 8, 31)),
+    ("Weihnachten 1790", date(1790, 12, 24), date(1790, 12, 26)),
+])
+def test_parse(text, von, bis):
+    assert tuple(map(to_date, parse(text))) == (von, bis)
+
+
+@pytest.mark.parametrize("text", ["Martini 1800", "Mainz 1800", "Augen 1800"])
+def test_words_are_not_months(text):
+    """Wörter mit dem Anfang eines Monatsnamens ergeben nur das Jahr."""
+    assert parse(text) == (day(1800), day(1800, 12, 31))
+
+
+@pytest.mark.parametrize("text", [None, np.nan, "", "im Frühjahr", "1234", "Juli"])
+def test_no_year(text):
+    assert parse(text) is None
+
+
+def test_index_overlapping():
+    spans = [parse(t) or (None, None) for t in ["1800", "Juli 1800", "1801", None, "1790-1810"]]
+    index = ZeitIndex(*zip(*spans))
+    assert index.overlapping(day(1800, 7, 15), day(1800, 7, 15)).tolist() == [0, 1, 4]
+    assert index.mask(day(1801), day(1801, 1, 31), undated=True).tolist() == [False, False, True, True, True]
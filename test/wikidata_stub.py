@@ -0,0 +1,142 @@
+"""Lokaler Ersatz für die Wikidata-API und den SPARQL-Endpunkt (Probeläufe ohne Netz).
+
+- ``/w/api.php?action=wbsearchentities``: Labels aus ``LABELS`` (bzw.
+  ``PROPERTIES``) liefern ihre ID, alle anderen nichts
+- ``/sparql`` (GET oder POST): beantwortet ``VALUES``-Abfragen nach
+  ``wdt:P625`` mit den Koordinaten aus ``COORDINATES``
+
+``test_linking.py`` startet den Stub mit ``serve()`` im Hintergrund.
+
+Aufruf aus der Repository-Wurzel::
+
+    python test/wikidata_stub.py --port 8089
+    python -m pipeline.linking coordinates --sparql http://localhost:8089/sparql --api http://localhost:8089/w/api.php
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Auszug aus data/5.4.3_EL/graphen_bereinigt.xlsx
+LABELS = {
+    "Gnadenthal": "Q1501295",
+    "London": "Q84",
+    "Herrnhut": "Q165140",
+    "Kapstadt": "Q5465",
+    "Niesky": "Q165160",
+    "Berthelsdorf": "Q502553",
+}
+
+PROPERTIES = {
+    "Geburtsort": "P19",
+    "Sterbeort": "P20",
+    "Tätigkeit": "P106",
+    "Ehepartner(in)": "P26",
+    "Wohnsitz": "P551",
+    "Wirkungsort": "P937",
+}
+
+COORDINATES = {
+    "Q1501295": (-34.033333, 19.55),
+    "Q84": (51.507222, -0.1275),
+    "Q165140": (51.016667, 14.741667),
+    "Q11142530": (-33.5167, 18.4667),
+    "Q5465": (-33.925278, 18.423889),
+    "Q159916": (51.21079, 14.3946),
+    "Q165160": (51.289722, 14.83),
+    "Q502553": (51.027778, 14.758333),
+}
+
+
+def make_handler(delay: float = 0.0):
+    lock = threading.Lock()
+    stats = {"search": 0, "sparql": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, payload: dict):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _search(self, params: dict):
+            label = params.get("search", [""])[0]
+            table = PROPERTIES if params.get("type", ["item"])[0] == "property" else LABELS
+            hit = table.get(label)
+            self._send({"search": [{"id": hit, "label": label}] if hit else []})
+
+        def _sparql(self, query: str):
+            bindings = []
+            for qid in re.findall(r"wd:(Q\d+)", query):
+                if qid in COORDINATES:
+                    lat, lon = COORDINATES[qid]
+                    bindings.append({
+                        "item": {"type": "uri", "value": f"http://www.wikidata.org/entity/{qid}"},
+                        "coord": {"type": "literal", "value": f"Point({lon} {lat})"},
+                    })
+            self._send({"head": {"vars": ["item", "coord"]}, "results": {"bindings": bindings}})
+
+        def _dispatch(self, path: str, params: dict):
+            time.sleep(delay)
+            if path.endswith("/api.php"):
+                with lock:
+                    stats["search"] += 1
+                self._search(params)
+            elif path.endswith("/sparql"):
+                with lock:
+                    stats["sparql"] += 1
+                self._sparql(params.get("query", [""])[0])
+            else:
+                self.send_error(404)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            self._dispatch(url.path, parse_qs(url.query))
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+            self._dispatch(urlparse(self.path).path, parse_qs(body))
+
+        def log_message(self, format, *args):
+            pass
+
+    Handler.stats = stats
+    return Handler
+
+
+@contextmanager
+def serve(port: int = 0, delay: float = 0.0):
+    """Stub im Hintergrund starten; liefert (API-URL, SPARQL-URL, Zähler)."""
+    handler = make_handler(delay)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        yield f"{base}/w/api.php", f"{base}/sparql", handler.stats
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Wikidata-Stub für Probeläufe des Datenabgleichs")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--delay", type=float, default=0.0, help="Antwortzeit je Anfrage in Sekunden")
+    args = ap.parse_args(argv)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.delay))
+    print(f"Wikidata-Stub läuft auf http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()